@@ -0,0 +1,12 @@
+"""
+URLconf for GETs served over ASGI (see ``AsyncRoutesMiddleware``): the
+async read views, then everything in ``careerai.urls``.
+"""
+from django.urls import path, include
+
+from careerai import urls
+
+urlpatterns = [
+    path('careerai/', include('user_registration.api.async_urls')),
+    *urls.urlpatterns,
+]
@@ -0,0 +1,120 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to the replica only in views that
+opt in (``ReplicaReadMixin``), only until the request writes, and only for
+users who have not written recently: a request that writes pins its user to
+the primary for ``DATABASE_REPLICA_PIN_SECONDS``, longer than replication
+lag, so users always read their own writes. Without a configured replica
+alias every read goes to ``default``.
+
+Pins live in the cache, so processes must share one for stickiness to hold
+across them.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Routing state of the current request, set by DatabaseRoutingMiddleware.
+# A dict so that changes made in views run in a copied context stay visible.
+_routing = ContextVar('db_routing', default=None)
+
+PIN_KEY = 'db_router:pin:{}'
+
+
+def replica_alias():
+    """The configured replica alias, or None."""
+    alias = getattr(settings, 'DATABASE_REPLICA_ALIAS', 'replica')
+    return alias if alias in connections.settings else None
+
+
+def is_pinned(user):
+    """Whether ``user`` wrote recently and must read from the primary."""
+    if user is None or not user.is_authenticated:
+        return False
+    return cache.get(PIN_KEY.format(user.pk)) is not None
+
+
+def pin(user_id):
+    cache.set(PIN_KEY.format(user_id), True, getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5))
+
+
+def allow_replica_reads():
+    """Send the current request's reads to the replica until it writes."""
+    state = _routing.get()
+    if state is not None:
+        state['replica'] = True
+
+
+def reads_from_replica():
+    """Whether the current request's reads go to the replica."""
+    state = _routing.get()
+    return state is not None and state['replica'] and not state['wrote'] and replica_alias() is not None
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return replica_alias() if reads_from_replica() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica's schema must match the primary's
+        return True
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Scopes routing state to each request, and pins the user to the primary
+    after a request that wrote.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = {'replica': False, 'wrote': False}
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self._pin_writer(request, state)
+        return response
+
+    async def __acall__(self, request):
+        state = {'replica': False, 'wrote': False}
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self._pin_writer(request, state)
+        return response
+
+    def _pin_writer(self, request, state):
+        # DRF copies the user it authenticates onto the Django request
+        user = getattr(request, 'user', None)
+        if state['wrote'] and replica_alias() and user is not None and user.is_authenticated:
+            pin(user.pk)
@@ -0,0 +1,141 @@
+"""
+Minimal in-process metrics registry rendered in the Prometheus text format.
+
+Metrics are per process; scrape every worker (or aggregate upstream) when
+running more than one.
+"""
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def samples(self):
+        """Yield ``(suffix, labels, value)`` tuples."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for suffix, labels, value in self.samples():
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+            lines.append(f'{self.name}{suffix}{{{label_text}}} {value}' if label_text else f'{self.name}{suffix} {value}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name, documentation):
+        super().__init__(name, documentation)
+        self._value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def samples(self):
+        yield '', (), self._value
+
+
+class Gauge(Metric):
+    """A gauge whose value is read from ``func`` at scrape time."""
+    type = 'gauge'
+
+    def __init__(self, name, documentation, func):
+        super().__init__(name, documentation)
+        self._func = func
+
+    def samples(self):
+        yield '', (), self._func()
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+    type = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            labels = tuple(zip(self.labelnames, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), values):
+                cumulative += count
+                yield '_bucket', labels + (('le', bound),), cumulative
+            yield '_sum', labels, values[-1]
+            yield '_count', labels, cumulative
+
+
+# Per-request timings, set by careerai.middleware.PerformanceMiddleware.
+# Context variables follow the request into sync_to_async threads.
+request_timings = ContextVar('request_timings', default=None)
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's ``name`` timing."""
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + time.perf_counter() - started
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def render():
+    return '\n'.join(metric.render() for metric in _registry) + '\n'
+
+
+def metrics_view(request):
+    """
+    Serve the metrics to staff sessions and, when ``METRICS_TOKEN`` is set,
+    to scrapers sending it as ``Authorization: Bearer <token>``.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.headers.get('Authorization', '')
+    if not (
+        (token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()))
+        or request.user.is_staff
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
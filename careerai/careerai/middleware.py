@@ -0,0 +1,194 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+
+from careerai import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Timings reported in Server-Timing, besides the query count and total
+TIMINGS = ('db', 'auth', 'serialize')
+
+request_duration = metrics.Histogram(
+    'careerai_request_duration_seconds', 'Total time spent handling a request.',
+    ('route', 'method', 'action', 'status'),
+)
+request_db_duration = metrics.Histogram(
+    'careerai_request_db_duration_seconds', 'Time spent in database queries per request.',
+    ('route', 'method', 'action'),
+)
+request_queries = metrics.Histogram(
+    'careerai_request_db_queries', 'Database queries issued per request.',
+    ('route', 'method', 'action'), buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+request_auth_duration = metrics.Histogram(
+    'careerai_request_auth_duration_seconds', 'Time spent authenticating a request.',
+    ('route', 'method', 'action'),
+)
+request_serialize_duration = metrics.Histogram(
+    'careerai_request_serialize_duration_seconds', 'Time spent in serializers per request.',
+    ('route', 'method', 'action'),
+)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper adding query time and count to the current request."""
+    timings = metrics.request_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings['db'] += time.perf_counter() - started
+        timings['queries'] += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Every new connection records queries; connections only ever opened
+# outside a request pay one context variable lookup per query.
+connection_created.connect(install_query_recorder)
+
+
+class PerformanceMiddleware:
+    """
+    Measures DB, auth, serializer and total time for every request.
+
+    Timings are sent back in a ``Server-Timing`` header (unless
+    ``SERVER_TIMING`` is off) and aggregated into per-route histograms,
+    exposed at ``/metrics``. Place it first so the total covers the rest of
+    the middleware stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'SERVER_TIMING', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.request_timings.reset(token)
+        return self._finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.request_timings.reset(token)
+        return self._finish(request, response, timings, started)
+
+    def _start(self):
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        timings = {'db': 0.0, 'queries': 0, 'auth': 0.0, 'serialize': 0.0}
+        return timings, metrics.request_timings.set(timings), time.perf_counter()
+
+    def _finish(self, request, response, timings, started):
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        method = request.method
+        # DRF viewsets expose the method -> action mapping on the view function.
+        # Read here rather than in process_view, which under ASGI would cost
+        # a thread switch per request
+        actions = (getattr(match.func, 'actions', None) if match else None) or {}
+        action = actions.get(method.lower(), '')
+        labels = (route, method, action)
+        request_duration.observe(labels + (str(response.status_code),), total)
+        request_db_duration.observe(labels, timings['db'])
+        request_queries.observe(labels, timings['queries'])
+        request_auth_duration.observe(labels, timings['auth'])
+        request_serialize_duration.observe(labels, timings['serialize'])
+
+        if self.server_timing:
+            entries = [
+                f'{name};dur={timings[name] * 1000:.2f}' + (f';desc="{timings["queries"]} queries"' if name == 'db' else '')
+                for name in TIMINGS
+            ]
+            entries.append(f'total;dur={total * 1000:.2f}')
+            response['Server-Timing'] = ', '.join(entries)
+        return response
+
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+
+
+class AsyncRoutesMiddleware:
+    """
+    Resolves GETs made over ASGI against ``ASYNC_ROOT_URLCONF``, which routes
+    them to the async read views ahead of ``ROOT_URLCONF``. Other methods,
+    and every request under WSGI, resolve against ``ROOT_URLCONF`` and reach
+    the DRF views without going through an async view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.urlconf = getattr(settings, 'ASYNC_ROOT_URLCONF', None)
+        if self.urlconf is None or not iscoroutinefunction(get_response):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        markcoroutinefunction(self)
+
+    async def __call__(self, request):
+        if request.method == 'GET':
+            request.urlconf = self.urlconf
+        return await self.get_response(request)
+
+
+class BrotliMiddleware(MiddlewareMixin):
+    """
+    Brotli-compresses responses for clients accepting ``br``; list it after
+    ``GZipMiddleware`` so it gets the first pick. Streaming responses are
+    left to gzip. Unused when the brotli package is not installed.
+    """
+
+    def __init__(self, get_response):
+        if brotli is None:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.quality = getattr(settings, 'BROTLI_QUALITY', 5)
+
+    def process_response(self, request, response):
+        if response.streaming or len(response.content) < 200 or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return response
+
+        compressed = brotli.compress(response.content, quality=self.quality)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # Like GZipMiddleware: the encoded body only matches weakly
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,6 +32,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its total covers the rest of the stack
+    'careerai.middleware.PerformanceMiddleware',
+    'careerai.db_router.DatabaseRoutingMiddleware',
+    'careerai.middleware.AsyncRoutesMiddleware',
+    # Compression is negotiated per request; brotli wins when both are accepted
+    'django.middleware.gzip.GZipMiddleware',
+    'careerai.middleware.BrotliMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -40,8 +48,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Send per-request db/auth/serialize/total timings in a Server-Timing header
+SERVER_TIMING = True
+
+# /metrics is served to staff sessions and to scrapers sending this token
+# as ``Authorization: Bearer <token>``
+METRICS_TOKEN = os.environ.get('CAREERAI_METRICS_TOKEN')
+
 ROOT_URLCONF = 'careerai.urls'
 
+# GETs served over ASGI resolve here first, reaching the async read views
+ASYNC_ROOT_URLCONF = 'careerai.async_urls'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -63,13 +81,70 @@ WSGI_APPLICATION = 'careerai.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# CAREERAI_SQLITE_TUNED=1 switches SQLite to its production profile: WAL
+# (readers never block the writer), memory-mapped reads, a busy timeout
+# instead of "database is locked" errors, and persistent connections.
+SQLITE_TUNED = os.environ.get('CAREERAI_SQLITE_TUNED') == '1'
+
+
+def sqlite_database(name):
+    database = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': name,
     }
+    if SQLITE_TUNED:
+        database['CONN_MAX_AGE'] = 600
+        database['CONN_HEALTH_CHECKS'] = True
+        database['OPTIONS'] = {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA cache_size=-65536;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+            # Take the write lock up front, so concurrent writers wait on
+            # the busy timeout instead of failing on lock upgrade
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 5,  # seconds
+        }
+    return database
+
+
+DATABASES = {
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
 }
 
+# CAREERAI_REPLICA_DB=<path> adds a read replica. List/retrieve reads of
+# profiles and reference data go there; see careerai.db_router. Locally a
+# second SQLite file stands in for it (manage.py sync_sqlite_replica copies
+# the primary over); tests mirror it onto the primary.
+DATABASE_REPLICA_ALIAS = 'replica'
+if os.environ.get('CAREERAI_REPLICA_DB'):
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **sqlite_database(os.environ['CAREERAI_REPLICA_DB']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['careerai.db_router.PrimaryReplicaRouter']
+
+# Reference table versions (which key the cached reference snapshots,
+# the reference list validators and the autocomplete indexes) and replica
+# pins live in the default cache. Without CAREERAI_CACHE_URL that is
+# Django's per-process LocMemCache, so a write is only seen by the process
+# that made it: point it at Redis when running several server processes.
+# ``manage.py check --deploy`` warns while the cache is per process.
+if os.environ.get('CAREERAI_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CAREERAI_CACHE_URL'],
+        }
+    }
+
+# Seconds a user reads from the primary after writing; keep it above the
+# replication lag
+DATABASE_REPLICA_PIN_SECONDS = 5
+
 # Custom user model settings
 AUTH_USER_MODEL = 'user_registration.User'
 
@@ -78,6 +153,30 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Password hashing pool used by the async login/register views. Requests
+# beyond workers + queue are shed with 503 and Retry-After.
+PASSWORD_HASH_WORKERS = min(4, os.cpu_count() or 1)
+PASSWORD_HASH_MAX_QUEUE = 32
+PASSWORD_HASH_RETRY_AFTER = 1
+
+# In-process rate limits on the auth endpoints, per scope and per client
+# key ('ip', and 'email' where the request names or authenticates one):
+# ('sliding_window', requests, seconds) allows that many in any window,
+# ('token_bucket', burst, seconds) refills the burst over that time.
+# Rejected requests get 429 with Retry-After, before any hashing or query.
+AUTH_THROTTLES = {
+    'login': {'ip': ('token_bucket', 30, 60), 'email': ('sliding_window', 10, 15 * 60)},
+    'register': {'ip': ('sliding_window', 20, 60 * 60), 'email': ('sliding_window', 5, 60 * 60)},
+    'logout': {'ip': ('token_bucket', 60, 60), 'email': ('token_bucket', 10, 60)},
+    'refresh': {'ip': ('token_bucket', 60, 60)},
+}
+AUTH_THROTTLE_MAX_KEYS = 100000  # per limit; the least recently seen are forgotten
+# Auth requests in flight at once: beyond AUTH_MAX_IN_FLIGHT requests are
+# shed with 503, beyond AUTH_MAX_IN_FLIGHT_PER_CLIENT from one IP with 429
+AUTH_MAX_IN_FLIGHT = 64
+AUTH_MAX_IN_FLIGHT_PER_CLIENT = 4
+AUTH_SHED_RETRY_AFTER = 1
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -99,15 +198,60 @@ AUTH_PASSWORD_VALIDATORS = [
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user_registration.api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Keyset pagination: no COUNT(*), deep pages cost the same as the first
+    'DEFAULT_PAGINATION_CLASS': 'user_registration.api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    # JSON stays the default; MessagePack only when the package is installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'user_registration.api.renderers.FastJSONRenderer',
+        *(['user_registration.api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Proxies in front of the app that append to X-Forwarded-For. Unset,
+    # throttles tell clients apart by REMOTE_ADDR alone.
+    'NUM_PROXIES': int(os.environ['CAREERAI_NUM_PROXIES']) if os.environ.get('CAREERAI_NUM_PROXIES') else None,
 }
 
+# Brotli level for responses when the brotli package is installed (0-11;
+# higher levels cost far more CPU for little gain on small JSON bodies)
+BROTLI_QUALITY = 5
+
+# Users resolved from access tokens are cached per process. Saving or
+# deleting a user bumps its version in the default cache, which drops the
+# entries of every process sharing it; with the per-process default cache,
+# other processes may still accept a deactivated or deleted user for up to
+# JWT_USER_CACHE_TTL.
+JWT_USER_CACHE_SIZE = 10000
+JWT_USER_CACHE_TTL = 60  # seconds
+
+# Refresh tokens are checked against an in-process blacklist cache, which
+# reads new blacklist rows at most every TOKEN_BLACKLIST_SYNC_INTERVAL seconds.
+# Each read reaches back TOKEN_BLACKLIST_SYNC_OVERLAP seconds before the last
+# one, covering rows that commit late or clocks that disagree by that much.
+TOKEN_BLACKLIST_SYNC_INTERVAL = 5
+TOKEN_BLACKLIST_SYNC_OVERLAP = 60
+TOKEN_BLACKLIST_REBUILD_INTERVAL = 60 * 60
+
+# Candidate matching and faceted search use a per-process bitmap index of
+# profiles; changes from other processes appear after this many seconds
+PROFILE_INDEX_REBUILD_INTERVAL = 10 * 60
+
+# "Similar profiles" signatures are refreshed by a background thread once
+# profile changes commit, rather than in the committing request. Untuned
+# SQLite fails writes that race that thread instead of waiting, so it only
+# runs there with CAREERAI_SQLITE_TUNED.
+PROFILE_SIGNATURE_REFRESH_IN_BACKGROUND = SQLITE_TUNED
+
+# Profiles read (and prefetched) per query by the streaming export
+PROFILE_EXPORT_CHUNK_SIZE = 1000
+
 # JWT token settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -129,6 +273,7 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'user_registration.api.serializers.CachedBlacklistTokenRefreshSerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
     
     'JTI_CLAIM': 'jti',
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from careerai.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('careerai/', include('user_registration.api.urls')),
     path('api-auth/', include('rest_framework.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,13 +1,112 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
 from .models import (
     User, UserProfile, Skill, Company, Location, EducationLevel,
-    EmploymentType, DesiredWorkEnvironment, JobRole
+    EmploymentType, DesiredWorkEnvironment, JobRole, normalize_name
 )
 
-class CustomUserAdmin(UserAdmin):
+# Above any character a prefix can be followed by
+PREFIX_END = '\U0010ffff'
+
+
+def _estimated_rows(model, using):
+    """Estimate the rows of ``model``'s table without scanning it."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return int(row[0])
+    # Read from the primary key index; deleted rows make it an overestimate
+    return model._default_manager.using(using).aggregate(rows=Max('pk'))['rows'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts an unfiltered changelist of more than ``count_limit`` rows from
+    table statistics, and a filtered one only up to ``count_limit`` rows,
+    so no page load counts a large table. A filtered count that reaches the
+    limit is a lower bound: asking for its last page, or one past it,
+    counts on through the page after it, so deeper pages stay reachable.
+    """
+    count_limit = 10000
+    # Whether ``count`` stopped at its limit
+    capped = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = _estimated_rows(queryset.model, queryset.db)
+            if estimate > self.count_limit:
+                return estimate
+        return self._count_up_to(self.count_limit)
+
+    def _count_up_to(self, limit):
+        count = self.object_list.order_by()[:limit].count()
+        self.capped = count >= limit
+        return count
+
+    def validate_number(self, number):
+        try:
+            wanted = int(number)
+        except (TypeError, ValueError):
+            wanted = 0
+        if self.count and self.capped and wanted * self.per_page >= self.count:
+            self.count = self._count_up_to((wanted + 1) * self.per_page)
+            self.__dict__.pop('num_pages', None)
+        return super().validate_number(number)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Admin for tables too large to count or scan on each page load.
+
+    Changelists of at most ``search_scan_limit`` rows (after filtering) are
+    searched like the stock admin, case-insensitively anywhere in the
+    fields. Larger ones match ``search_fields`` by prefix with range
+    lookups, which every backend answers from the fields' indexes
+    (``icontains`` and even ``istartswith`` scan the table): ``name_key``
+    fields are compared with the normalized term, the others with the term
+    as typed or lowercased, so mixed-case values are only found by a term
+    typed in their case.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_scan_limit = 1000
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if queryset.order_by()[:self.search_scan_limit + 1].count() <= self.search_scan_limit:
+            return super().get_search_results(request, queryset, search_term)
+        condition = Q()
+        for field in self.get_search_fields(request):
+            if field.split('__')[-1] == 'name_key':
+                prefixes = {normalize_name(term)}
+            else:
+                prefixes = {term, term.lower()}
+            for prefix in prefixes:
+                condition |= Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + PREFIX_END})
+        return queryset.filter(condition), False
+
+
+class ReferenceAdmin(LargeTableAdmin):
+    list_display = ('name',)
+    search_fields = ('name_key',)
+    ordering = ('name_key',)
+
+
+class CustomUserAdmin(LargeTableAdmin, UserAdmin):
     list_display = ('email', 'username', 'first_name', 'last_name', 'is_staff', 'is_profile_completed')
-    search_fields = ('email', 'username', 'first_name', 'last_name')
+    search_fields = ('email', 'username')
     readonly_fields = ('date_joined', 'last_login')
     
     fieldsets = (
@@ -26,35 +125,45 @@ class CustomUserAdmin(UserAdmin):
     ordering = ('email',)
 
 
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(LargeTableAdmin):
     list_display = ('user', 'location', 'employment_status', 'preferred_employment_type', 'is_actively_job_searching')
-    search_fields = ('user__email', 'user__username', 'location__name')
+    list_select_related = ('user', 'location', 'preferred_employment_type')
+    search_fields = ('user__email', 'user__username', 'location__name_key')
     list_filter = ('employment_status', 'is_actively_job_searching')
+    # Choices are searched for instead of rendered in full
+    autocomplete_fields = (
+        'user', 'location', 'preferred_employment_type', 'education_level',
+        'desired_work_environments', 'companies_of_interest', 'job_roles_of_interest', 'skills',
+    )
 
 
-class SkillAdmin(admin.ModelAdmin):
-    list_display = ('name',)
-    search_fields = ('name',)
+class SkillAdmin(ReferenceAdmin):
+    pass
 
 
-class CompanyAdmin(admin.ModelAdmin):
-    list_display = ('name',)
-    search_fields = ('name',)
+class CompanyAdmin(ReferenceAdmin):
+    pass
 
 
-class LocationAdmin(admin.ModelAdmin):
-    list_display = ('name',)
-    search_fields = ('name',)
+class LocationAdmin(ReferenceAdmin):
+    pass
 
 
-class EducationLevelAdmin(admin.ModelAdmin):
-    list_display = ('name',)
-    search_fields = ('name',)
+class EducationLevelAdmin(ReferenceAdmin):
+    pass
 
 
-class EmploymentTypeAdmin(admin.ModelAdmin):
-    list_display = ('name',)
+class EmploymentTypeAdmin(ReferenceAdmin):
+    pass
+
+
+class DesiredWorkEnvironmentAdmin(ReferenceAdmin):
     search_fields = ('name',)
+    ordering = ('name',)
+
+
+class JobRoleAdmin(ReferenceAdmin):
+    pass
 
 
 admin.site.register(User, CustomUserAdmin)
@@ -64,5 +173,5 @@ admin.site.register(Company, CompanyAdmin)
 admin.site.register(Location, LocationAdmin)
 admin.site.register(EducationLevel, EducationLevelAdmin)
 admin.site.register(EmploymentType, EmploymentTypeAdmin)
-admin.site.register(DesiredWorkEnvironment)
-admin.site.register(JobRole)
\ No newline at end of file
+admin.site.register(DesiredWorkEnvironment, DesiredWorkEnvironmentAdmin)
+admin.site.register(JobRole, JobRoleAdmin)
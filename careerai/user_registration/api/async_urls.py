@@ -0,0 +1,25 @@
+"""
+Routes for GETs served over ASGI, resolved ahead of ``urls`` by
+``careerai.middleware.AsyncRoutesMiddleware``. JSON reads with a bearer
+token run async; reverse() still resolves the router's names.
+"""
+from django.urls import path, re_path
+
+from user_registration.api import async_views
+from user_registration.api.urls import router, router_views
+from user_registration.api.views import ConditionalListMixin
+
+urlpatterns = [
+    path('users/me/', async_views.read_view(async_views.user_me, router_views['user-me'])),
+    path('profiles/me/', async_views.read_view(async_views.profile_me, router_views['userprofile-me'])),
+    re_path(r'^profiles/(?P<pk>[0-9]+)/$', async_views.read_view(
+        async_views.profile_detail, router_views['userprofile-detail'], replica=True
+    )),
+    *(
+        path(f'{prefix}/', async_views.read_view(
+            async_views.reference_list(viewset), router_views[f'{basename}-list'], replica=True
+        ))
+        for prefix, viewset, basename in router.registry
+        if issubclass(viewset, ConditionalListMixin)
+    ),
+]
@@ -0,0 +1,361 @@
+"""
+Async views for endpoints that are served natively under ASGI.
+
+``register`` and ``login`` are routed ahead of the DRF router in
+``user_registration.api.urls``; under WSGI Django still runs them, bridged
+through ``async_to_sync``. The read views are only routed for GETs over
+ASGI, in ``user_registration.api.async_urls``.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import IntegrityError
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAcceptable, NotFound
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from careerai import db_router
+from user_registration import throttling
+from user_registration.hashing import HashPoolSaturated, get_pool
+from user_registration.models import User
+from user_registration.reference_data import get_columns as get_reference_columns
+from user_registration.api import conditional, fast_serializers
+from user_registration.api.authentication import CachedJWTAuthentication
+from user_registration.api.renderers import FastJSONRenderer
+from user_registration.api.serializers import UserSerializer
+from user_registration.api.views import REFERENCE_LAYOUTS, list_validators, profile_validators
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise BadRequest("Malformed JSON body")
+        if not isinstance(data, dict):
+            raise BadRequest("Expected a JSON object")
+        return data
+    return request.POST.dict()
+
+
+def _error(message, status_code, **headers):
+    response = JsonResponse({"error": message}, status=status_code)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def _service_busy():
+    return _error(
+        "Server is busy, please retry shortly",
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+        **{'Retry-After': str(getattr(settings, 'PASSWORD_HASH_RETRY_AFTER', 1))}
+    )
+
+
+def _throttled(retry_after):
+    return _error(
+        "Too many requests, please retry later",
+        status.HTTP_429_TOO_MANY_REQUESTS,
+        **{'Retry-After': str(retry_after)}
+    )
+
+
+def _verify_password(user, password):
+    """
+    Check ``password`` on a hashing thread, returning ``(valid, rehashed)``.
+
+    ``rehashed`` holds a new encoded password when the stored hash uses
+    outdated parameters, so the caller can save it outside the pool.
+    """
+    rehashed = []
+    valid = check_password(password, user.password, setter=lambda raw: rehashed.append(make_password(raw)))
+    return valid, (rehashed[0] if rehashed else None)
+
+
+@csrf_exempt
+@require_POST
+@throttling.shed_load
+async def register(request):
+    # Throttled IPs are turned away before the body is parsed; the request
+    # counts against the IP and email limits once both allow it
+    ip = throttling.client_ip(request)
+    retry_after = throttling.throttle('register', consume=False, ip=ip)
+    if retry_after:
+        return _throttled(retry_after)
+    try:
+        data = _request_data(request)
+    except BadRequest as e:
+        return _error(str(e), status.HTTP_400_BAD_REQUEST)
+    email = data.get("email")
+    retry_after = throttling.throttle('register', ip=ip, email=email if isinstance(email, str) else None)
+    if retry_after:
+        return _throttled(retry_after)
+
+    serializer = UserSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    validated = serializer.validated_data
+    try:
+        password = await get_pool().run(make_password, validated['password'])
+    except HashPoolSaturated:
+        return _service_busy()
+
+    # Same normalization as UserManager.create_user
+    user = User(
+        email=User.objects.normalize_email(validated['email']),
+        username=User.normalize_username(validated['username']),
+        password=password,
+    )
+    try:
+        await user.asave()
+    except IntegrityError:
+        # Lost a race with a concurrent registration
+        return JsonResponse(
+            {"email": ["user with this email address already exists."]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return JsonResponse({
+        "user": UserSerializer(user).data,
+        "message": "User created successfully"
+    }, status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+@require_POST
+@throttling.shed_load
+async def login(request):
+    """
+    Authenticates like ``ModelBackend`` (the only configured backend), with
+    the password check running on the hashing pool.
+    """
+    ip = throttling.client_ip(request)
+    retry_after = throttling.throttle('login', consume=False, ip=ip)
+    if retry_after:
+        return _throttled(retry_after)
+    try:
+        data = _request_data(request)
+    except BadRequest as e:
+        return _error(str(e), status.HTTP_400_BAD_REQUEST)
+
+    email = data.get("email")
+    password = data.get("password")
+    if not email or not password:
+        return _error("Please provide both email and password", status.HTTP_400_BAD_REQUEST)
+    retry_after = throttling.throttle('login', ip=ip, email=email if isinstance(email, str) else None)
+    if retry_after:
+        return _throttled(retry_after)
+
+    user = await User.objects.filter(**{User.USERNAME_FIELD: email}).afirst()
+    try:
+        if user is None:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            await get_pool().run(make_password, password)
+            valid = False
+        else:
+            valid, rehashed = await get_pool().run(_verify_password, user, password)
+    except HashPoolSaturated:
+        return _service_busy()
+
+    if not valid or not user.is_active:
+        return _error("Invalid credentials", status.HTTP_401_UNAUTHORIZED)
+
+    if rehashed:
+        user.password = rehashed
+        await user.asave(update_fields=['password'])
+
+    refresh = await sync_to_async(RefreshToken.for_user)(user)
+
+    return JsonResponse({
+        "user": UserSerializer(user).data,
+        "refresh": str(refresh),
+        "access": str(refresh.access_token)
+    })
+
+
+# Async read views
+#
+# GETs answered with compact JSON to a bearer token are served by the
+# handlers below, reading through the async ORM. Other GETs, such as the
+# browsable API, MessagePack or session auth, go to the DRF view the route
+# would otherwise have reached, so both paths answer with the same bodies
+# and validators. Other methods never reach these views.
+
+_authenticator = CachedJWTAuthentication()
+_negotiator = DefaultContentNegotiation()
+
+
+def _json_renderer(request):
+    """The renderer DRF would pick, if it is ``FastJSONRenderer`` without indent."""
+    renderers = [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES]
+    try:
+        renderer, media_type = _negotiator.select_renderer(request, renderers)
+    except NotAcceptable:
+        return None
+    if type(renderer) is not FastJSONRenderer or renderer.get_indent(media_type, {}):
+        return None
+    return renderer
+
+
+def _respond(renderer, data, status_code=status.HTTP_200_OK, headers=None):
+    response = HttpResponse(
+        b'' if data is None else renderer.render(data),
+        content_type=None if data is None else renderer.media_type,
+        status=status_code, headers=headers
+    )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def _not_modified(renderer, etag, last_modified):
+    return _respond(
+        renderer, None, status.HTTP_304_NOT_MODIFIED,
+        conditional.validator_headers(etag, last_modified)
+    )
+
+
+def read_view(handler, fallback, replica=False):
+    """
+    Serve JSON GETs with the async ``handler(request, renderer, **kwargs)``
+    and other GETs with the DRF view ``fallback``. A handler returning None
+    also hands the request over. With ``replica``, reads go to the
+    replica like ``ReplicaReadMixin`` sends them.
+    """
+    delegate = sync_to_async(fallback)
+
+    @csrf_exempt
+    async def view(request, **kwargs):
+        response = await _serve(handler, fallback, replica, request, kwargs)
+        if response is None:
+            response = await delegate(request, **kwargs)
+        return response
+
+    # Read by PerformanceMiddleware to label the metrics
+    view.actions = getattr(fallback, 'actions', {})
+    return view
+
+
+def _drf_view(fallback, request, kwargs):
+    # The view DRF would run, for its permission checks
+    view = fallback.cls(**fallback.initkwargs)
+    view.action_map = fallback.actions
+    view.action = fallback.actions.get('get')
+    view.request, view.args, view.kwargs, view.format_kwarg = request, (), kwargs, None
+    return view
+
+
+async def _serve(handler, fallback, replica, http_request, kwargs):
+    request = Request(http_request, parser_context={'args': (), 'kwargs': kwargs})
+    request.parser_context['view'] = view = _drf_view(fallback, request, kwargs)
+    renderer = _json_renderer(request)
+    if renderer is None:
+        return None
+    try:
+        auth = await _authenticator.aauthenticate(http_request)
+    except AuthenticationFailed:
+        # DRF builds the 401, with its WWW-Authenticate header
+        return None
+    if auth is None:
+        return None
+    request.user, request.auth = auth
+
+    if replica and db_router.replica_alias() and not db_router.is_pinned(request.user):
+        db_router.allow_replica_reads()
+    try:
+        view.check_permissions(request)
+        return await handler(request, renderer, **kwargs)
+    except APIException as exc:
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return _respond(renderer, detail, exc.status_code)
+
+
+async def user_me(request, renderer):
+    return _respond(renderer, fast_serializers.render_user(request.user))
+
+
+def _is_conditional(request):
+    # Clients sending validators usually get a 304, so reads only needed for
+    # the body wait for the check
+    return 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers
+
+
+async def profile_detail(request, renderer, pk):
+    rows, snapshot, m2m = await fast_serializers.aread_profiles(relations=not _is_conditional(request), pk=pk)
+    if not rows:
+        raise NotFound()
+    request.parser_context['view'].check_object_permissions(request, fast_serializers.profile_instance(rows[0]))
+
+    etag, last_modified = profile_validators(renderer.format, rows[0], snapshot[0])
+    if conditional.is_not_modified(request, etag, last_modified):
+        return _not_modified(renderer, etag, last_modified)
+    data = await fast_serializers.arender_rows(rows, snapshot, m2m)
+    return _respond(renderer, data[0], headers=conditional.validator_headers(etag, last_modified))
+
+
+async def profile_me(request, renderer):
+    layout = request.query_params.get('reference_layout', 'rows')
+    if layout not in REFERENCE_LAYOUTS:
+        return None
+
+    rows, snapshot, m2m = await fast_serializers.aread_profiles(
+        relations=not _is_conditional(request), user=request.user
+    )
+    if not rows:
+        # The DRF view creates the profile
+        return None
+
+    version, reference_data = snapshot
+    etag, last_modified = profile_validators(renderer.format, rows[0], version, layout)
+    if conditional.is_not_modified(request, etag, last_modified):
+        return _not_modified(renderer, etag, last_modified)
+
+    if layout == 'columns':
+        reference_data = get_reference_columns(version, reference_data)
+    profile = await fast_serializers.arender_rows(rows, snapshot, m2m)
+    return _respond(renderer, {
+        'profile': profile[0],
+        'reference_data': reference_data
+    }, headers=conditional.validator_headers(etag, last_modified))
+
+
+def reference_list(viewset):
+    """An async ``list`` handler for a reference ``viewset``."""
+    model = viewset.queryset.model
+    fields = viewset.serializer_class.Meta.fields
+
+    async def handler(request, renderer):
+        # As ConditionalListMixin: replica pages are validated by their rows
+        from_replica = db_router.reads_from_replica()
+        if not from_replica:
+            etag, last_modified = list_validators(model, renderer.format, request.get_full_path())
+            if conditional.is_not_modified(request, etag, last_modified):
+                return _not_modified(renderer, etag, last_modified)
+
+        # The serializers render these columns unchanged; .values() rows
+        # skip building the instances and the serializer fields
+        paginator = viewset.pagination_class()
+        page = await paginator.apaginate_queryset(viewset.queryset.values(*fields), request)
+        data = paginator.get_paginated_data(page)
+        if from_replica:
+            last_modified = None
+            etag = conditional.data_etag(renderer.format, request.get_full_path(), data=data)
+            if conditional.is_not_modified(request, etag):
+                return _not_modified(renderer, etag, last_modified)
+        return _respond(renderer, data, headers=conditional.validator_headers(etag, last_modified))
+
+    return handler
@@ -0,0 +1,134 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from careerai.metrics import timed
+
+
+class UserCache:
+    """
+    Size-bounded LRU of resolved users with a short time-to-live.
+
+    Entries are keyed by ``(user_id, token iat)`` and indexed by user id, so
+    every entry for a user can be dropped when that user changes. Each entry
+    also holds the user's version in the default cache, read before the
+    user was; ``invalidate_user`` bumps it, so other processes sharing that
+    cache drop their entries at their next lookup. With a per-process cache
+    they keep them for up to ``ttl`` seconds.
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires at, version, user)
+        self._keys_by_user = {}
+
+    def get(self, key):
+        """Return ``(user or None, version)``; pass the version to ``set``."""
+        version = cache.get(self._version_key(key[0]))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, version
+            expires_at, entry_version, user = entry
+            if expires_at < time.monotonic() or entry_version != version:
+                self._discard(key)
+                return None, version
+            self._entries.move_to_end(key)
+            return user, version
+
+    def set(self, key, user, version):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, version, user)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        # Letting the version expire is safe: entries stored under it stop
+        # matching once it is gone
+        cache.set(self._version_key(str(user_id)), time.time_ns(), self.ttl)
+        with self._lock:
+            for key in list(self._keys_by_user.get(str(user_id), ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    @staticmethod
+    def _version_key(user_id):
+        return f'jwt_user:version:{user_id}'
+
+    def _discard(self, key):
+        if self._entries.pop(key, None) is None:
+            return
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'JWT_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 60),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that resolves users through ``user_cache``.
+
+    A cached user was already checked by ``JWTAuthentication.get_user`` for
+    the same token, so repeat requests skip the ``User`` lookup entirely.
+    Entries are dropped when the user is saved or deleted and on logout, in
+    every process when the default cache is shared (see ``UserCache``).
+    """
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+    
+    async def aauthenticate(self, request):
+        """
+        Async ``authenticate``: the token is checked on the event loop and
+        only users missing from ``user_cache`` are read, in a thread.
+        """
+        header = self.get_header(request)
+        raw_token = None if header is None else self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        with timed('auth'):
+            validated_token = self.get_validated_token(raw_token)
+            key = self._cache_key(validated_token)
+            user, version = user_cache.get(key)
+        if user is None:
+            user = await sync_to_async(super().get_user)(validated_token)
+            user_cache.set(key, user, version)
+        return copy.copy(user), validated_token
+    
+    def get_user(self, validated_token):
+        key = self._cache_key(validated_token)
+        user, version = user_cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(key, user, version)
+        # Views may modify request.user; keep the cached instance pristine
+        return copy.copy(user)
+    
+    def _cache_key(self, validated_token):
+        try:
+            return (str(validated_token[api_settings.USER_ID_CLAIM]), validated_token.get('iat'))
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
@@ -0,0 +1,54 @@
+"""
+Conditional GET helpers.
+
+Validators are built from version stamps (a profile's ``updated_at``, the
+reference table versions) rather than the rendered body, so answering with
+a 304 costs neither serialization nor the queries behind it. Lists read
+from a replica, which may lag the version stamps, are the exception: their
+validators come from the rows read (``data_etag``).
+"""
+import hashlib
+import json
+
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """A quoted ETag for the version stamps in ``parts``."""
+    return quote_etag(hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+def data_etag(*parts, data):
+    """A quoted ETag for ``parts`` and the JSON-serializable ``data`` itself."""
+    return make_etag(*parts, json.dumps(data, sort_keys=True, default=str))
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """
+    Whether the client's copy is current. ``If-None-Match`` is compared
+    weakly, since compressing middleware weakens ETags, and takes precedence
+    over ``If-Modified-Since`` when both are sent.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        etags = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+        return '*' in etags or etag.removeprefix('W/') in etags
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if last_modified is not None and if_modified_since:
+        since = parse_http_date_safe(if_modified_since)
+        return since is not None and int(last_modified) <= since
+    return False
+
+
+def validator_headers(etag, last_modified=None):
+    """``ETag`` and, given a POSIX timestamp, ``Last-Modified`` headers."""
+    headers = {'ETag': etag}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def not_modified(etag, last_modified=None):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag, last_modified))
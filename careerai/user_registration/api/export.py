@@ -0,0 +1,157 @@
+"""
+Streaming profile export as NDJSON or CSV.
+
+Profiles are walked in id order with ``.iterator(chunk_size=...)``; related
+names are prefetched per chunk and every chunk is written out as soon as it
+is read, so memory stays flat and the first bytes go out immediately. The
+columns match ``manage.py import_profiles``, with names for references and
+``;``-separated lists in CSV (see ``join_list``).
+
+Each format has a sync generator for WSGI and an async one (``astream_*``,
+over ``.aiterator()``) for ASGI, where Django would read a sync generator
+to the end before sending anything.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from user_registration.models import UserProfile
+
+LIST_SEPARATOR = ';'
+
+COLUMNS = (
+    'id', 'email', 'username', 'location', 'employment_status', 'education_level',
+    'preferred_employment_type', 'years_of_experience', 'is_actively_job_searching',
+    'career_vision', 'portfolio_url', 'skills', 'companies_of_interest',
+    'job_roles_of_interest', 'desired_work_environments', 'created_at', 'updated_at',
+)
+FOREIGN_KEYS = ('location', 'education_level', 'preferred_employment_type')
+MANY_TO_MANY = ('skills', 'companies_of_interest', 'job_roles_of_interest', 'desired_work_environments')
+
+
+def _queryset():
+    return (
+        UserProfile.objects.order_by('id')
+        .select_related('user', *FOREIGN_KEYS)
+        .only(
+            'id', 'user__email', 'user__username', 'employment_status', 'years_of_experience',
+            'is_actively_job_searching', 'career_vision', 'portfolio_url', 'created_at', 'updated_at',
+            *(f'{field}__name' for field in FOREIGN_KEYS),
+        )
+        .prefetch_related(*(
+            Prefetch(field, queryset=UserProfile._meta.get_field(field).related_model.objects.only('id', 'name'))
+            for field in MANY_TO_MANY
+        ))
+    )
+
+
+def _row(profile):
+    row = {
+        'id': profile.pk,
+        'email': profile.user.email,
+        'username': profile.user.username,
+        'employment_status': profile.employment_status,
+        'years_of_experience': profile.years_of_experience,
+        'is_actively_job_searching': profile.is_actively_job_searching,
+        'career_vision': profile.career_vision,
+        'portfolio_url': profile.portfolio_url,
+        'created_at': profile.created_at.isoformat(),
+        'updated_at': profile.updated_at.isoformat(),
+    }
+    for field in FOREIGN_KEYS:
+        related = getattr(profile, field)
+        row[field] = related.name if related is not None else None
+    for field in MANY_TO_MANY:
+        row[field] = [obj.name for obj in getattr(profile, field).all()]
+    return row
+
+
+def _chunk_size():
+    return getattr(settings, 'PROFILE_EXPORT_CHUNK_SIZE', 1000)
+
+
+def iter_rows():
+    """Yield lists of row dicts, one list per chunk of profiles."""
+    chunk_size = _chunk_size()
+    rows = []
+    for profile in _queryset().iterator(chunk_size=chunk_size):
+        rows.append(_row(profile))
+        if len(rows) == chunk_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+async def aiter_rows():
+    """Async ``iter_rows``."""
+    chunk_size = _chunk_size()
+    rows = []
+    async for profile in _queryset().aiterator(chunk_size=chunk_size):
+        rows.append(_row(profile))
+        if len(rows) == chunk_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def _ndjson(rows):
+    return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+
+def stream_ndjson():
+    for rows in iter_rows():
+        yield _ndjson(rows)
+
+
+async def astream_ndjson():
+    async for rows in aiter_rows():
+        yield _ndjson(rows)
+
+
+class _Lines:
+    """File-like object handing back what ``csv.writer`` writes."""
+    def write(self, value):
+        return value
+
+
+def join_list(names, separator=LIST_SEPARATOR):
+    """
+    Join ``names`` into one CSV cell. Names holding the separator or a quote
+    are quoted like CSV fields, so ``split_list`` reads them back whole.
+    """
+    return csv.writer(_Lines(), delimiter=separator, lineterminator='').writerow(names)
+
+
+def split_list(value, separator=LIST_SEPARATOR):
+    """Split a CSV cell written by ``join_list`` back into names."""
+    return next(csv.reader([value], delimiter=separator), [])
+
+
+def _csv(writer, rows):
+    return ''.join(
+        writer.writerow([
+            join_list(row[column]) if column in MANY_TO_MANY
+            else '' if row[column] is None else row[column]
+            for column in COLUMNS
+        ])
+        for row in rows
+    )
+
+
+def stream_csv():
+    writer = csv.writer(_Lines())
+    # The header goes out before the first query
+    yield writer.writerow(COLUMNS)
+    for rows in iter_rows():
+        yield _csv(writer, rows)
+
+
+async def astream_csv():
+    writer = csv.writer(_Lines())
+    yield writer.writerow(COLUMNS)
+    async for rows in aiter_rows():
+        yield _csv(writer, rows)
@@ -0,0 +1,220 @@
+"""
+Read-only fast path producing the ``UserProfileDetailSerializer`` JSON shape.
+
+Profiles are read with ``.values()``, their M2M ids with a single ``UNION
+ALL`` over the through tables, and every reference name comes from id-to-name
+maps built once per reference snapshot version. No model instances or DRF
+fields are created per row, which is where the nested serializers spend most
+of their time.
+"""
+from asgiref.sync import sync_to_async
+from rest_framework import serializers
+
+from careerai.metrics import timed
+from user_registration.bulk import aprofile_m2m_ids, profile_m2m_ids
+from user_registration.models import (
+    User, UserProfile, Company, Location, EducationLevel, EmploymentType,
+    DesiredWorkEnvironment, JobRole, Skill
+)
+from user_registration.reference_data import REFERENCE_MODELS, get_snapshot
+from user_registration.api.serializers import UserProfileDetailSerializer, UserSerializer
+
+PROFILE_VALUES = (
+    'id', 'user_id', 'user__email', 'user__username', 'user__is_profile_completed',
+    'location_id', 'employment_status', 'preferred_employment_type_id', 'education_level_id',
+    'years_of_experience', 'career_vision', 'portfolio_url', 'is_actively_job_searching',
+    'created_at', 'updated_at',
+)
+FOREIGN_KEYS = {
+    'location': Location,
+    'preferred_employment_type': EmploymentType,
+    'education_level': EducationLevel,
+}
+MANY_TO_MANY = {
+    'desired_work_environments': DesiredWorkEnvironment,
+    'companies_of_interest': Company,
+    'job_roles_of_interest': JobRole,
+    'skills': Skill,
+}
+
+# Keys in the order the serializers emit them
+DETAIL_FIELDS = UserProfileDetailSerializer.Meta.fields
+USER_FIELDS = tuple(field for field in UserSerializer.Meta.fields if field != 'password')
+DATETIME_FIELDS = ('created_at', 'updated_at')
+
+# DRF's own field, so dates render exactly as the serializers render them
+_datetime = serializers.DateTimeField()
+
+# id -> name maps of the last reference snapshot seen, keyed by model
+_name_maps = (None, None)
+
+
+def reference_names(snapshot=None):
+    """
+    Return ``{model: {id: name}}`` for the current reference snapshot, or
+    for ``snapshot`` when one is given.
+    """
+    global _name_maps
+
+    version, data = snapshot or get_snapshot()
+    maps_version, maps = _name_maps
+    if maps_version != version:
+        maps = {
+            model: {row['id']: row['name'] for row in data[key]}
+            for key, model in REFERENCE_MODELS.items()
+        }
+        _name_maps = (version, maps)
+    return maps
+
+
+def _named(names, model, pk):
+    return {'id': pk, 'name': names[model][pk]}
+
+
+def _missing_names(names, rows, m2m):
+    """``{model: pks}`` of names created after the snapshot was built (rare)."""
+    missing = {}
+    for row in rows:
+        for field, model in FOREIGN_KEYS.items():
+            pk = row[f'{field}_id']
+            if pk is not None and pk not in names[model]:
+                missing.setdefault(model, set()).add(pk)
+    for (_, field), pks in m2m.items():
+        model = MANY_TO_MANY[field]
+        missing.setdefault(model, set()).update(pk for pk in pks if pk not in names[model])
+    return {model: pks for model, pks in missing.items() if pks}
+
+
+def _with_names(names, found):
+    names = {model: dict(mapping) for model, mapping in names.items()}
+    for model, pairs in found.items():
+        names[model].update(pairs)
+    return names
+
+
+def _fill_missing_names(names, rows, m2m):
+    """Read names created after the snapshot was built from the database."""
+    missing = _missing_names(names, rows, m2m)
+    if not missing:
+        return names
+    return _with_names(names, {
+        model: model.objects.filter(pk__in=pks).values_list('id', 'name')
+        for model, pks in missing.items()
+    })
+
+
+async def _afill_missing_names(names, rows, m2m):
+    missing = _missing_names(names, rows, m2m)
+    if not missing:
+        return names
+    return _with_names(names, {
+        model: [pair async for pair in model.objects.filter(pk__in=pks).values_list('id', 'name')]
+        for model, pks in missing.items()
+    })
+
+
+def profile_rows(queryset):
+    """The ``.values()`` rows ``render_rows`` expects."""
+    return list(queryset.values(*PROFILE_VALUES))
+
+
+async def aprofile_rows(queryset):
+    """Async ``profile_rows``."""
+    return [row async for row in queryset.values(*PROFILE_VALUES)]
+
+
+def profile_instance(row):
+    """
+    A ``UserProfile`` (and its user) built from a profile row without a
+    query, for object permission checks. Fields not in the row load on access.
+    """
+    profile = _from_row(UserProfile, row)
+    profile.user = _from_row(User, {
+        'id': row['user_id'],
+        **{field: row[f'user__{field}'] for field in ('email', 'username', 'is_profile_completed')},
+    })
+    return profile
+
+
+def _from_row(model, row):
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in row]
+    return model.from_db(None, names, [row[name] for name in names])
+
+
+def _render(rows, m2m, names):
+    data = []
+    for row in rows:
+        profile_id = row['id']
+        item = {}
+        for field in DETAIL_FIELDS:
+            if field == 'user':
+                item[field] = {
+                    'id': row['user_id'],
+                    'email': row['user__email'],
+                    'username': row['user__username'],
+                    'is_profile_completed': row['user__is_profile_completed'],
+                }
+            elif field in FOREIGN_KEYS:
+                pk = row[f'{field}_id']
+                item[field] = None if pk is None else _named(names, FOREIGN_KEYS[field], pk)
+            elif field in MANY_TO_MANY:
+                model = MANY_TO_MANY[field]
+                item[field] = [_named(names, model, pk) for pk in m2m.get((profile_id, field), ())]
+            elif field in DATETIME_FIELDS:
+                item[field] = _datetime.to_representation(row[field])
+            else:
+                item[field] = row[field]
+        data.append(item)
+    return data
+
+
+def render_rows(rows):
+    """Render profile rows like ``UserProfileDetailSerializer``."""
+    if not rows:
+        return []
+    m2m = profile_m2m_ids([row['id'] for row in rows], MANY_TO_MANY)
+
+    with timed('serialize'):
+        names = _fill_missing_names(reference_names(), rows, m2m)
+        return _render(rows, m2m, names)
+
+
+def _read_profiles(relations, lookup):
+    rows = profile_rows(UserProfile.objects.filter(**lookup))
+    m2m = None
+    if relations:
+        m2m = profile_m2m_ids([row['id'] for row in rows], MANY_TO_MANY) if rows else {}
+    return rows, get_snapshot(), m2m
+
+
+async def aread_profiles(relations=True, **lookup):
+    """
+    Read ``(rows, snapshot, m2m)`` for the profiles matching ``lookup``
+    (``UserProfile`` filter arguments): the rows, the reference snapshot
+    and, with ``relations``, the M2M ids; without ``relations`` ``m2m`` is
+    None. Under ASGI a request's sync_to_async calls all run on its own
+    thread, one after another, so the reads share a single thread switch.
+    """
+    return await sync_to_async(_read_profiles)(relations, lookup)
+
+
+async def arender_rows(rows, snapshot, m2m=None):
+    """Async ``render_rows``, given what ``aread_profiles`` read."""
+    if not rows:
+        return []
+    if m2m is None:
+        m2m = await aprofile_m2m_ids(MANY_TO_MANY, pk__in=[row['id'] for row in rows])
+    names = await _afill_missing_names(reference_names(snapshot), rows, m2m)
+
+    with timed('serialize'):
+        return _render(rows, m2m, names)
+
+
+def render_user(user):
+    """Render ``user`` like ``UserSerializer``."""
+    return {field: getattr(user, field) for field in USER_FIELDS}
+
+
+def render_profiles(queryset):
+    """Render the profiles of ``queryset`` like ``UserProfileDetailSerializer``."""
+    return render_rows(profile_rows(queryset))
@@ -0,0 +1,122 @@
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (cursor) pagination over a fixed, unique ordering.
+
+    A page is selected with ``WHERE (a, b) > (last_a, last_b)`` instead of an
+    ``OFFSET`` and no ``COUNT(*)`` is issued, so deep pages cost the same as the
+    first. The cursor is an opaque, base64-encoded copy of the last row's keys.
+    """
+    ordering = ('id',)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, obj):
+        # obj is a model instance or a .values() row
+        # isoformat() keeps full microsecond precision, unlike DjangoJSONEncoder
+        keys = [
+            value.isoformat() if isinstance(value, (datetime.date, datetime.time)) else value
+            for value in (obj[field] if isinstance(obj, dict) else getattr(obj, field) for field in self.ordering)
+        ]
+        raw = json.dumps(keys, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, model, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            keys = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(keys, list) or len(keys) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, keys)
+            ]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def keyset_filter(self, keys):
+        """Build ``(f1, f2, ...) > (k1, k2, ...)`` as OR-ed equality prefixes."""
+        clauses = []
+        for i, field in enumerate(self.ordering):
+            equal = {name: value for name, value in zip(self.ordering[:i], keys[:i])}
+            clauses.append(Q(**equal, **{f'{field}__gt': keys[i]}))
+        return reduce(or_, clauses)
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size_for_request = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.keyset_filter(self.decode_cursor(queryset.model, cursor)))
+        # One extra row tells whether a next page exists without counting
+        return queryset[:self.page_size_for_request + 1]
+
+    def _take_page(self, rows):
+        self.has_next = len(rows) > self.page_size_for_request
+        page = rows[:self.page_size_for_request]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._take_page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async ``paginate_queryset``."""
+        return self._take_page([obj async for obj in self._page_queryset(queryset, request)])
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ProfileKeysetPagination(KeysetPagination):
+    """Profiles are walked in creation order, with ``id`` breaking ties."""
+    ordering = ('created_at', 'id')
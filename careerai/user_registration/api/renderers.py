@@ -0,0 +1,62 @@
+"""
+Renderers beyond DRF's defaults.
+
+Both encoders are optional dependencies: ``FastJSONRenderer`` falls back to
+the standard encoder without orjson, and ``MessagePackRenderer`` is only
+listed in ``DEFAULT_RENDERER_CLASSES`` when msgpack is installed.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# DRF's encoder handles what the fast encoders do not (lazy strings,
+# Decimal, querysets) and formats dates the way DRF always has
+_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` that encodes with orjson when it is installed.
+
+    The output is compact UTF-8 JSON equal in value to ``JSONRenderer``'s,
+    but not always byte for byte: floats are written in orjson's style
+    (``0.00001`` for ``1e-05``, ``1e16`` for ``1e+16``), and NaN and the
+    infinities become ``null`` rather than failing. Integers beyond 64 bits,
+    which orjson rejects, and indented output, as the browsable API asks
+    for, go through the standard encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, so the body is also valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders MessagePack for clients sending ``Accept: application/msgpack``."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
@@ -1,11 +1,125 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.serializers import LIST_SERIALIZER_KWARGS, LIST_SERIALIZER_KWARGS_REMOVE
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from careerai.metrics import timed
+from user_registration.bulk import profile_m2m_ids
+from user_registration.api.tokens import CachedBlacklistRefreshToken
 from user_registration.models import (
     User, UserProfile, Skill, Company, Location, EducationLevel,
-    EmploymentType, DesiredWorkEnvironment, JobRole
+    EmploymentType, DesiredWorkEnvironment, JobRole, normalize_name
 )
 
 
-class UserSerializer(serializers.ModelSerializer):
+# Set while an outer serializer is timing, so nested ones are not counted twice
+_serializing = ContextVar('serializing', default=False)
+
+
+@contextmanager
+def _timed_representation():
+    token = _serializing.set(True)
+    try:
+        with timed('serialize'):
+            yield
+    finally:
+        _serializing.reset(token)
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """``many=True`` form of ``TimedModelSerializer``, timing the list once."""
+    
+    def to_representation(self, data):
+        if _serializing.get():
+            return super().to_representation(data)
+        with _timed_representation():
+            return super().to_representation(data)
+
+
+class TimedModelSerializer(serializers.ModelSerializer):
+    """``ModelSerializer`` that reports its representation time to the request timings."""
+    
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # As BaseSerializer.many_init, with rows timed as one list rather than one by one
+        list_kwargs = {}
+        for key in LIST_SERIALIZER_KWARGS_REMOVE:
+            value = kwargs.pop(key, None)
+            if value is not None:
+                list_kwargs[key] = value
+        list_kwargs['child'] = cls(*args, **kwargs)
+        list_kwargs.update({key: value for key, value in kwargs.items() if key in LIST_SERIALIZER_KWARGS})
+        return TimedListSerializer(*args, **list_kwargs)
+    
+    def to_representation(self, instance):
+        if _serializing.get():
+            return super().to_representation(instance)
+        with _timed_representation():
+            return super().to_representation(instance)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Looks a list of primary keys up with one ``IN`` query rather than one query per key."""
+    
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for value in data:
+            try:
+                if isinstance(value, bool):
+                    raise DjangoValidationError('')
+                pks.append(pk_field.to_python(value))
+            except DjangoValidationError:
+                child.fail('incorrect_type', data_type=type(value).__name__)
+        pks = list(dict.fromkeys(pks))
+        
+        found = {obj.pk: obj for obj in queryset.filter(pk__in=pks).only('pk')} if pks else {}
+        for pk in pks:
+            if pk not in found:
+                child.fail('does_not_exist', pk_value=pk)
+        return [found[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """``PrimaryKeyRelatedField`` whose ``many=True`` form validates with a single query."""
+    
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+def cache_related_ids(instance, related_ids):
+    """
+    Fill the prefetch cache of each M2M field in ``related_ids`` with pk-only
+    objects, as ``prefetch_related`` would, so rendering ids needs no query.
+    """
+    cache = getattr(instance, '_prefetched_objects_cache', None)
+    if cache is None:
+        cache = instance._prefetched_objects_cache = {}
+    for field, pks in related_ids.items():
+        cache.pop(field, None)
+        queryset = getattr(instance, field).get_queryset()
+        queryset._result_cache = [queryset.model(pk=pk) for pk in pks]
+        queryset._prefetch_done = True
+        cache[field] = queryset
+
+
+class UserSerializer(TimedModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'email', 'username', 'password', 'is_profile_completed')
@@ -20,49 +134,65 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class SkillSerializer(serializers.ModelSerializer):
+class NormalizedNameSerializerMixin:
+    """
+    Rejects names that only differ by case or whitespace from an existing one,
+    matching the unique ``name_key`` instead of failing at the database.
+    """
+    def validate_name(self, value):
+        queryset = self.Meta.model.objects.filter(name_key=normalize_name(value))
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(
+                f"{self.Meta.model._meta.verbose_name.capitalize()} with this name already exists."
+            )
+        return value
+
+
+class SkillSerializer(NormalizedNameSerializerMixin, TimedModelSerializer):
     class Meta:
         model = Skill
         fields = ('id', 'name')
 
 
-class CompanySerializer(serializers.ModelSerializer):
+class CompanySerializer(NormalizedNameSerializerMixin, TimedModelSerializer):
     class Meta:
         model = Company
         fields = ('id', 'name')
 
 
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(NormalizedNameSerializerMixin, TimedModelSerializer):
     class Meta:
         model = Location
         fields = ('id', 'name')
 
 
-class EducationLevelSerializer(serializers.ModelSerializer):
+class EducationLevelSerializer(NormalizedNameSerializerMixin, TimedModelSerializer):
     class Meta:
         model = EducationLevel
         fields = ('id', 'name')
 
 
-class EmploymentTypeSerializer(serializers.ModelSerializer):
+class EmploymentTypeSerializer(NormalizedNameSerializerMixin, TimedModelSerializer):
     class Meta:
         model = EmploymentType
         fields = ('id', 'name')
 
 
-class DesiredWorkEnvironmentSerializer(serializers.ModelSerializer):
+class DesiredWorkEnvironmentSerializer(TimedModelSerializer):
     class Meta:
         model = DesiredWorkEnvironment
         fields = ('id', 'name')
 
 
-class JobRoleSerializer(serializers.ModelSerializer):
+class JobRoleSerializer(NormalizedNameSerializerMixin, TimedModelSerializer):
     class Meta:
         model = JobRole
         fields = ('id', 'name')
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(TimedModelSerializer):
     # IDs for relations
     location_id = serializers.PrimaryKeyRelatedField(
         queryset=Location.objects.all(),
@@ -85,25 +215,25 @@ class UserProfileSerializer(serializers.ModelSerializer):
         allow_null=True
     )
     
-    desired_work_environments = serializers.PrimaryKeyRelatedField(
+    desired_work_environments = BulkPrimaryKeyRelatedField(
         queryset=DesiredWorkEnvironment.objects.all(),
         many=True,
         required=False
     )
     
-    companies_of_interest = serializers.PrimaryKeyRelatedField(
+    companies_of_interest = BulkPrimaryKeyRelatedField(
         queryset=Company.objects.all(),
         many=True,
         required=False
     )
     
-    job_roles_of_interest = serializers.PrimaryKeyRelatedField(
+    job_roles_of_interest = BulkPrimaryKeyRelatedField(
         queryset=JobRole.objects.all(),
         many=True,
         required=False
     )
     
-    skills = serializers.PrimaryKeyRelatedField(
+    skills = BulkPrimaryKeyRelatedField(
         queryset=Skill.objects.all(),
         many=True,
         required=False
@@ -119,9 +249,75 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         )
         read_only_fields = ('user', 'created_at', 'updated_at')
+    
+    m2m_fields = ('desired_work_environments', 'companies_of_interest', 'job_roles_of_interest', 'skills')
+    
+    def create(self, validated_data):
+        relations = {field: validated_data.pop(field, []) for field in self.m2m_fields}
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            for field, objs in relations.items():
+                if objs:
+                    getattr(instance, field).add(*objs)
+        cache_related_ids(instance, {field: [obj.pk for obj in objs] for field, objs in relations.items()})
+        return instance
+    
+    def update(self, instance, validated_data):
+        """
+        Write only what changed: the changed columns with ``update_fields``,
+        and the added and removed rows of each M2M field through ``add`` and
+        ``remove``, so ``m2m_changed`` receivers still see every change.
+        """
+        relations = {field: validated_data.pop(field) for field in self.m2m_fields if field in validated_data}
+        
+        changed = []
+        for attr, value in validated_data.items():
+            model_field = instance._meta.get_field(attr)
+            new = value.pk if model_field.is_relation and value is not None else value
+            if getattr(instance, model_field.attname) != new:
+                setattr(instance, attr, value)
+                changed.append(attr)
+        
+        with transaction.atomic():
+            current = profile_m2m_ids([instance.pk], self.m2m_fields)
+            related_ids, diffs = {}, {}
+            for field in self.m2m_fields:
+                old = current.get((instance.pk, field), [])
+                if field not in relations:
+                    related_ids[field] = old
+                    continue
+                new = [obj.pk for obj in relations[field]]
+                removed = set(old).difference(new)
+                kept = set(old)
+                added = [pk for pk in new if pk not in kept]
+                related_ids[field] = [pk for pk in old if pk not in removed] + added
+                if removed or added:
+                    diffs[field] = (removed, added)
+            
+            if changed or diffs:
+                # updated_at moves on M2M-only changes too; conditional requests rely on it
+                instance.save(update_fields=[*changed, 'updated_at'])
+            for field, (removed, added) in diffs.items():
+                manager = getattr(instance, field)
+                if removed:
+                    manager.remove(*removed)
+                if added:
+                    manager.add(*added)
+        
+        cache_related_ids(instance, related_ids)
+        return instance
+
+
+class ProfileRelationDeltaSerializer(serializers.Serializer):
+    """The ``ids`` to add to or remove from one M2M field of a profile."""
+    ids = BulkPrimaryKeyRelatedField(many=True, queryset=Skill.objects.none(), allow_empty=False)
+    
+    def __init__(self, *args, related_model, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['ids'].child_relation.queryset = related_model.objects.all()
 
 
-class UserProfileDetailSerializer(serializers.ModelSerializer):
+class UserProfileDetailSerializer(TimedModelSerializer):
     user = UserSerializer(read_only=True)
     location = LocationSerializer(read_only=True)
     education_level = EducationLevelSerializer(read_only=True)
@@ -139,4 +335,8 @@ class UserProfileDetailSerializer(serializers.ModelSerializer):
             'companies_of_interest', 'job_roles_of_interest', 'skills', 
             'career_vision', 'portfolio_url', 'is_actively_job_searching',
             'created_at', 'updated_at'
-        )
\ No newline at end of file
+        )
+
+
+class CachedBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
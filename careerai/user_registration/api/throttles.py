@@ -0,0 +1,28 @@
+from rest_framework.throttling import BaseThrottle
+
+from user_registration import throttling
+
+
+class AuthThrottle(BaseThrottle):
+    """
+    Applies the in-process ``AUTH_THROTTLES[scope]`` limits per client IP
+    and, once the request is authenticated, per user email.
+    """
+    scope = None
+
+    def allow_request(self, request, view):
+        user = getattr(request, 'user', None)
+        email = user.email if user is not None and user.is_authenticated else None
+        self.retry_after = throttling.throttle(self.scope, ip=throttling.client_ip(request), email=email)
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
+
+
+class LogoutThrottle(AuthThrottle):
+    scope = 'logout'
+
+
+class TokenRefreshThrottle(AuthThrottle):
+    scope = 'refresh'
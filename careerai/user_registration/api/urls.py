@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
+from user_registration import throttling
+from user_registration.api import async_views
+from user_registration.api.throttles import TokenRefreshThrottle
 from user_registration.api.views import (
     UserViewSet, UserProfileViewSet, SkillViewSet,
     CompanyViewSet, LocationViewSet, EducationLevelViewSet,
@@ -18,7 +21,17 @@ router.register(r'employment-types', EmploymentTypeViewSet)
 router.register(r'work-environments', DesiredWorkEnvironmentViewSet)
 router.register(r'job-roles', JobRoleViewSet)
 
+# The router's views, which async_urls wraps and the async read views fall back to
+router_views = {pattern.name: pattern.callback for pattern in router.urls if pattern.name}
+
 urlpatterns = [
+    # Password hashing endpoints run async, ahead of the router's routes
+    path('users/register/', async_views.register, name='user-register'),
+    path('users/login/', async_views.login, name='user-login'),
+    # The other auth endpoints share the in-flight budget
+    path('users/logout/', throttling.shed_load(router_views['user-logout'])),
     path('', include(router.urls)),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', throttling.shed_load(
+        TokenRefreshView.as_view(throttle_classes=[TokenRefreshThrottle])
+    ), name='token_refresh'),
 ]
\ No newline at end of file
@@ -1,15 +1,33 @@
-from rest_framework import viewsets, status, permissions, serializers
+from rest_framework import viewsets, status, serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
+from rest_framework.exceptions import NotFound
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.permissions import IsAdminUser
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
+from careerai import db_router
 from user_registration.models import (
     User, UserProfile, Skill, Company, Location, EducationLevel,
     EmploymentType, DesiredWorkEnvironment, JobRole
 )
+from user_registration import autocomplete, facets, matching, similarity
+from user_registration.bulk import bulk_get_or_create, invalid_names
+from user_registration.reference_data import (
+    get_snapshot as get_reference_snapshot, get_columns as get_reference_columns,
+    table_version_token, version_seen_at
+)
+from user_registration.api import conditional, export, fast_serializers
+from user_registration.api.authentication import user_cache
+from user_registration.api.throttles import LogoutThrottle
+from user_registration.api.tokens import CachedBlacklistRefreshToken
+from user_registration.api.pagination import ProfileKeysetPagination
 from user_registration.api.serializers import (
-    UserSerializer, UserProfileSerializer, UserProfileDetailSerializer,
+    UserSerializer, UserProfileSerializer, UserProfileDetailSerializer, ProfileRelationDeltaSerializer,
     SkillSerializer, CompanySerializer, LocationSerializer, EducationLevelSerializer,
     EmploymentTypeSerializer, DesiredWorkEnvironmentSerializer, JobRoleSerializer
 )
@@ -19,50 +37,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     
-    def get_permissions(self):
-        if self.action in ['register', 'login']:
-            return [permissions.AllowAny()]
-        return [permissions.IsAuthenticated()]
-    
-    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
-    def register(self, request):
-        serializer = self.serializer_class(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save()
-            return Response({
-                "user": UserSerializer(user, context={"request": request}).data,
-                "message": "User created successfully"
-            }, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
-    def login(self, request):
-        email = request.data.get("email")
-        password = request.data.get("password")
-        
-        if not email or not password:
-            return Response(
-                {"error": "Please provide both email and password"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        user = authenticate(email=email, password=password)
-        
-        if not user:
-            return Response(
-                {"error": "Invalid credentials"},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-        
-        refresh = RefreshToken.for_user(user)
-        
-        return Response({
-            "user": UserSerializer(user).data,
-            "refresh": str(refresh),
-            "access": str(refresh.access_token)
-        })
-    
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_classes=[LogoutThrottle])
     def logout(self, request):
         try:
             refresh_token = request.data.get("refresh")
@@ -72,8 +47,9 @@ class UserViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
                 
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             token.blacklist()
+            user_cache.invalidate_user(request.user.pk)
             
             return Response(
                 {"message": "Logout successful"},
@@ -91,15 +67,152 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+# Relations rendered by the profile serializers, loaded up front so that
+# serializing a page costs a constant number of queries
+PROFILE_RELATED_FIELDS = ('user', 'location', 'education_level', 'preferred_employment_type')
+PROFILE_M2M_FIELDS = ('desired_work_environments', 'companies_of_interest', 'job_roles_of_interest', 'skills')
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def _str_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _bool_list(value):
+    return [item.strip().lower() in ('1', 'true', 'yes') for item in value.split(',') if item.strip()]
+
+
+# Faceted search filters and how their query parameter is parsed
+SEARCH_FILTERS = {
+    'location': _int_list,
+    'employment_status': _str_list,
+    'education_level': _int_list,
+    'preferred_employment_type': _int_list,
+    'desired_work_environments': _int_list,
+    'skills': _int_list,
+    'is_actively_job_searching': _bool_list,
+}
+
+
+class IgnoreClientContentNegotiation(DefaultContentNegotiation):
+    """Renders errors as JSON whatever export type the client accepts."""
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+# Streaming export formats: (generator, async generator, content type)
+EXPORT_FORMATS = {
+    'ndjson': (export.stream_ndjson, export.astream_ndjson, 'application/x-ndjson'),
+    'csv': (export.stream_csv, export.astream_csv, 'text/csv; charset=utf-8'),
+}
+
+# URL segment of each profile M2M field, named like its reference route
+PROFILE_RELATION_PATHS = {
+    'skills': 'skills',
+    'companies': 'companies_of_interest',
+    'job-roles': 'job_roles_of_interest',
+    'work-environments': 'desired_work_environments',
+}
+
+
+class ReplicaReadMixin:
+    """
+    Serves ``replica_actions`` from the read replica, unless the user wrote
+    recently and must read their own writes from the primary.
+    """
+    replica_actions = ('list', 'retrieve')
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions and db_router.replica_alias() and not db_router.is_pinned(request.user):
+            db_router.allow_replica_reads()
+
+
+# Layouts of the reference_data block of profiles/me
+REFERENCE_LAYOUTS = ('rows', 'columns')
+
+
+def profile_validators(renderer_format, row, reference_version, *variant):
+    """
+    ``(ETag, Last-Modified)`` of a profile row, from version stamps.
+    
+    The ETag also covers the embedded user fields, which have no
+    timestamp; Last-Modified covers the profile and reference names only,
+    and clients sending both get the ETag compared.
+    """
+    etag = conditional.make_etag(
+        renderer_format, *variant,
+        reference_version, row['id'], row['updated_at'].isoformat(), row['user_id'],
+        row['user__email'], row['user__username'], row['user__is_profile_completed'],
+    )
+    last_modified = max(row['updated_at'].timestamp(), version_seen_at(reference_version))
+    return etag, last_modified
+
+
+def list_validators(model, renderer_format, full_path):
+    """``(ETag, Last-Modified)`` of a reference list page, from its table's version."""
+    version = table_version_token(model)
+    # Pages and renderers of one version are different bodies
+    etag = conditional.make_etag(version, renderer_format, full_path)
+    return etag, version_seen_at(version)
+
+
+class UserProfileViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = UserProfile.objects.all()
     serializer_class = UserProfileSerializer
+    pagination_class = ProfileKeysetPagination
     
     def get_serializer_class(self):
         if self.action in ['retrieve', 'me']:
             return UserProfileDetailSerializer
         return UserProfileSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.get_serializer_class() is UserProfileDetailSerializer:
+            return queryset.select_related(*PROFILE_RELATED_FIELDS).prefetch_related(*PROFILE_M2M_FIELDS)
+        if self.action in ['update', 'partial_update']:
+            # The serializer reads the current M2M ids itself, in one query
+            return queryset
+        # UserProfileSerializer renders relations as ids only
+        return queryset.prefetch_related(*(
+            Prefetch(field, queryset=UserProfile._meta.get_field(field).related_model.objects.only('id'))
+            for field in PROFILE_M2M_FIELDS
+        ))
+    
+    def retrieve(self, request, *args, **kwargs):
+        # Read-only fast path rendering the UserProfileDetailSerializer shape
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            rows = fast_serializers.profile_rows(self.filter_queryset(UserProfile.objects.filter(pk=lookup)))
+        except ValueError:
+            rows = None
+        if not rows:
+            raise NotFound()
+        # As get_object() would, on a profile built from the row
+        self.check_object_permissions(request, fast_serializers.profile_instance(rows[0]))
+        
+        version, _ = get_reference_snapshot()
+        etag, last_modified = profile_validators(request.accepted_renderer.format, rows[0], version)
+        if conditional.is_not_modified(request, etag, last_modified):
+            return conditional.not_modified(etag, last_modified)
+        return Response(
+            fast_serializers.render_rows(rows)[0],
+            headers=conditional.validator_headers(etag, last_modified)
+        )
+    
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        # Unlike the default, keep the M2M caches: the serializer left them current
+        return Response(serializer.data)
+    
     def perform_create(self, serializer):
         # Check if user already has a profile
         if UserProfile.objects.filter(user=self.request.user).exists():
@@ -111,294 +224,326 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         """
         Returns the user's profile with detailed data.
         Creates a minimal profile if one doesn't exist.
+        
+        ``?reference_layout=columns`` sends each ``reference_data`` table as
+        ``{"id": [...], "name": [...]}`` instead of a list of objects.
         """
-        profile, created = UserProfile.objects.get_or_create(
-            user=request.user,
-            defaults={}  # Minimal defaults
-        )
+        layout = request.query_params.get('reference_layout', 'rows')
+        if layout not in REFERENCE_LAYOUTS:
+            return Response(
+                {"error": "Query parameter 'reference_layout' must be 'rows' or 'columns'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        rows = fast_serializers.profile_rows(UserProfile.objects.filter(user=request.user))
+        if not rows:
+            UserProfile.objects.get_or_create(
+                user=request.user,
+                defaults={}  # Minimal defaults
+            )
+            rows = fast_serializers.profile_rows(UserProfile.objects.filter(user=request.user))
+        
+        # Reference data comes from a versioned, pre-serialized snapshot
+        version, reference_data = get_reference_snapshot()
         
-        # Get reference data for frontend use
-        reference_data = {
-            'skills': SkillSerializer(Skill.objects.all(), many=True).data,
-            'companies': CompanySerializer(Company.objects.all(), many=True).data,
-            'locations': LocationSerializer(Location.objects.all(), many=True).data,
-            'education_levels': EducationLevelSerializer(EducationLevel.objects.all(), many=True).data,
-            'employment_types': EmploymentTypeSerializer(EmploymentType.objects.all(), many=True).data,
-            'work_environments': DesiredWorkEnvironmentSerializer(DesiredWorkEnvironment.objects.all(), many=True).data,
-            'job_roles': JobRoleSerializer(JobRole.objects.all(), many=True).data,
-        }
+        etag, last_modified = profile_validators(request.accepted_renderer.format, rows[0], version, layout)
+        if conditional.is_not_modified(request, etag, last_modified):
+            return conditional.not_modified(etag, last_modified)
         
-        serializer = UserProfileDetailSerializer(profile)
+        if layout == 'columns':
+            reference_data = get_reference_columns(version, reference_data)
+        # Only load the M2M relations once the body is actually needed
         return Response({
-            'profile': serializer.data,
+            'profile': fast_serializers.render_rows(rows)[0],
             'reference_data': reference_data
-        })
-
-
-class SkillViewSet(viewsets.ModelViewSet):
-    queryset = Skill.objects.all()
-    serializer_class = SkillSerializer
+        }, headers=conditional.validator_headers(etag, last_modified))
     
-    def create(self, request, *args, **kwargs):
+    @action(detail=False, methods=['post'], url_name='me-relation',
+            url_path=r'me/(?P<relation>{})/(?P<operation>add|remove)'.format('|'.join(PROFILE_RELATION_PATHS)))
+    def me_relation(self, request, relation, operation):
         """
-        Handle both single item and bulk creation.
-        For bulk creation, it expects a JSON with a "skills" array.
+        ``POST me/<relation>/add`` or ``.../remove`` with ``{"ids": [...]}``
+        changes only those rows of the user's profile. The ids are checked
+        with one query; adding an id already present or removing one that
+        is not is a no-op.
         """
-        # Handle bulk format: {"skills": ["Python", "JavaScript"]}
-        if isinstance(request.data, dict) and 'skills' in request.data:
-            skills = request.data['skills']
-            
-            if isinstance(skills, list):
-                # Convert string items to objects if needed
-                skills_data = [{"name": item} if isinstance(item, str) else item for item in skills]
-                return self._bulk_create(skills_data)
-                
-        # Default single item creation
-        return super().create(request, *args, **kwargs)
-    
-    def _bulk_create(self, skills_data):
-        """Helper method to handle bulk creation"""
-        created_skills = []
+        field = PROFILE_RELATION_PATHS[relation]
+        serializer = ProfileRelationDeltaSerializer(
+            data=request.data, related_model=UserProfile._meta.get_field(field).related_model
+        )
+        serializer.is_valid(raise_exception=True)
         
-        for item in skills_data:
-            name = item['name']
-            # Check if skill already exists
-            skill, created = Skill.objects.get_or_create(
-                name__iexact=name,
-                defaults={"name": name}
-            )
-            created_skills.append(skill)
+        profile = UserProfile.objects.filter(user=request.user).only('id', 'user_id').first()
+        if profile is None:
+            raise NotFound("You don't have a profile yet")
         
-        serializer = self.get_serializer(created_skills, many=True)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-
-class CompanyViewSet(viewsets.ModelViewSet):
-    queryset = Company.objects.all()
-    serializer_class = CompanySerializer
+        manager = getattr(profile, field)
+        with transaction.atomic():
+            if operation == 'add':
+                manager.add(*serializer.validated_data['ids'])
+            else:
+                manager.remove(*serializer.validated_data['ids'])
+            # Bumped without save(): no column the post_save receivers track changed
+            UserProfile.objects.filter(pk=profile.pk).update(updated_at=timezone.now())
+        return Response(status=status.HTTP_204_NO_CONTENT)
     
-    def create(self, request, *args, **kwargs):
+    @action(detail=False, methods=['get'])
+    def search(self, request):
         """
-        Handle both single item and bulk creation.
-        For bulk creation, it expects a JSON with a "companies" array.
+        Faceted search: ``?location=1,2&skills=3,4&min_years=2...`` filters
+        profiles and returns every facet's value counts, all from the
+        in-memory profile index. Pages follow ``?after=<last profile id>``.
         """
-        # Handle bulk format: {"companies": ["Google", "Microsoft"]}
-        if isinstance(request.data, dict) and 'companies' in request.data:
-            companies = request.data['companies']
-            
-            if isinstance(companies, list):
-                # Convert string items to objects if needed
-                companies_data = [{"name": item} if isinstance(item, str) else item for item in companies]
-                return self._bulk_create(companies_data)
-                
-        # Default single item creation
-        return super().create(request, *args, **kwargs)
-    
-    def _bulk_create(self, companies_data):
-        """Helper method to handle bulk creation"""
-        created_companies = []
-        
-        for item in companies_data:
-            name = item['name']
-            # Check if company already exists
-            company, created = Company.objects.get_or_create(
-                name__iexact=name,
-                defaults={"name": name}
+        params = request.query_params
+        try:
+            filters = {
+                field: parse(params[field])
+                for field, parse in SEARCH_FILTERS.items()
+                if params.get(field)
+            }
+            min_years = int(params['min_years']) if params.get('min_years') else None
+            max_years = int(params['max_years']) if params.get('max_years') else None
+            after = int(params['after']) if params.get('after') else None
+            limit = int(params.get('limit', facets.DEFAULT_LIMIT))
+        except ValueError:
+            return Response(
+                {"error": "Filters take comma-separated ids; 'min_years', 'max_years', 'after' and 'limit' must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            created_companies.append(company)
+        limit = max(1, min(limit, facets.MAX_LIMIT))
         
-        serializer = self.get_serializer(created_companies, many=True)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-
-class LocationViewSet(viewsets.ModelViewSet):
-    queryset = Location.objects.all()
-    serializer_class = LocationSerializer
+        result = facets.search(filters, min_years=min_years, max_years=max_years, after=after, limit=limit)
+        
+        # One page of profiles, rendered like the list endpoint
+        profiles = self.get_queryset().filter(pk__in=result['profile_ids']).order_by('id')
+        serializer = self.get_serializer(profiles, many=True)
+        return Response({
+            'count': result['count'],
+            'next_after': result['profile_ids'][-1] if result['has_more'] else None,
+            'facets': result['facets'],
+            'results': serializer.data,
+        })
     
-    def create(self, request, *args, **kwargs):
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser],
+            content_negotiation_class=IgnoreClientContentNegotiation)
+    def export(self, request):
         """
-        Handle both single item and bulk creation.
-        For bulk creation, it expects a JSON with a "locations" array.
+        Streams every profile as NDJSON (default) or CSV, chosen with
+        ``?export_format=csv`` (DRF reserves ``format`` for renderers).
         """
-        # Handle bulk format: {"locations": ["New York", "San Francisco"]}
-        if isinstance(request.data, dict) and 'locations' in request.data:
-            locations = request.data['locations']
-            
-            if isinstance(locations, list):
-                # Convert string items to objects if needed
-                locations_data = [{"name": item} if isinstance(item, str) else item for item in locations]
-                return self._bulk_create(locations_data)
-                
-        # Default single item creation
-        return super().create(request, *args, **kwargs)
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": "Query parameter 'export_format' must be 'ndjson' or 'csv'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        stream, astream, content_type = EXPORT_FORMATS[export_format]
+        # Under ASGI only an async iterator is streamed as it is produced
+        if isinstance(request._request, ASGIRequest):
+            stream = astream
+        response = StreamingHttpResponse(stream(), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="profiles.{export_format}"'
+        return response
     
-    def _bulk_create(self, locations_data):
-        """Helper method to handle bulk creation"""
-        created_locations = []
-        
-        for item in locations_data:
-            name = item['name']
-            # Check if location already exists
-            location, created = Location.objects.get_or_create(
-                name__iexact=name,
-                defaults={"name": name}
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Profiles with the most similar skills and interests, found through
+        the precomputed MinHash/LSH index. ``?k=`` sets the number of results.
+        """
+        try:
+            profile_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        try:
+            k = int(request.query_params.get('k', similarity.DEFAULT_K))
+        except ValueError:
+            return Response(
+                {"error": "Query parameter 'k' must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            created_locations.append(location)
+        k = max(1, min(k, similarity.MAX_K))
         
-        serializer = self.get_serializer(created_locations, many=True)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        results = similarity.similar(profile_id, k)
+        if results is None:
+            # No signature: either no such profile or one without skills/interests
+            if not UserProfile.objects.filter(pk=profile_id).exists():
+                raise NotFound()
+            results = []
+        return Response(results)
 
 
-class EducationLevelViewSet(viewsets.ModelViewSet):
-    queryset = EducationLevel.objects.all()
-    serializer_class = EducationLevelSerializer
+class ConditionalListMixin:
+    """
+    Answers ``If-None-Match``/``If-Modified-Since`` on ``list`` from the
+    table's version stamp, with a 304 before any row is read.
     
-    def create(self, request, *args, **kwargs):
-        """
-        Handle both single item and bulk creation.
-        For bulk creation, it expects a JSON with an "education_levels" array.
-        """
-        # Handle bulk format: {"education_levels": ["Bachelor's", "Master's"]}
-        if isinstance(request.data, dict) and 'education_levels' in request.data:
-            levels = request.data['education_levels']
-            
-            if isinstance(levels, list):
-                # Convert string items to objects if needed
-                levels_data = [{"name": item} if isinstance(item, str) else item for item in levels]
-                return self._bulk_create(levels_data)
-                
-        # Default single item creation
-        return super().create(request, *args, **kwargs)
+    Pages read from the replica are validated by their rows instead: the
+    version moves when the primary commits, before the replica has the
+    change, and must not label the rows it read.
+    """
     
-    def _bulk_create(self, levels_data):
-        """Helper method to handle bulk creation"""
-        created_levels = []
+    def list(self, request, *args, **kwargs):
+        if db_router.reads_from_replica():
+            response = super().list(request, *args, **kwargs)
+            etag = conditional.data_etag(request.accepted_renderer.format, request.get_full_path(), data=response.data)
+            if conditional.is_not_modified(request, etag):
+                return conditional.not_modified(etag)
+            response['ETag'] = etag
+            return response
         
-        for item in levels_data:
-            name = item['name']
-            # Check if education level already exists
-            level, created = EducationLevel.objects.get_or_create(
-                name__iexact=name,
-                defaults={"name": name}
-            )
-            created_levels.append(level)
+        etag, last_modified = list_validators(self.queryset.model, request.accepted_renderer.format, request.get_full_path())
+        if conditional.is_not_modified(request, etag, last_modified):
+            return conditional.not_modified(etag, last_modified)
         
-        serializer = self.get_serializer(created_levels, many=True)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        response = super().list(request, *args, **kwargs)
+        for header, value in conditional.validator_headers(etag, last_modified).items():
+            response[header] = value
+        return response
 
 
-class EmploymentTypeViewSet(viewsets.ModelViewSet):
-    queryset = EmploymentType.objects.all()
-    serializer_class = EmploymentTypeSerializer
+class BulkCreateMixin:
+    """
+    Lets ``create`` accept either a single item or a bulk payload.
+
+    For bulk creation it expects a JSON object whose ``bulk_key`` holds an
+    array of names (or ``{"name": ...}`` objects). Existing names are reused
+    and the missing ones are inserted in a handful of queries. If any item
+    is not a valid name, nothing is created and the 400 lists their indexes.
+    """
+    bulk_key = None
     
     def create(self, request, *args, **kwargs):
-        """
-        Handle both single item and bulk creation.
-        For bulk creation, it expects a JSON with an "employment_types" array.
-        """
-        # Handle bulk format: {"employment_types": ["full_time", "part_time"]}
-        if isinstance(request.data, dict) and 'employment_types' in request.data:
-            types = request.data['employment_types']
+        if isinstance(request.data, dict) and self.bulk_key in request.data:
+            items = request.data[self.bulk_key]
             
-            if isinstance(types, list):
-                # Convert string items to objects if needed
-                types_data = [{"name": item} if isinstance(item, str) else item for item in types]
-                return self._bulk_create(types_data)
+            if isinstance(items, list):
+                return self._bulk_create(items)
                 
         # Default single item creation
         return super().create(request, *args, **kwargs)
     
-    def _bulk_create(self, types_data):
+    def _bulk_create(self, items):
         """Helper method to handle bulk creation"""
-        created_types = []
-        
-        for item in types_data:
-            name = item['name']
-            # Check if employment type already exists
-            emp_type, created = EmploymentType.objects.get_or_create(
-                name__iexact=name,
-                defaults={"name": name}
+        # Items are names or {"name": ...} objects
+        names = [item.get('name') if isinstance(item, dict) else item for item in items]
+        invalid = invalid_names(self.queryset.model, names)
+        if invalid:
+            return Response(
+                {"error": f"Invalid names in '{self.bulk_key}'", "invalid_indexes": invalid},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            created_types.append(emp_type)
-        
-        serializer = self.get_serializer(created_types, many=True)
+        instances = bulk_get_or_create(self.queryset.model, names)
+        serializer = self.get_serializer(instances, many=True)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class DesiredWorkEnvironmentViewSet(viewsets.ModelViewSet):
-    queryset = DesiredWorkEnvironment.objects.all()
-    serializer_class = DesiredWorkEnvironmentSerializer
+class AutocompleteMixin:
+    """
+    Adds ``GET <list>/autocomplete/?q=<prefix>&limit=<n>``, served from the
+    per-process prefix index rather than a ``LIKE`` scan.
+    """
+    autocomplete_max_limit = 50
     
-    def create(self, request, *args, **kwargs):
-        """
-        Handle both single item and bulk creation.
-        For bulk creation, it expects a JSON with a "work_environments" array.
-        """
-        # Handle bulk format: {"work_environments": ["remote", "hybrid"]}
-        if isinstance(request.data, dict) and 'work_environments' in request.data:
-            envs = request.data['work_environments']
-            
-            if isinstance(envs, list):
-                # Convert string items to objects if needed
-                envs_data = [{"name": item} if isinstance(item, str) else item for item in envs]
-                return self._bulk_create(envs_data)
-                
-        # Default single item creation
-        return super().create(request, *args, **kwargs)
-    
-    def _bulk_create(self, envs_data):
-        """Helper method to handle bulk creation"""
-        created_envs = []
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            return Response(
+                {"error": "Query parameter 'q' is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        for item in envs_data:
-            name = item['name']
-            # Validate against choices
-            if name not in dict(UserProfile.WORK_ENVIRONMENT_CHOICES):
-                continue
-                
-            # Check if work environment already exists
-            env, created = DesiredWorkEnvironment.objects.get_or_create(
-                name=name
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response(
+                {"error": "Query parameter 'limit' must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            created_envs.append(env)
+        limit = max(1, min(limit, self.autocomplete_max_limit))
         
-        serializer = self.get_serializer(created_envs, many=True)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(autocomplete.search(self.queryset.model, query, limit))
 
 
-class JobRoleViewSet(viewsets.ModelViewSet):
-    queryset = JobRole.objects.all()
-    serializer_class = JobRoleSerializer
+class CandidatesMixin:
+    """
+    Adds ``GET <detail>/candidates/``: the actively searching profiles whose
+    skills best overlap this object's skill set, from the in-memory profile
+    index. The skill set is ``?skills=1,2,3`` when given, otherwise the
+    skills most common among profiles interested in the object.
     
-    def create(self, request, *args, **kwargs):
-        """
-        Handle both single item and bulk creation.
-        For bulk creation, it expects a JSON with a "job_roles" array.
-        """
-        # Handle bulk format: {"job_roles": ["Software Engineer", "Data Scientist"]}
-        if isinstance(request.data, dict) and 'job_roles' in request.data:
-            roles = request.data['job_roles']
-            
-            if isinstance(roles, list):
-                # Convert string items to objects if needed
-                roles_data = [{"name": item} if isinstance(item, str) else item for item in roles]
-                return self._bulk_create(roles_data)
-                
-        # Default single item creation
-        return super().create(request, *args, **kwargs)
+    Filters: ``location`` and ``work_environment`` (comma-separated ids),
+    ``min_years``, ``max_years``; ``k`` sets the number of results.
+    """
+    candidates_field = None  # UserProfile M2M pointing at this model
     
-    def _bulk_create(self, roles_data):
-        """Helper method to handle bulk creation"""
-        created_roles = []
-        
-        for item in roles_data:
-            name = item['name']
-            # Check if job role already exists
-            role, created = JobRole.objects.get_or_create(
-                name__iexact=name,
-                defaults={"name": name}
+    @action(detail=True, methods=['get'])
+    def candidates(self, request, pk=None):
+        obj = self.get_object()
+        params = request.query_params
+        try:
+            k = int(params.get('k', matching.DEFAULT_K))
+            skills = _int_list(params.get('skills', ''))
+            locations = _int_list(params.get('location', ''))
+            work_environments = _int_list(params.get('work_environment', ''))
+            min_years = int(params['min_years']) if params.get('min_years') else None
+            max_years = int(params['max_years']) if params.get('max_years') else None
+        except ValueError:
+            return Response(
+                {"error": "Query parameters 'k', 'min_years', 'max_years' must be integers and 'skills', 'location', 'work_environment' comma-separated ids"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            created_roles.append(role)
+        k = max(1, min(k, matching.MAX_K))
         
-        serializer = self.get_serializer(created_roles, many=True)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        if not skills:
+            skills = matching.interest_skills(self.candidates_field, obj.pk)
+        results = matching.match(
+            skills, k=k, locations=locations, work_environments=work_environments,
+            min_years=min_years, max_years=max_years,
+        )
+        return Response({'skills': skills, 'results': results})
+
+
+class SkillViewSet(AutocompleteMixin, ReplicaReadMixin, ConditionalListMixin, BulkCreateMixin, viewsets.ModelViewSet):
+    queryset = Skill.objects.all()
+    serializer_class = SkillSerializer
+    bulk_key = 'skills'  # {"skills": ["Python", "JavaScript"]}
+
+
+class CompanyViewSet(CandidatesMixin, AutocompleteMixin, ReplicaReadMixin, ConditionalListMixin, BulkCreateMixin, viewsets.ModelViewSet):
+    queryset = Company.objects.all()
+    serializer_class = CompanySerializer
+    bulk_key = 'companies'  # {"companies": ["Google", "Microsoft"]}
+    candidates_field = 'companies_of_interest'
+
+
+class LocationViewSet(AutocompleteMixin, ReplicaReadMixin, ConditionalListMixin, BulkCreateMixin, viewsets.ModelViewSet):
+    queryset = Location.objects.all()
+    serializer_class = LocationSerializer
+    bulk_key = 'locations'  # {"locations": ["New York", "San Francisco"]}
+
+
+class EducationLevelViewSet(ReplicaReadMixin, ConditionalListMixin, BulkCreateMixin, viewsets.ModelViewSet):
+    queryset = EducationLevel.objects.all()
+    serializer_class = EducationLevelSerializer
+    bulk_key = 'education_levels'  # {"education_levels": ["Bachelor's", "Master's"]}
+
+
+class EmploymentTypeViewSet(ReplicaReadMixin, ConditionalListMixin, BulkCreateMixin, viewsets.ModelViewSet):
+    queryset = EmploymentType.objects.all()
+    serializer_class = EmploymentTypeSerializer
+    bulk_key = 'employment_types'  # {"employment_types": ["full_time", "part_time"]}
+
+
+class DesiredWorkEnvironmentViewSet(ReplicaReadMixin, ConditionalListMixin, BulkCreateMixin, viewsets.ModelViewSet):
+    queryset = DesiredWorkEnvironment.objects.all()
+    serializer_class = DesiredWorkEnvironmentSerializer
+    bulk_key = 'work_environments'  # {"work_environments": ["remote", "hybrid"]}
+
+
+class JobRoleViewSet(CandidatesMixin, AutocompleteMixin, ReplicaReadMixin, ConditionalListMixin, BulkCreateMixin, viewsets.ModelViewSet):
+    queryset = JobRole.objects.all()
+    serializer_class = JobRoleSerializer
+    bulk_key = 'job_roles'  # {"job_roles": ["Software Engineer", "Data Scientist"]}
+    candidates_field = 'job_roles_of_interest'
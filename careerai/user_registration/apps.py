@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class UserRegistrationConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'user_registration'
+
+    def ready(self):
+        # Connect signal receivers and register the system checks
+        from user_registration import checks, signals  # noqa: F401
@@ -0,0 +1,233 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.db import connections
+from django.db.models import Count
+
+from user_registration.models import UserProfile, Skill, Company, Location, JobRole, normalize_name
+from user_registration.reference_data import table_version
+
+# Full rebuilds pick up changes made by other processes and popularity drift
+REBUILD_INTERVAL = 300
+
+# Match ranks: the whole name starts with the query, or one of its words does
+WHOLE_NAME, WORD = 0, 1
+
+
+class AutocompleteIndex:
+    """
+    Per-process prefix index over the normalized names of a reference model.
+
+    Every name is stored under its full ``name_key`` and under each later word
+    in a sorted array, so a prefix query is a binary search followed by a
+    short scan. Matches are ranked by match kind, then by how many profiles
+    reference the entry, then alphabetically.
+
+    Changes committed by this process are applied in place. Other processes'
+    show up once the table version moves, which needs the shared cache (see
+    ``CAREERAI_CACHE_URL``), or at the periodic rebuild. Once built, the
+    index keeps serving while a background thread rebuilds it.
+    """
+    def __init__(self, model, profile_field):
+        self.model = model
+        self.profile_field = profile_field
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._entries = []  # sorted (token, id, match rank)
+        self._names = {}  # id -> display name
+        self._popularity = Counter()
+        self._popularity_stale = False
+        self._version = None
+        self._built_at = 0
+        # Changes committed while a refresh reads the tables, replayed onto it
+        self._changes = None
+
+    # Building
+
+    def _read_popularity(self):
+        field = UserProfile._meta.get_field(self.profile_field)
+        if field.many_to_many:
+            through = field.remote_field.through
+            column = field.m2m_reverse_field_name()
+            rows = through.objects.values(column).annotate(count=Count('pk'))
+        else:
+            column = self.profile_field
+            rows = UserProfile.objects.exclude(**{column: None}).values(column).annotate(count=Count('pk'))
+        return {'_popularity': Counter({row[column]: row['count'] for row in rows})}
+
+    @staticmethod
+    def _tokens(pk, name):
+        key = normalize_name(name)
+        yield key, pk, WHOLE_NAME
+        words = key.split(' ')
+        for i in range(1, len(words)):
+            yield ' '.join(words[i:]), pk, WORD
+
+    def _read_all(self):
+        version = table_version(self.model)
+        names = dict(self.model.objects.values_list('id', 'name'))
+        return {
+            '_entries': sorted(token for pk, name in names.items() for token in self._tokens(pk, name)),
+            '_names': names,
+            **self._read_popularity(),
+            '_version': version,
+            '_built_at': time.monotonic(),
+        }
+
+    def _refresh(self, read):
+        """Swap in the state ``read()`` returns, replaying changes committed meanwhile."""
+        with self._lock:
+            self._popularity_stale = False
+            self._changes = []
+        try:
+            state = read()
+        except BaseException:
+            with self._lock:
+                self._changes = None
+                self._popularity_stale = True
+            raise
+        with self._lock:
+            changes, self._changes = self._changes, None
+            self.__dict__.update(state)
+            for name, args in changes:
+                getattr(self, name)(*args)
+
+    def rebuild(self):
+        with self._build_lock:
+            self._refresh(self._read_all)
+
+    def _ensure_fresh(self):
+        if self._version is None:
+            # First use: other threads wait for the build
+            with self._build_lock:
+                if self._version is None:
+                    self._refresh(self._read_all)
+            return
+        if (
+            time.monotonic() - self._built_at > REBUILD_INTERVAL
+            or table_version(self.model) != self._version
+        ):
+            read = self._read_all
+        elif self._popularity_stale:
+            read = self._read_popularity
+        else:
+            return
+        # At most one refresh at a time
+        if self._build_lock.acquire(blocking=False):
+            threading.Thread(
+                target=self._refresh_in_background, args=(read,), name='autocomplete-refresh', daemon=True
+            ).start()
+
+    def _refresh_in_background(self, read):
+        try:
+            self._refresh(read)
+        finally:
+            self._build_lock.release()
+            connections.close_all()
+
+    def clear(self):
+        """Drop the index, so the next use builds it again before reading."""
+        with self._build_lock, self._lock:
+            self._version = None
+            self._entries, self._names, self._popularity = [], {}, Counter()
+
+    # Incremental updates, applied after the change commits
+
+    def _apply(self, name, *args):
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((name, args))
+            if self._version is not None:
+                getattr(self, name)(*args)
+
+    def _remove_tokens(self, pk):
+        name = self._names.pop(pk, None)
+        if name is None:
+            return
+        for token in self._tokens(pk, name):
+            i = bisect_left(self._entries, token)
+            if i < len(self._entries) and self._entries[i] == token:
+                del self._entries[i]
+
+    def upsert(self, pk, name):
+        self._apply('_upsert', pk, name)
+
+    def remove(self, pk):
+        self._apply('_remove', pk)
+
+    def mark_popularity_stale(self):
+        self._apply('_mark_popularity_stale')
+
+    def adjust_popularity(self, pks, delta):
+        with self._lock:
+            if self._changes is not None:
+                # The counts being read may already include this; recount after
+                self._changes.append(('_mark_popularity_stale', ()))
+            for pk in pks:
+                self._popularity[pk] += delta
+
+    def _upsert(self, pk, name):
+        self._remove_tokens(pk)
+        self._names[pk] = name
+        for token in self._tokens(pk, name):
+            insort(self._entries, token)
+        self._follow_own_bump()
+
+    def _remove(self, pk):
+        self._remove_tokens(pk)
+        self._popularity.pop(pk, None)
+        self._follow_own_bump()
+
+    def _follow_own_bump(self):
+        # The change's own commit bumped the table version just before. If
+        # that is the only bump since the index was read, the index is
+        # current; otherwise other changes are missing and the stale version
+        # makes the next search rebuild.
+        if table_version(self.model) == self._version + 1:
+            self._version += 1
+
+    def _mark_popularity_stale(self):
+        self._popularity_stale = True
+
+    # Querying
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` ``{'id', 'name'}`` dicts whose names match ``query``."""
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+
+        self._ensure_fresh()
+        with self._lock:
+            entries, names, popularity = self._entries, self._names, self._popularity
+            best = {}
+            # Every match is ranked: the most popular may sort last by name
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and entries[i][0].startswith(prefix):
+                token, pk, rank = entries[i]
+                if pk not in best or rank < best[pk][0]:
+                    best[pk] = (rank, token)
+                i += 1
+
+            top = heapq.nsmallest(
+                limit, best.items(),
+                key=lambda item: (item[1][0], -popularity[item[0]], item[1][1])
+            )
+            return [{'id': pk, 'name': names[pk]} for pk, _ in top]
+
+
+# Reference models served by autocomplete, with the UserProfile field that
+# references them (used for popularity).
+INDEXES = {
+    Skill: AutocompleteIndex(Skill, 'skills'),
+    Company: AutocompleteIndex(Company, 'companies_of_interest'),
+    JobRole: AutocompleteIndex(JobRole, 'job_roles_of_interest'),
+    Location: AutocompleteIndex(Location, 'location'),
+}
+
+
+def search(model, query, limit=10):
+    return INDEXES[model].search(query, limit)
@@ -0,0 +1,145 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings using double hashing. Past
+    ``capacity`` items its false positive rate climbs above ``error_rate``.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = 0
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistCache:
+    """
+    In-process view of the token blacklist that avoids a query per refresh.
+
+    Every blacklisted, unexpired JTI is loaded into a compact Bloom filter, so
+    a miss proves a token is not blacklisted without touching the database;
+    hits, blacklisted tokens or false positives, are confirmed with a query.
+    Every ``sync_interval`` seconds the rows blacklisted since the last sync,
+    less ``sync_overlap`` seconds, are added: rows committed up to that long
+    after they were written, or stamped by a server whose clock is behind by
+    up to that much, are still seen. The filter is rebuilt from the database
+    every ``rebuild_interval`` seconds, to drop expired tokens, and once it
+    holds more JTIs than it was sized for.
+    """
+    def __init__(self, sync_interval, rebuild_interval, sync_overlap):
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.sync_overlap = timedelta(seconds=sync_overlap)
+        self._lock = threading.Lock()
+        # Held while reading from the database, so only one thread does
+        self._refresh_lock = threading.Lock()
+        self._bloom = None
+        self._sync_from = None
+        self._synced_at = 0
+        self._built_at = 0
+
+    def warm(self):
+        """(Re)build the filter from every blacklisted, unexpired token."""
+        with self._refresh_lock:
+            self._warm()
+
+    def _warm(self):
+        started = timezone.now()
+        jtis = list(
+            BlacklistedToken.objects.filter(token__expires_at__gt=aware_utcnow())
+            .values_list('token__jti', flat=True)
+        )
+        bloom = BloomFilter(capacity=max(2 * len(jtis), 1024))
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            self._bloom = bloom
+            self._sync_from = started - self.sync_overlap
+            self._synced_at = self._built_at = time.monotonic()
+
+    def _sync(self):
+        started = timezone.now()
+        jtis = list(
+            BlacklistedToken.objects.filter(blacklisted_at__gte=self._sync_from)
+            .values_list('token__jti', flat=True)
+        )
+        with self._lock:
+            for jti in jtis:
+                self._add(jti)
+            self._sync_from = started - self.sync_overlap
+            self._synced_at = time.monotonic()
+
+    def add(self, jti):
+        with self._lock:
+            self._add(jti)
+
+    def _add(self, jti):
+        # Overlapping syncs see rows again; only new JTIs count towards capacity
+        if self._bloom is not None and jti not in self._bloom:
+            self._bloom.add(jti)
+
+    def _refresh(self):
+        if self._bloom is None:
+            # Nothing to answer from yet: wait for the first build
+            with self._refresh_lock:
+                if self._bloom is None:
+                    self._warm()
+            return
+        now = time.monotonic()
+        rebuild = self._bloom.full or now - self._built_at > self.rebuild_interval
+        if not rebuild and now - self._synced_at <= self.sync_interval:
+            return
+        # Other threads keep reading the current filter meanwhile
+        if self._refresh_lock.acquire(blocking=False):
+            try:
+                if rebuild:
+                    self._warm()
+                else:
+                    self._sync()
+            finally:
+                self._refresh_lock.release()
+
+    def is_blacklisted(self, jti):
+        self._refresh()
+        if jti not in self._bloom:
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+blacklist_cache = BlacklistCache(
+    sync_interval=getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 5),
+    rebuild_interval=getattr(settings, 'TOKEN_BLACKLIST_REBUILD_INTERVAL', 60 * 60),
+    sync_overlap=getattr(settings, 'TOKEN_BLACKLIST_SYNC_OVERLAP', 60),
+)
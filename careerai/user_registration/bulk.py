@@ -0,0 +1,140 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Value
+
+from user_registration.models import NormalizedNameModel, UserProfile, normalize_name
+from user_registration.reference_data import invalidate as invalidate_reference_data
+
+# Names per lookup query, under SQLite's default bound-parameter limit
+LOOKUP_BATCH_SIZE = 900
+
+
+def _lookup(model):
+    """
+    Return ``(field, key function)`` used to match names on ``model``.
+
+    Models with a normalized ``name_key`` are matched through it; the others
+    (choice-backed names) are matched exactly.
+    """
+    if issubclass(model, NormalizedNameModel):
+        return 'name_key', normalize_name
+    return 'name', lambda name: name
+
+
+def _fetch_by_name(model, keys):
+    """Return ``{lookup key: instance}`` for the rows matching ``keys``."""
+    field, _ = _lookup(model)
+    keys = list(keys)
+    found = {}
+    for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+        batch = keys[start:start + LOOKUP_BATCH_SIZE]
+        for obj in model.objects.filter(**{f'{field}__in': batch}):
+            found[getattr(obj, field)] = obj
+    return found
+
+
+def invalid_names(model, names):
+    """
+    Return the indexes of the entries of ``names`` that are not valid
+    ``model`` names: not strings, blank, too long, or not among the choices.
+    """
+    field, key_for = _lookup(model)
+    name_field, key_field = model._meta.get_field('name'), model._meta.get_field(field)
+    invalid = []
+    for index, name in enumerate(names):
+        try:
+            if not isinstance(name, str) or not key_for(name).strip():
+                raise ValidationError('blank')
+            name_field.clean(name, None)
+            key_field.clean(key_for(name), None)
+        except ValidationError:
+            invalid.append(index)
+    return invalid
+
+
+def bulk_get_or_create(model, names):
+    """
+    Return the ``model`` rows named by ``names``, creating the missing ones.
+
+    Names are deduplicated in memory, keeping the first spelling seen, and
+    the result follows their order of first appearance. Existing rows are
+    resolved in one query per batch, missing ones are inserted with a single
+    ``bulk_create`` that tolerates concurrent inserts, then read back.
+
+    Raises ``ValueError`` if any name is invalid (see ``invalid_names``).
+    """
+    names = list(names)
+    invalid = invalid_names(model, names)
+    if invalid:
+        raise ValueError(f"Invalid {model.__name__} names at indexes {invalid}")
+    field, key_for = _lookup(model)
+    wanted = {}
+    for name in names:
+        wanted.setdefault(key_for(name), name)
+
+    found = _fetch_by_name(model, wanted)
+    missing = [key for key in wanted if key not in found]
+    if missing:
+        # bulk_create bypasses save(), so name_key is filled in here
+        model.objects.bulk_create(
+            [model(**{'name': wanted[key], field: key}) for key in missing],
+            ignore_conflicts=True
+        )
+        found.update(_fetch_by_name(model, missing))
+        # bulk_create skips post_save, so bump the snapshot explicitly
+        invalidate_reference_data(model)
+
+    return [found[key] for key in wanted if key in found]
+
+
+def bulk_resolve(model, names):
+    """
+    Return ``{name: id}`` for ``names``, creating the missing ``model`` rows.
+
+    Spellings that normalize to the same key map to the same row.
+    """
+    _, key_for = _lookup(model)
+    ids = {key_for(obj.name): obj.pk for obj in bulk_get_or_create(model, names)}
+    return {name: ids[key_for(name)] for name in names if key_for(name) in ids}
+
+
+def _profile_m2m_union(fields, **lookup):
+    # lookup selects the profiles, as UserProfile filter arguments
+    queries = []
+    for position, field in enumerate(fields):
+        m2m = UserProfile._meta.get_field(field)
+        source, target = m2m.m2m_field_name(), m2m.m2m_reverse_field_name() + '_id'
+        queries.append(
+            m2m.remote_field.through.objects.filter(**{f'{source}__{key}': value for key, value in lookup.items()})
+            .annotate(field=Value(position))
+            .values_list('field', 'id', source + '_id', target)
+        )
+    return queries[0].union(*queries[1:], all=True) if queries else None
+
+
+def _group_m2m_rows(fields, rows):
+    ids = {}
+    for position, _, profile_id, target_id in sorted(rows):
+        ids.setdefault((profile_id, fields[position]), []).append(target_id)
+    return ids
+
+
+def profile_m2m_ids(profile_ids, fields):
+    """
+    Return ``{(profile id, field): [related ids]}`` for the ``UserProfile``
+    M2M ``fields``, read with a single ``UNION ALL`` over their through
+    tables. Ids keep the order their rows were added in.
+    """
+    fields = list(fields)
+    union = _profile_m2m_union(fields, pk__in=profile_ids)
+    return {} if union is None else _group_m2m_rows(fields, union)
+
+
+async def aprofile_m2m_ids(fields, **lookup):
+    """
+    Async ``profile_m2m_ids`` for the profiles matching ``lookup``, given as
+    ``UserProfile`` filter arguments, so callers need not read the profile
+    ids first.
+    """
+    fields = list(fields)
+    union = _profile_m2m_union(fields, **lookup)
+    return {} if union is None else _group_m2m_rows(fields, [row async for row in union])
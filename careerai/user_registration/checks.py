@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Reference table versions, replica pins and JWT user versions are shared
+    through the default cache; a per-process cache leaves other processes
+    serving data a write has replaced.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [Warning(
+        "The default cache is per process, so reference data, list validators, "
+        "replica pins and cached JWT users are only invalidated in the process "
+        "that wrote.",
+        hint="Set CAREERAI_CACHE_URL to a Redis URL shared by every server process.",
+        id='user_registration.W001',
+    )]
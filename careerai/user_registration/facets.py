@@ -0,0 +1,119 @@
+"""
+Faceted profile search over the bitmaps of ``profile_index``.
+
+Values given for one facet are OR-ed, except ``skills`` where a profile must
+have all of them; facets are AND-ed together. Each facet's counts apply every
+filter but its own (skills counts apply all of them), so they show what
+choosing another value would return. Filtering and all counts are bitmap
+intersections; no query reaches the database.
+"""
+import heapq
+from bisect import bisect_right
+from itertools import islice
+
+from user_registration.profile_index import CHUNK_SIZE, count, intersect, iter_slots, profile_index
+
+# Facets with per-value counts, in response order
+FACET_FIELDS = (
+    'location', 'employment_status', 'education_level', 'preferred_employment_type',
+    'desired_work_environments', 'skills', 'is_actively_job_searching',
+)
+# Facets whose values must all match
+ALL_OF_FIELDS = ('skills',)
+
+# Years of experience ranges counted in the years facet (inclusive)
+YEARS_RANGES = ((0, 1), (2, 4), (5, 9), (10, None))
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+FACET_LIMIT = 20
+
+
+def _after(bitmap, slot):
+    """The part of ``bitmap`` past ``slot``."""
+    first_chunk, bit = divmod(slot + 1, CHUNK_SIZE)
+    result = {}
+    for chunk, bits in bitmap.items():
+        if chunk == first_chunk:
+            bits = bits >> bit << bit
+        if chunk >= first_chunk and bits:
+            result[chunk] = bits
+    return result
+
+
+def search(filters, min_years=None, max_years=None, after=None, limit=DEFAULT_LIMIT, facet_limit=FACET_LIMIT):
+    """
+    Filter profiles by ``filters`` (facet name -> list of values) and the
+    years range, and count every facet value.
+
+    Returns the match count, the first ``limit`` profile ids after the
+    profile id ``after``, whether more follow, and the facet counts.
+    """
+    profile_index.ensure_fresh()
+    with profile_index.lock:
+        clauses = {}
+        for field, values in filters.items():
+            if field in ALL_OF_FIELDS:
+                bitmap = profile_index.alive
+                for value in values:
+                    bitmap = intersect(bitmap, profile_index.bitmaps[field].get(value, {}))
+                clauses[field] = bitmap
+            else:
+                clauses[field] = profile_index.value_bitmap(field, values)
+        if min_years is not None or max_years is not None:
+            clauses['years_of_experience'] = profile_index.years_bitmap(min_years, max_years)
+
+        def combine(excluded=None):
+            bitmap = profile_index.alive
+            for field, clause in clauses.items():
+                if field != excluded:
+                    bitmap = intersect(bitmap, clause)
+            return bitmap
+
+        matched = combine()
+
+        facets = {}
+        for field in FACET_FIELDS:
+            base = matched if field in ALL_OF_FIELDS or field not in clauses else combine(field)
+            counts = []
+            for value, bitmap in profile_index.bitmaps[field].items():
+                if value is None:
+                    continue
+                value_count = count(intersect(base, bitmap))
+                if value_count:
+                    counts.append((value_count, value))
+            top = heapq.nlargest(facet_limit, counts, key=lambda item: item[0])
+            facets[field] = [{'value': value, 'count': value_count} for value_count, value in top]
+
+        base = combine('years_of_experience')
+        facets['years_of_experience'] = [
+            {
+                'min': low,
+                'max': high,
+                'count': count(intersect(base, profile_index.years_bitmap(low, high))),
+            }
+            for low, high in YEARS_RANGES
+        ]
+
+        profile_ids = profile_index.profile_ids
+        if profile_index.ids_ordered:
+            # Slot order is id order, so the page is the next slots set
+            page = matched
+            if after is not None:
+                page = _after(matched, bisect_right(profile_ids, after) - 1)
+            slots = list(islice(iter_slots(page), limit + 1))
+        else:
+            # Profiles committed out of id order until the next build
+            slots = heapq.nsmallest(
+                limit + 1,
+                (slot for slot in iter_slots(matched) if after is None or profile_ids[slot] > after),
+                key=profile_ids.__getitem__
+            )
+        profile_ids = profile_index.to_profile_ids(slots)
+
+    return {
+        'count': count(matched),
+        'profile_ids': profile_ids[:limit],
+        'has_more': len(profile_ids) > limit,
+        'facets': facets,
+    }
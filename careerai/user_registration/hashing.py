@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from careerai import metrics
+
+
+class HashPoolSaturated(Exception):
+    """Raised when the password-hashing queue is full; callers should shed load."""
+
+
+class HashingPool:
+    """
+    Runs password hashing on a dedicated, size-limited thread pool.
+
+    PBKDF2 releases the GIL, so hashing on these threads leaves the event
+    loop (or the request workers) free for cheap requests. At most
+    ``workers + max_queue`` jobs are admitted at once; beyond that ``run``
+    raises ``HashPoolSaturated`` instead of queueing without bound.
+    """
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def queue_depth(self):
+        """Jobs admitted but still waiting for a worker thread."""
+        return max(0, self._in_flight - self.workers)
+
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                rejected_jobs.inc()
+                raise HashPoolSaturated()
+            self._in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, func, *args):
+        self._admit()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._release()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide hashing pool, creating it from settings."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    workers=getattr(settings, 'PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)),
+                    max_queue=getattr(settings, 'PASSWORD_HASH_MAX_QUEUE', 32),
+                )
+    return _pool
+
+
+def _pool_stat(attr):
+    return lambda: getattr(_pool, attr) if _pool is not None else 0
+
+
+rejected_jobs = metrics.Counter(
+    'careerai_password_hash_rejected_total', 'Password hashing jobs rejected because the queue was full.'
+)
+metrics.Gauge(
+    'careerai_password_hash_queue_depth', 'Password hashing jobs waiting for a worker.', _pool_stat('queue_depth')
+)
+metrics.Gauge(
+    'careerai_password_hash_in_flight', 'Password hashing jobs admitted to the pool.', _pool_stat('in_flight')
+)
@@ -0,0 +1,460 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import django
+from asgiref.sync import ThreadSensitiveContext, async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from careerai import middleware
+
+from user_registration import throttling
+from user_registration.models import (
+    User, UserProfile, Skill, Company, Location, EducationLevel,
+    EmploymentType, DesiredWorkEnvironment, JobRole
+)
+from user_registration.api import fast_serializers, renderers
+from user_registration.api.serializers import UserProfileDetailSerializer
+from user_registration.api.views import PROFILE_M2M_FIELDS, PROFILE_RELATED_FIELDS
+
+BENCH_PASSWORD = 'bench-password-1'
+
+# Budgets checked by --check: mean queries per request and p95 latency (ms).
+# Query budgets match what the endpoints issue today; latency budgets are
+# deliberately loose, as they depend on the machine.
+BUDGETS = {
+    'register': {'queries': 3, 'p95_ms': 2000},
+    'login': {'queries': 2, 'p95_ms': 2000},
+    'login_throttled': {'queries': 0, 'p95_ms': 20},
+    'profiles_me': {'queries': 2, 'p95_ms': 100},
+    'profiles_me_not_modified': {'queries': 1, 'p95_ms': 20},
+    'profile_list': {'queries': 5, 'p95_ms': 200},
+    'profile_retrieve': {'queries': 2, 'p95_ms': 50},
+    # The MinHash signature refresh adds 7 queries unless it runs in the background
+    'profile_update': {
+        'queries': 9 if getattr(settings, 'PROFILE_SIGNATURE_REFRESH_IN_BACKGROUND', True) else 16,
+        'p95_ms': 100,
+    },
+}
+# One login per address: login requests come from a new address each, so only
+# login_throttled, repeating one address, is rejected
+BENCH_THROTTLES = {'login': {'ip': ('sliding_window', 1, 3600)}}
+
+BULK_BUDGET = {'queries': 5, 'p95_ms': 250}
+
+# Reference viewsets with a _bulk_create path: (route basename, bulk key, model)
+BULK_ENDPOINTS = (
+    ('skill', 'skills', Skill),
+    ('company', 'companies', Company),
+    ('location', 'locations', Location),
+    ('educationlevel', 'education_levels', EducationLevel),
+    ('employmenttype', 'employment_types', EmploymentType),
+    ('desiredworkenvironment', 'work_environments', DesiredWorkEnvironment),
+    ('jobrole', 'job_roles', JobRole),
+)
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _address(n):
+    """A distinct private IPv4 address for each ``n`` below 2 ** 24."""
+    return f'10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}'
+
+
+class _Rendered:
+    """Stands in for a response in scenarios that only serialize or encode."""
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+        self.content = data if isinstance(data, bytes) else None
+
+
+class _Batch:
+    """Stands in for a response in scenarios that issue concurrent requests."""
+
+    def __init__(self, responses):
+        self.requests = len(responses)
+        statuses = {response.status_code for response in responses}
+        self.status_code = statuses.pop() if len(statuses) == 1 else sorted(statuses)
+        self.content = responses[0].content
+
+
+def _body_size(response):
+    content = None if getattr(response, 'streaming', False) else getattr(response, 'content', None)
+    return None if content is None else len(content)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextlib.contextmanager
+def _sqlite_database(path):
+    """
+    Point every database alias at a new, migrated SQLite file at ``path``,
+    and delete it on exit. The configured databases are never opened.
+    """
+    names = {}
+    for conn in connections.all():
+        conn.close()
+        names[conn.alias] = conn.settings_dict['NAME']
+        conn.settings_dict['NAME'] = path
+    _remove_sqlite(path)
+    try:
+        call_command('migrate', verbosity=0, interactive=False, run_syncdb=True)
+        yield
+    finally:
+        connections.close_all()
+        for conn in connections.all():
+            conn.settings_dict['NAME'] = names[conn.alias]
+        _remove_sqlite(path)
+
+
+def _remove_sqlite(path):
+    for name in (path, f'{path}-wal', f'{path}-shm', f'{path}-journal'):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(name)
+
+
+class Seeder:
+    """Fills the benchmark database with users, profiles and reference rows."""
+
+    def __init__(self, rng, users, reference_rows):
+        self.rng = rng
+        self.users = users
+        self.reference_rows = reference_rows
+
+    def _names(self, model, prefix, count):
+        model.objects.bulk_create([
+            model(name=f'{prefix} {i}', name_key=f'{prefix.lower()} {i}') for i in range(count)
+        ])
+        return list(model.objects.values_list('id', flat=True))
+
+    def seed(self):
+        skills = self._names(Skill, 'Skill', self.reference_rows)
+        companies = self._names(Company, 'Company', self.reference_rows)
+        roles = self._names(JobRole, 'Role', self.reference_rows)
+        locations = self._names(Location, 'Location', self.reference_rows)
+        levels = self._names(EducationLevel, 'Level', min(self.reference_rows, 20))
+        types = self._names(EmploymentType, 'Type', min(self.reference_rows, 10))
+        DesiredWorkEnvironment.objects.bulk_create([
+            DesiredWorkEnvironment(name=name) for name, _ in UserProfile.WORK_ENVIRONMENT_CHOICES
+        ])
+        environments = list(DesiredWorkEnvironment.objects.values_list('id', flat=True))
+
+        # One real hash shared by every seeded user keeps seeding fast
+        password = make_password(BENCH_PASSWORD)
+        User.objects.bulk_create([
+            User(email=f'bench{i}@example.com', username=f'bench{i}', password=password, is_profile_completed=True)
+            for i in range(self.users)
+        ], batch_size=500)
+        rng = self.rng
+        UserProfile.objects.bulk_create([
+            UserProfile(
+                user_id=user_id,
+                location_id=rng.choice(locations),
+                education_level_id=rng.choice(levels),
+                preferred_employment_type_id=rng.choice(types),
+                years_of_experience=rng.randint(0, 25),
+                is_actively_job_searching=rng.random() < 0.4,
+            )
+            for user_id in User.objects.values_list('id', flat=True)
+        ], batch_size=500)
+
+        links = (
+            ('skills', skills, 8), ('companies_of_interest', companies, 3),
+            ('job_roles_of_interest', roles, 3), ('desired_work_environments', environments, 2),
+        )
+        profile_ids = list(UserProfile.objects.values_list('id', flat=True))
+        for field_name, targets, per_profile in links:
+            field = UserProfile._meta.get_field(field_name)
+            through = field.remote_field.through
+            source, target = field.m2m_field_name() + '_id', field.m2m_reverse_field_name() + '_id'
+            through.objects.bulk_create([
+                through(**{source: profile_id, target: target_id})
+                for profile_id in profile_ids
+                for target_id in rng.sample(targets, min(per_profile, len(targets)))
+            ], batch_size=500)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the API endpoints against a freshly seeded SQLite database and "
+        "writes latency percentiles, throughput, queries and allocations per request as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Users (each with a profile) to seed.")
+        parser.add_argument('--reference-rows', type=int, default=1000, help="Rows per reference table.")
+        parser.add_argument('--iterations', type=int, default=100, help="Measured requests per scenario.")
+        parser.add_argument('--hash-iterations', type=int, default=5,
+                            help="Measured requests for scenarios that hash a password.")
+        parser.add_argument('--bulk-size', type=int, default=200, help="Names per bulk-create request.")
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help="Requests in flight at once in the concurrent_* scenarios.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+        parser.add_argument('--database', default='benchmark.sqlite3', help="SQLite file to (re)create.")
+        parser.add_argument('--only', nargs='*', help="Run only these scenarios.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+        parser.add_argument('--check', action='store_true', help="Fail if a scenario exceeds its budget.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The benchmark runs against SQLite only.")
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+
+        database = os.path.abspath(options['database'])
+        setup_test_environment()
+        try:
+            with _sqlite_database(database):
+                cache.clear()
+                started = time.perf_counter()
+                Seeder(self.rng, options['users'], options['reference_rows']).seed()
+                seed_seconds = time.perf_counter() - started
+                throttling.reset()
+                # Rejected requests would each log a warning
+                request_logger = logging.getLogger('django.request')
+                level = request_logger.level
+                request_logger.setLevel(logging.ERROR)
+                try:
+                    with override_settings(AUTH_THROTTLES=BENCH_THROTTLES):
+                        results = self.run_scenarios()
+                finally:
+                    request_logger.setLevel(level)
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'revision': _git_revision(),
+                'database': database,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'users': options['users'],
+                'reference_rows': options['reference_rows'],
+                'seed_seconds': round(seed_seconds, 3),
+            },
+            'scenarios': results,
+        }
+        payload = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+        if options['check']:
+            self.check_budgets(results)
+
+    # Scenarios
+
+    def scenarios(self):
+        """Yield ``(name, iterations, make_request)``; each call issues one request."""
+        iterations = self.options['iterations']
+        hash_iterations = self.options['hash_iterations']
+        rng = self.rng
+
+        user = User.objects.order_by('id').first()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        profile_ids = list(UserProfile.objects.values_list('id', flat=True))
+        own_profile = UserProfile.objects.get(user=user)
+        skill_ids = list(Skill.objects.values_list('id', flat=True)[:50])
+        anonymous = APIClient()
+
+        counter = iter(range(sys.maxsize))
+        yield 'register', hash_iterations, lambda: anonymous.post(reverse('user-register'), {
+            **dict.fromkeys(['email', 'username'], f'new{next(counter)}@example.com'), 'password': BENCH_PASSWORD,
+        }, format='json')
+        yield 'login', hash_iterations, lambda: anonymous.post(reverse('user-login'), {
+            'email': user.email, 'password': BENCH_PASSWORD,
+        }, format='json', REMOTE_ADDR=_address(next(counter)))
+        # Rejected by the rate limit before the body is parsed
+        throttled = APIClient(REMOTE_ADDR='203.0.113.1')
+        yield 'login_throttled', iterations, lambda: throttled.post(reverse('user-login'), {
+            'email': user.email, 'password': BENCH_PASSWORD,
+        }, format='json')
+
+        me_url = reverse('userprofile-me')
+        yield 'profiles_me', iterations, lambda: client.get(me_url)
+        etag = client.get(me_url)['ETag']
+        yield 'profiles_me_not_modified', iterations, lambda: client.get(me_url, HTTP_IF_NONE_MATCH=etag)
+
+        # The same body in other encodings and layouts; compare response_kb
+        yield 'profiles_me_gzip', iterations, lambda: client.get(me_url, HTTP_ACCEPT_ENCODING='gzip')
+        if middleware.brotli is not None:
+            yield 'profiles_me_brotli', iterations, lambda: client.get(me_url, HTTP_ACCEPT_ENCODING='br, gzip')
+        if renderers.msgpack is not None:
+            yield 'profiles_me_msgpack', iterations, lambda: client.get(me_url, HTTP_ACCEPT='application/msgpack')
+        yield 'profiles_me_columns', iterations, lambda: client.get(me_url, {'reference_layout': 'columns'})
+        yield 'profiles_me_columns_gzip', iterations, lambda: client.get(
+            me_url, {'reference_layout': 'columns'}, HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        # Encoding alone, on the profiles/me payload
+        me_data = client.get(me_url).json()
+        yield 'render_me_json_drf', iterations, lambda: _Rendered(JSONRenderer().render(me_data))
+        yield 'render_me_json_fast', iterations, lambda: _Rendered(renderers.FastJSONRenderer().render(me_data))
+
+        yield 'profile_list', iterations, lambda: client.get(reverse('userprofile-list'))
+        yield 'profile_retrieve', iterations, lambda: client.get(
+            reverse('userprofile-detail', args=[rng.choice(profile_ids)])
+        )
+        yield 'profile_update', iterations, lambda: client.patch(
+            reverse('userprofile-detail', args=[own_profile.pk]),
+            {'skills': rng.sample(skill_ids, 5), 'years_of_experience': rng.randint(0, 25)},
+            format='json'
+        )
+
+        # The detail serializer against the fast read path, on a page of profiles
+        page = UserProfile.objects.filter(pk__in=rng.sample(profile_ids, min(50, len(profile_ids)))).order_by('id')
+        yield 'serialize_page_drf', iterations, lambda: _Rendered(UserProfileDetailSerializer(
+            page.select_related(*PROFILE_RELATED_FIELDS).prefetch_related(*PROFILE_M2M_FIELDS), many=True
+        ).data)
+        yield 'serialize_page_fast', iterations, lambda: _Rendered(fast_serializers.render_profiles(page))
+
+        # Concurrent reads on one process: the native async views against the
+        # DRF views they stand in for, reached by a client whose handler runs
+        # without AsyncRoutesMiddleware. One measured "request" is a batch;
+        # throughput_rps counts its requests.
+        async_client, drf_client = AsyncClient(), AsyncClient()
+        with override_settings(ASYNC_ROOT_URLCONF=None):
+            drf_client.handler.load_middleware(is_async=True)
+        auth_headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        concurrency = self.options['concurrency']
+        concurrent_urls = {
+            'profiles_me': lambda: me_url,
+            'profile_retrieve': lambda: reverse('userprofile-detail', args=[rng.choice(profile_ids)]),
+            'skill_list': lambda: reverse('skill-list'),
+        }
+        for name, make_url in concurrent_urls.items():
+            for variant, variant_client in (('async', async_client), ('sync', drf_client)):
+                yield f'concurrent_{name}_{variant}', max(1, iterations // concurrency), (
+                    lambda make_url=make_url, variant_client=variant_client: _Batch(async_to_sync(self.gather)(
+                        variant_client, [make_url() for _ in range(concurrency)], auth_headers
+                    ))
+                )
+
+        bulk_size = self.options['bulk_size']
+        for basename, key, model in BULK_ENDPOINTS:
+            if model is DesiredWorkEnvironment:
+                names = [name for name, _ in UserProfile.WORK_ENVIRONMENT_CHOICES]
+                make_payload = lambda names=names: {key: names}
+            else:
+                # Half existing names, half new ones
+                existing = list(model.objects.values_list('name', flat=True)[:bulk_size // 2])
+                make_payload = lambda key=key, existing=existing: {key: existing + [
+                    f'{key} new {next(counter)}' for _ in range(bulk_size - len(existing))
+                ]}
+            url = reverse(f'{basename}-list')
+            yield f'bulk_create_{key}', iterations, (
+                lambda url=url, make_payload=make_payload: client.post(url, make_payload(), format='json')
+            )
+
+    @staticmethod
+    async def gather(client, urls, headers):
+        async def get(url):
+            # As under ASGIHandler, each request gets its own thread for sync
+            # code; the test client would run all of them on one
+            async with ThreadSensitiveContext():
+                return await client.get(url, headers=headers)
+        return await asyncio.gather(*(get(url) for url in urls))
+
+    def run_scenarios(self):
+        only = set(self.options['only'] or ())
+        results = {}
+        for name, iterations, make_request in self.scenarios():
+            if only and name not in only:
+                continue
+            results[name] = self.measure(make_request, iterations)
+            self.stderr.write(
+                f"{name}: p50 {results[name]['p50_ms']}ms, p95 {results[name]['p95_ms']}ms, "
+                f"{results[name]['queries']} queries"
+            )
+        return results
+
+    def measure(self, make_request, iterations, warmup=2):
+        for _ in range(warmup):
+            make_request()
+
+        latencies, queries, statuses, sizes = [], [], set(), []
+        requests = 0
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = make_request()
+                latencies.append(time.perf_counter() - started)
+            requests += getattr(response, 'requests', 1)
+            queries.append(len(captured))
+            statuses.update(response.status_code if isinstance(response.status_code, list) else [response.status_code])
+            size = _body_size(response)
+            if size is not None:
+                sizes.append(size)
+
+        # Allocations are traced in a separate pass so tracing does not skew latency
+        allocated = []
+        for _ in range(min(iterations, 10)):
+            tracemalloc.start()
+            make_request()
+            allocated.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        total = sum(latencies)
+        return {
+            'iterations': iterations,
+            'statuses': sorted(statuses),
+            'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+            'throughput_rps': round(requests / total, 1) if total else None,
+            'queries': round(statistics.fmean(queries), 2),
+            'peak_alloc_kb': round(statistics.fmean(allocated) / 1024, 1),
+            'response_kb': round(statistics.fmean(sizes) / 1024, 2) if sizes else None,
+        }
+
+    def check_budgets(self, results):
+        failures = []
+        for name, result in results.items():
+            budget = BUDGETS.get(name, BULK_BUDGET if name.startswith('bulk_create_') else None)
+            if budget is None:
+                continue
+            if result['queries'] > budget['queries']:
+                failures.append(f"{name}: {result['queries']} queries > {budget['queries']}")
+            if result['p95_ms'] > budget['p95_ms']:
+                failures.append(f"{name}: p95 {result['p95_ms']}ms > {budget['p95_ms']}ms")
+        if failures:
+            raise CommandError("Benchmark budgets exceeded:\n  " + "\n  ".join(failures))
@@ -0,0 +1,292 @@
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import URLValidator, validate_email
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from user_registration import similarity
+from user_registration.bulk import bulk_resolve, invalid_names
+from user_registration.models import (
+    User, UserProfile, Skill, Company, Location, EducationLevel,
+    EmploymentType, DesiredWorkEnvironment, JobRole
+)
+from user_registration.api.export import split_list
+
+# Name-valued columns and the reference model they resolve to
+FOREIGN_KEYS = {
+    'location': Location,
+    'education_level': EducationLevel,
+    'preferred_employment_type': EmploymentType,
+}
+MANY_TO_MANY = {
+    'skills': Skill,
+    'companies_of_interest': Company,
+    'job_roles_of_interest': JobRole,
+    'desired_work_environments': DesiredWorkEnvironment,
+}
+
+EMPLOYMENT_STATUSES = dict(UserProfile.EMPLOYMENT_STATUS_CHOICES)
+WORK_ENVIRONMENTS = dict(UserProfile.WORK_ENVIRONMENT_CHOICES)
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+_validate_url = URLValidator()
+# Runs the model's username validators, including its max_length
+_username_field = User._meta.get_field('username')
+# Bounds years_of_experience to what the database column holds
+_years_field = UserProfile._meta.get_field('years_of_experience')
+
+
+class RowError(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users and profiles from a CSV or NDJSON file (or '-' for "
+        "stdin) in constant memory. Reference names are resolved per chunk, "
+        "and users, profiles and M2M rows are bulk-inserted in one "
+        "transaction per chunk. Rows whose email or username already exists "
+        "are skipped. Running servers pick the new profiles up in matching "
+        "and faceted search at their next index rebuild."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin.")
+        parser.add_argument('--format', choices=('csv', 'ndjson'), help="Input format; guessed from the extension by default.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows per transaction.")
+        parser.add_argument(
+            '--list-separator', default=';',
+            help="Separator of list values in CSV cells; values holding it are double-quoted.",
+        )
+        parser.add_argument(
+            '--hash-workers', type=int, default=getattr(settings, 'PASSWORD_HASH_WORKERS', 1),
+            help="Threads hashing passwords. Rows without a password get an unusable one.",
+        )
+
+    def handle(self, *args, path, chunk_size, list_separator, hash_workers, **options):
+        input_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if len(list_separator) != 1 or list_separator == '"':
+            raise CommandError("--list-separator must be one character other than '\"'.")
+        self.list_separator = list_separator
+        self.imported = self.skipped = 0
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        started = time.monotonic()
+        try:
+            rows = self.read_csv(stream) if input_format == 'csv' else self.read_ndjson(stream)
+            with ThreadPoolExecutor(max_workers=max(1, hash_workers)) as hasher:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    self.import_chunk(chunk, hasher)
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(
+                        f"{self.imported} imported, {self.skipped} skipped "
+                        f"({(self.imported + self.skipped) / elapsed:.0f} rows/s)"
+                    )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.imported} profiles and skipped {self.skipped} rows in {elapsed:.2f}s "
+            f"({self.imported / elapsed if elapsed else 0:.0f} profiles/s)"
+        ))
+
+    # Reading: each reader yields (line number, raw row or RowError)
+
+    def read_csv(self, stream):
+        reader = csv.DictReader(stream)
+        for raw in reader:
+            yield reader.line_num, raw
+
+    def read_ndjson(self, stream):
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError as e:
+                yield line_number, RowError(f"invalid JSON: {e}")
+                continue
+            yield line_number, raw if isinstance(raw, dict) else RowError("expected a JSON object")
+
+    # Parsing
+
+    def parse_row(self, raw):
+        if isinstance(raw, RowError):
+            raise raw
+
+        email = self.text(raw, 'email')
+        if not email:
+            raise RowError("email is required")
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise RowError(f"invalid email {email!r}")
+        email = User.objects.normalize_email(email)
+
+        # Without a username column the email stands in, if it is a valid one
+        username = self.text(raw, 'username')
+        source = 'username' if username else 'email as username'
+        username = User.normalize_username(username or email)
+        try:
+            _username_field.run_validators(username)
+        except ValidationError as e:
+            raise RowError(f"invalid {source} {username!r}: {' '.join(e.messages)}")
+
+        employment_status = self.text(raw, 'employment_status') or None
+        if employment_status is not None and employment_status not in EMPLOYMENT_STATUSES:
+            raise RowError(f"unknown employment_status {employment_status!r}")
+
+        portfolio_url = self.text(raw, 'portfolio_url') or None
+        if portfolio_url is not None:
+            try:
+                _validate_url(portfolio_url)
+            except ValidationError:
+                raise RowError(f"invalid portfolio_url {portfolio_url!r}")
+
+        try:
+            years = int(raw.get('years_of_experience') or 0)
+        except (TypeError, ValueError):
+            raise RowError("years_of_experience must be an integer")
+        try:
+            _years_field.run_validators(years)
+        except ValidationError as e:
+            raise RowError(f"invalid years_of_experience {years}: {' '.join(e.messages)}")
+
+        active = raw.get('is_actively_job_searching')
+        if not isinstance(active, bool):
+            active = str(active or '').strip().lower() in TRUE_VALUES
+
+        row = {
+            'email': email,
+            'username': username,
+            'password': self.text(raw, 'password'),
+            'employment_status': employment_status,
+            'years_of_experience': years,
+            'is_actively_job_searching': active,
+            'career_vision': self.text(raw, 'career_vision') or None,
+            'portfolio_url': portfolio_url,
+        }
+        for field in FOREIGN_KEYS:
+            row[field] = self.text(raw, field) or None
+        for field in MANY_TO_MANY:
+            row[field] = self.names(raw, field)
+        unknown = [name for name in row['desired_work_environments'] if name not in WORK_ENVIRONMENTS]
+        if unknown:
+            raise RowError(f"unknown desired_work_environments {unknown!r}")
+        # Too long for the name column, say; bulk_resolve would reject the chunk
+        for field, model in {**FOREIGN_KEYS, **MANY_TO_MANY}.items():
+            names = row[field] if field in MANY_TO_MANY else [row[field]] if row[field] else []
+            invalid = [names[index] for index in invalid_names(model, names)]
+            if invalid:
+                raise RowError(f"invalid {field} {invalid!r}")
+        return row
+
+    def text(self, raw, field):
+        value = raw.get(field)
+        return '' if value is None else str(value).strip()
+
+    def names(self, raw, field):
+        value = raw.get(field) or []
+        if isinstance(value, str):
+            value = split_list(value, self.list_separator)
+        names = [str(name).strip() for name in value]
+        return list(dict.fromkeys(name for name in names if name))
+
+    # Writing
+
+    def import_chunk(self, chunk, hasher):
+        rows, lines = [], []
+        seen_emails, seen_usernames = set(), set()
+        for line_number, raw in chunk:
+            try:
+                row = self.parse_row(raw)
+            except RowError as e:
+                self.skip(line_number, e)
+                continue
+            if row['email'] in seen_emails or row['username'] in seen_usernames:
+                self.skip(line_number, "duplicate email or username in this chunk")
+                continue
+            seen_emails.add(row['email'])
+            seen_usernames.add(row['username'])
+            rows.append(row)
+            lines.append(line_number)
+
+        # Earlier chunks are committed by now, so this also catches repeats across chunks
+        taken = list(User.objects.filter(
+            Q(email__in=seen_emails) | Q(username__in=seen_usernames)
+        ).values_list('email', 'username'))
+        taken_emails = {email for email, _ in taken}
+        taken_usernames = {username for _, username in taken}
+        kept = []
+        for line_number, row in zip(lines, rows):
+            if row['email'] in taken_emails or row['username'] in taken_usernames:
+                self.skip(line_number, f"user {row['email']} already exists")
+            else:
+                kept.append(row)
+        if not kept:
+            return
+
+        # Hashing dominates the import; hashlib releases the GIL. Done
+        # before the transaction so it holds no locks meanwhile.
+        passwords = list(hasher.map(lambda row: make_password(row['password'] or None), kept))
+
+        try:
+            with transaction.atomic():
+                resolved = {
+                    field: bulk_resolve(model, [row[field] for row in kept if row[field]])
+                    for field, model in FOREIGN_KEYS.items()
+                }
+                for field, model in MANY_TO_MANY.items():
+                    resolved[field] = bulk_resolve(model, [name for row in kept for name in row[field]])
+
+                users = User.objects.bulk_create([
+                    User(email=row['email'], username=row['username'], password=password, is_profile_completed=True)
+                    for row, password in zip(kept, passwords)
+                ])
+                profiles = UserProfile.objects.bulk_create([
+                    UserProfile(
+                        user=user,
+                        employment_status=row['employment_status'],
+                        years_of_experience=row['years_of_experience'],
+                        is_actively_job_searching=row['is_actively_job_searching'],
+                        career_vision=row['career_vision'],
+                        portfolio_url=row['portfolio_url'],
+                        **{f'{field}_id': resolved[field].get(row[field]) for field in FOREIGN_KEYS},
+                    )
+                    for row, user in zip(kept, users)
+                ])
+                for field in MANY_TO_MANY:
+                    m2m = UserProfile._meta.get_field(field)
+                    through = m2m.remote_field.through
+                    source, target = m2m.m2m_field_name() + '_id', m2m.m2m_reverse_field_name() + '_id'
+                    # Distinct spellings of one name resolve to the same row
+                    through.objects.bulk_create([
+                        through(**{source: profile.pk, target: target_id})
+                        for row, profile in zip(kept, profiles)
+                        for target_id in dict.fromkeys(resolved[field][name] for name in row[field])
+                    ])
+
+                # bulk_create skips the m2m_changed receivers that keep signatures current
+                similarity.refresh([profile.pk for profile in profiles])
+        except DatabaseError as e:
+            raise CommandError(f"Chunk starting at line {lines[0]} failed and was rolled back: {e}")
+
+        self.imported += len(kept)
+
+    def skip(self, line_number, reason):
+        self.skipped += 1
+        self.stderr.write(f"Line {line_number}: {reason}")
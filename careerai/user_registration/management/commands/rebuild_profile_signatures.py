@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_registration import similarity
+from user_registration.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the MinHash signatures and LSH buckets behind the "
+        "similar-profiles endpoint, in batches of profiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Profiles refreshed per transaction.")
+
+    def handle(self, *args, batch_size, **options):
+        started = time.monotonic()
+        total = last_id = 0
+
+        while True:
+            ids = list(
+                UserProfile.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            similarity.refresh(ids)
+            total += len(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed signatures of {total} profiles ({time.monotonic() - started:.2f}s)"
+        ))
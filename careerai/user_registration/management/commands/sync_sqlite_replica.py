@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from careerai import db_router
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the primary SQLite database onto the SQLite file standing in "
+        "for the read replica (CAREERAI_REPLICA_DB), using SQLite's online "
+        "backup. For local testing of replica routing; real replicas are kept "
+        "current by replication."
+    )
+
+    def handle(self, *args, **options):
+        alias = db_router.replica_alias()
+        if alias is None:
+            raise CommandError("No replica configured; set CAREERAI_REPLICA_DB.")
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("Only SQLite databases can be copied this way.")
+
+        started = time.monotonic()
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']} to "
+            f"{settings.DATABASES[alias]['NAME']} ({time.monotonic() - started:.2f}s)"
+        ))
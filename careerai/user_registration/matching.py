@@ -0,0 +1,130 @@
+"""
+Candidate matching: rank actively searching profiles by how many of a skill
+set they have, breaking ties on years of experience.
+
+Overlap counts are computed for every profile at once over the bitmaps of
+``profile_index``: each skill bitmap is added into bit-sliced counters (one
+bitmap per bit of the count), so scoring costs a handful of big-int
+operations per skill rather than a loop over profiles.
+"""
+import heapq
+import time
+
+from user_registration.profile_index import YEARS_CAP, count, intersect, iter_slots, profile_index
+
+DEFAULT_K = 20
+MAX_K = 100
+
+# Skills taken to describe a company or job role, and how long that lasts
+INTEREST_SKILLS = 10
+INTEREST_SKILLS_TTL = 300
+INTEREST_SKILLS_MEMO_SIZE = 10000
+
+_interest_skills = {}  # (field, id) -> (expires at, skill ids)
+
+
+def interest_skills(field, value_id, limit=INTEREST_SKILLS):
+    """
+    Skills most common among profiles interested in a company or job role
+    (``field`` is ``companies_of_interest`` or ``job_roles_of_interest``).
+    """
+    key = (field, value_id)
+    cached = _interest_skills.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    profile_index.ensure_fresh()
+    with profile_index.lock:
+        interested = intersect(profile_index.bitmaps[field].get(value_id, {}), profile_index.alive)
+        counts = []
+        if interested:
+            for skill_id, bitmap in profile_index.bitmaps['skills'].items():
+                overlap = count(intersect(interested, bitmap))
+                if overlap:
+                    counts.append((overlap, -skill_id))
+    skills = [-skill_id for _, skill_id in heapq.nlargest(limit, counts)]
+    if len(_interest_skills) >= INTEREST_SKILLS_MEMO_SIZE:
+        _interest_skills.clear()
+    _interest_skills[key] = (time.monotonic() + INTEREST_SKILLS_TTL, skills)
+    return skills
+
+
+def _candidate_mask(locations, work_environments, min_years, max_years, active_only):
+    mask = profile_index.alive
+    if active_only:
+        mask = intersect(mask, profile_index.bitmaps['is_actively_job_searching'].get(True, {}))
+    if locations:
+        mask = intersect(mask, profile_index.value_bitmap('location', locations))
+    if work_environments:
+        mask = intersect(mask, profile_index.value_bitmap('desired_work_environments', work_environments))
+    if min_years is not None or max_years is not None:
+        mask = intersect(mask, profile_index.years_bitmap(min_years, max_years))
+    return mask
+
+
+def _overlap_counters(mask, skill_ids):
+    """Bit-sliced overlap counts per chunk: ``{chunk: [bit 0, bit 1, ...]}``."""
+    counters = {}
+    for skill_id in skill_ids:
+        for chunk, bits in intersect(mask, profile_index.bitmaps['skills'].get(skill_id, {})).items():
+            planes = counters.setdefault(chunk, [])
+            carry = bits
+            for i, plane in enumerate(planes):
+                planes[i] = plane ^ carry
+                carry &= plane
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+    return counters
+
+
+def _with_overlap(mask, counters, overlap):
+    """Profiles in ``mask`` whose overlap count equals ``overlap``."""
+    result = {}
+    for chunk, planes in counters.items():
+        if overlap >> len(planes):
+            continue
+        bits = mask[chunk]
+        for i, plane in enumerate(planes):
+            bits &= plane if overlap >> i & 1 else ~plane
+            if not bits:
+                break
+        if bits:
+            result[chunk] = bits
+    return result
+
+
+def match(skill_ids, k=DEFAULT_K, locations=(), work_environments=(), min_years=None, max_years=None, active_only=True):
+    """
+    Return the top ``k`` profiles for ``skill_ids`` as dicts with the
+    profile id, skill overlap, years of experience and a score.
+
+    Profiles are ranked by overlap, then years of experience (capped at
+    ``YEARS_CAP``); the score, ``overlap + years / (YEARS_CAP + 1)``, follows
+    the same order.
+    """
+    skill_ids = list(dict.fromkeys(skill_ids))
+    profile_index.ensure_fresh()
+    results = []
+    with profile_index.lock:
+        mask = _candidate_mask(locations, work_environments, min_years, max_years, active_only)
+        counters = _overlap_counters(mask, skill_ids)
+        years_bitmaps = sorted(profile_index.bitmaps['years_of_experience'].items(), reverse=True)
+
+        # Walk (overlap, years) buckets best first until k profiles are found
+        for overlap in range(len(skill_ids), 0, -1):
+            matched = _with_overlap(mask, counters, overlap)
+            if not matched:
+                continue
+            for years, years_bitmap in years_bitmaps:
+                for slot in iter_slots(intersect(matched, years_bitmap)):
+                    results.append({
+                        'profile': profile_index.profile_ids[slot],
+                        'skill_overlap': overlap,
+                        'years_of_experience': profile_index.scalars['years_of_experience'][slot],
+                        'score': round(overlap + years / (YEARS_CAP + 1), 4),
+                    })
+                    if len(results) == k:
+                        return results
+    return results
@@ -0,0 +1,49 @@
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+NORMALIZED_MODELS = ('Skill', 'Company', 'Location', 'EducationLevel', 'EmploymentType', 'JobRole')
+
+
+def normalize_name(name):
+    # Frozen copy of user_registration.models.normalize_name
+    return ' '.join(name.split()).casefold()
+
+
+def backfill_name_key(apps, schema_editor):
+    """
+    Fill ``name_key`` for existing rows and log names that collide.
+
+    The oldest row keeps the plain key; later duplicates get their primary key
+    appended so the unique constraint can be applied. Merge them by hand.
+    """
+    for model_name in NORMALIZED_MODELS:
+        model = apps.get_model('user_registration', model_name)
+        seen = {}
+        updated = []
+        for obj in model.objects.order_by('pk').only('pk', 'name'):
+            key = normalize_name(obj.name)
+            if key in seen:
+                logger.warning(
+                    "%s name collision: %r (id=%s) normalizes like %r (id=%s)",
+                    model_name, obj.name, obj.pk, seen[key].name, seen[key].pk
+                )
+                key = f'{key}#{obj.pk}'
+            else:
+                seen[key] = obj
+            obj.name_key = key
+            updated.append(obj)
+        model.objects.bulk_update(updated, ['name_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_registration', '0002_add_name_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_name_key, migrations.RunPython.noop),
+    ]
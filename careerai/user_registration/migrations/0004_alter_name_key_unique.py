@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+NORMALIZED_MODELS = ('skill', 'company', 'location', 'educationlevel', 'employmenttype', 'jobrole')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_registration', '0003_backfill_name_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name=model_name,
+            name='name_key',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        )
+        for model_name in NORMALIZED_MODELS
+    ]
@@ -2,7 +2,6 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from django.core.exceptions import ValidationError
 
 class User(AbstractUser):
     email = models.EmailField(_('email address'), unique=True)
@@ -31,14 +30,39 @@ class User(AbstractUser):
         return self.email
 
 
-class Skill(models.Model):
+def normalize_name(name):
+    """Casefold a reference name and collapse its whitespace to single spaces."""
+    return ' '.join(name.split()).casefold()
+
+
+class NormalizedNameModel(models.Model):
+    """
+    Keeps a normalized copy of ``name`` in the unique, indexed ``name_key``.
+    
+    Case-insensitive lookups should filter on ``name_key`` rather than
+    ``name__iexact``, which the index on ``name`` cannot serve.
+    """
+    name_key = models.CharField(max_length=255, unique=True, editable=False)
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+
+
+class Skill(NormalizedNameModel):
     name = models.CharField(max_length=100, unique=True)
     
     def __str__(self):
         return self.name
 
 
-class Company(models.Model):
+class Company(NormalizedNameModel):
     name = models.CharField(max_length=100, unique=True)
     
     class Meta:
@@ -48,21 +72,21 @@ class Company(models.Model):
         return self.name
 
 
-class Location(models.Model):
+class Location(NormalizedNameModel):
     name = models.CharField(max_length=100, unique=True)
     
     def __str__(self):
         return self.name
 
 
-class EducationLevel(models.Model):
+class EducationLevel(NormalizedNameModel):
     name = models.CharField(max_length=100, unique=True)
     
     def __str__(self):
         return self.name
 
 
-class EmploymentType(models.Model):
+class EmploymentType(NormalizedNameModel):
     name = models.CharField(max_length=50, unique=True)
     
     def __str__(self):
@@ -150,19 +174,22 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination walks profiles in (created_at, id) order
+            models.Index(fields=['created_at', 'id'], name='userprofile_created_id_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.email}'s Profile"
     
     def save(self, *args, **kwargs):
-        # Check for existing profile for this user (if this is a new profile)
-        if not self.pk and UserProfile.objects.filter(user=self.user).exists():
-            raise ValidationError("A profile already exists for this user")
-        
-        if not self.pk:  # First save
-            user = self.user
-            user.is_profile_completed = True
-            user.save()
+        adding = self._state.adding
+        # The one-to-one on user already rejects a second profile
         super().save(*args, **kwargs)
+        if adding and not self.user.is_profile_completed:
+            self.user.is_profile_completed = True
+            self.user.save(update_fields=['is_profile_completed'])
 
 
 class DesiredWorkEnvironment(models.Model):
@@ -172,8 +199,41 @@ class DesiredWorkEnvironment(models.Model):
         return self.name
 
 
-class JobRole(models.Model):
+class JobRole(NormalizedNameModel):
     name = models.CharField(max_length=100, unique=True)
     
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class ProfileSignature(models.Model):
+    """MinHash signature of a profile's skills and interests (see similarity.py)."""
+    profile = models.OneToOneField(
+        UserProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature'
+    )
+    signature = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Signature of profile {self.profile_id}"
+
+
+class ProfileLSHBucket(models.Model):
+    """
+    One row per LSH band of a profile's signature. Profiles sharing a bucket
+    are the candidates for similarity lookups.
+    """
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='lsh_buckets')
+    bucket = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [
+            # Covers bucket lookups without touching the table
+            models.Index(fields=['bucket', 'profile'], name='lsh_bucket_profile_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Bucket {self.bucket} of profile {self.profile_id}"
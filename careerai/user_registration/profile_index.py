@@ -0,0 +1,338 @@
+"""
+Per-process bitmap index over ``UserProfile`` rows.
+
+Every profile gets a slot (a bit position). For each value of an indexed
+field (a skill, a location, an employment status, ...) the index keeps a
+bitmap of the profiles that have it. Bitmaps are Python ints split into
+chunks of ``CHUNK_SIZE`` slots, so AND/OR/popcount run in C a machine word at
+a time, and values that only a few profiles share only allocate the chunks
+those profiles live in.
+"""
+import threading
+import time
+from itertools import chain
+
+from django.conf import settings
+from django.db import connections
+
+from user_registration.models import UserProfile
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+
+# Single-valued fields indexed as facets, and the M2M ones
+SCALAR_FIELDS = (
+    'location', 'education_level', 'preferred_employment_type',
+    'employment_status', 'is_actively_job_searching', 'years_of_experience',
+)
+M2M_FIELDS = ('skills', 'companies_of_interest', 'job_roles_of_interest', 'desired_work_environments')
+
+# years_of_experience values at or above this share one bitmap
+YEARS_CAP = 40
+
+# Rows fetched per round trip while building
+BUILD_CHUNK_SIZE = 10000
+
+
+# Bitmap helpers; a bitmap is a ``{chunk number: int}`` dict
+
+def set_bit(bitmap, slot):
+    chunk, bit = divmod(slot, CHUNK_SIZE)
+    bitmap[chunk] = bitmap.get(chunk, 0) | (1 << bit)
+
+
+def clear_bit(bitmap, slot):
+    chunk, bit = divmod(slot, CHUNK_SIZE)
+    value = bitmap.get(chunk, 0) & ~(1 << bit)
+    if value:
+        bitmap[chunk] = value
+    else:
+        bitmap.pop(chunk, None)
+
+
+def union(bitmaps):
+    result = {}
+    for bitmap in bitmaps:
+        for chunk, bits in bitmap.items():
+            result[chunk] = result.get(chunk, 0) | bits
+    return result
+
+
+def intersect(a, b):
+    if len(b) < len(a):
+        a, b = b, a
+    result = {}
+    for chunk, bits in a.items():
+        both = bits & b.get(chunk, 0)
+        if both:
+            result[chunk] = both
+    return result
+
+
+def count(bitmap):
+    return sum(bits.bit_count() for bits in bitmap.values())
+
+
+def iter_slots(bitmap):
+    for chunk in sorted(bitmap):
+        bits = bitmap[chunk]
+        base = chunk << CHUNK_BITS
+        while bits:
+            low = bits & -bits
+            yield base + low.bit_length() - 1
+            bits ^= low
+
+
+def _from_slots(slots):
+    """Build a bitmap from an iterable of slots in one pass per chunk."""
+    buffers = {}
+    for slot in slots:
+        chunk, bit = divmod(slot, CHUNK_SIZE)
+        buffer = buffers.get(chunk)
+        if buffer is None:
+            buffer = buffers[chunk] = bytearray(CHUNK_SIZE // 8)
+        buffer[bit >> 3] |= 1 << (bit & 7)
+    return {chunk: int.from_bytes(buffer, 'little') for chunk, buffer in buffers.items()}
+
+
+def _scalar_attname(field_name):
+    return UserProfile._meta.get_field(field_name).attname
+
+
+def _bitmap_key(field_name, value):
+    if field_name == 'years_of_experience':
+        return min(max(value, 0), YEARS_CAP)
+    return value
+
+
+class ProfileIndex:
+    """
+    Bitmaps for every indexed ``UserProfile`` field value, plus a bitmap of
+    live profiles.
+
+    The index is built on first use and kept current by signal receivers
+    that apply each committed change. Changes made by other processes show
+    up after the periodic rebuild (``PROFILE_INDEX_REBUILD_INTERVAL``
+    seconds); rebuilds run in a background thread while requests keep
+    reading the current index.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self.built_at = None
+        self.stale = False
+        self.version = 0  # bumped on every applied change
+        # Changes committed while a build reads the tables, replayed onto it
+        self._changes = None
+        self.__dict__.update(self._empty_state())
+
+    @staticmethod
+    def _empty_state():
+        return {
+            'slots': {},  # profile id -> slot
+            'profile_ids': [],  # slot -> profile id
+            # Whether slots are in profile id order: true once built, until
+            # a transaction commits a profile after one with a higher id
+            'ids_ordered': True,
+            'scalars': {field: [] for field in SCALAR_FIELDS},  # field -> slot -> value
+            'bitmaps': {field: {} for field in chain(SCALAR_FIELDS, M2M_FIELDS)},
+            'alive': {},
+        }
+
+    # Building
+
+    def build(self):
+        """Build the index from the database, then swap it in."""
+        with self._build_lock:
+            self._build()
+
+    def _build(self):
+        with self.lock:
+            self.stale = False
+            self._changes = []
+        try:
+            state = self._read_state()
+        except BaseException:
+            with self.lock:
+                self._changes = None
+            raise
+        with self.lock:
+            changes, self._changes = self._changes, None
+            self.__dict__.update(state)
+            self.built_at = time.monotonic()
+            # Already applied changes are no-ops when replayed
+            for name, args in changes:
+                getattr(self, name)(*args)
+            self.version += 1
+
+    def _read_state(self):
+        state = self._empty_state()
+        slots, profile_ids, scalars = state['slots'], state['profile_ids'], state['scalars']
+        attnames = [_scalar_attname(field) for field in SCALAR_FIELDS]
+        members = {field: {} for field in SCALAR_FIELDS}
+
+        rows = UserProfile.objects.order_by('id').values_list('id', *attnames)
+        for profile_id, *values in rows.iterator(chunk_size=BUILD_CHUNK_SIZE):
+            slot = len(profile_ids)
+            slots[profile_id] = slot
+            profile_ids.append(profile_id)
+            for field, value in zip(SCALAR_FIELDS, values):
+                scalars[field].append(value)
+                members[field].setdefault(_bitmap_key(field, value), []).append(slot)
+
+        for field in M2M_FIELDS:
+            members[field] = {}
+            m2m = UserProfile._meta.get_field(field)
+            source, target = m2m.m2m_field_name() + '_id', m2m.m2m_reverse_field_name() + '_id'
+            rows = m2m.remote_field.through.objects.values_list(source, target)
+            for profile_id, value in rows.iterator(chunk_size=BUILD_CHUNK_SIZE):
+                slot = slots.get(profile_id)
+                if slot is not None:
+                    members[field].setdefault(value, []).append(slot)
+
+        for field, values in members.items():
+            state['bitmaps'][field] = {value: _from_slots(slots) for value, slots in values.items()}
+        state['alive'] = _from_slots(range(len(profile_ids)))
+        return state
+
+    def ensure_fresh(self):
+        """
+        Build the index on first use, other threads waiting for it. Once
+        built, a stale or expired index keeps serving while a background
+        thread rebuilds it.
+        """
+        if self.built_at is None:
+            with self._build_lock:
+                if self.built_at is None:
+                    self._build()
+            return
+        interval = getattr(settings, 'PROFILE_INDEX_REBUILD_INTERVAL', 600)
+        if self.stale or time.monotonic() - self.built_at > interval:
+            # At most one rebuild at a time
+            if self._build_lock.acquire(blocking=False):
+                threading.Thread(target=self._rebuild, name='profile-index-rebuild', daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self._build()
+        finally:
+            self._build_lock.release()
+            connections.close_all()
+
+    def mark_stale(self):
+        """Rebuild soon, for changes that cannot be applied in place."""
+        with self.lock:
+            self.stale = True
+
+    def clear(self):
+        """Drop the index, so the next use builds it again before reading."""
+        with self._build_lock, self.lock:
+            self.built_at = None
+            self.__dict__.update(self._empty_state())
+
+    # Incremental updates, applied once the change commits
+
+    def _apply(self, name, *args):
+        with self.lock:
+            if self._changes is not None:
+                self._changes.append((name, args))
+            if self.built_at is not None:
+                getattr(self, name)(*args)
+                self.version += 1
+
+    def upsert_profile(self, profile_id, values):
+        """Apply the scalar field ``values`` (keyed by field name) of a profile."""
+        self._apply('_upsert_profile', profile_id, values)
+
+    def remove_profile(self, profile_id):
+        self._apply('_remove_profile', profile_id)
+
+    def add_relations(self, field, profile_ids, value_ids):
+        self._apply('_update_relations', field, profile_ids, value_ids, set_bit)
+
+    def remove_relations(self, field, profile_ids, value_ids):
+        self._apply('_update_relations', field, profile_ids, value_ids, clear_bit)
+
+    def _upsert_profile(self, profile_id, values):
+        slot = self.slots.get(profile_id)
+        if slot is None:
+            if self.profile_ids and profile_id < self.profile_ids[-1]:
+                self.ids_ordered = False
+            slot = self.slots[profile_id] = len(self.profile_ids)
+            self.profile_ids.append(profile_id)
+            for field in SCALAR_FIELDS:
+                self.scalars[field].append(None)
+            set_bit(self.alive, slot)
+            old_values = {}
+        else:
+            old_values = {field: self.scalars[field][slot] for field in SCALAR_FIELDS}
+
+        for field in SCALAR_FIELDS:
+            value = values[field]
+            if field in old_values:
+                if old_values[field] == value:
+                    continue
+                self._clear_value(field, old_values[field], slot)
+            set_bit(self.bitmaps[field].setdefault(_bitmap_key(field, value), {}), slot)
+            self.scalars[field][slot] = value
+
+    def _remove_profile(self, profile_id):
+        slot = self.slots.pop(profile_id, None)
+        if slot is None:
+            return
+        # Slots are never reused; M2M bits of dead slots are masked by ``alive``
+        clear_bit(self.alive, slot)
+        for field in SCALAR_FIELDS:
+            self._clear_value(field, self.scalars[field][slot], slot)
+
+    def _update_relations(self, field, profile_ids, value_ids, operation):
+        bitmaps = self.bitmaps[field]
+        for profile_id in profile_ids:
+            slot = self.slots.get(profile_id)
+            if slot is None:
+                continue
+            for value in value_ids:
+                operation(bitmaps.setdefault(value, {}), slot)
+
+    def _clear_value(self, field, value, slot):
+        key = _bitmap_key(field, value)
+        bitmap = self.bitmaps[field].get(key)
+        if bitmap is not None:
+            clear_bit(bitmap, slot)
+            if not bitmap:
+                del self.bitmaps[field][key]
+
+    # Querying
+
+    def value_bitmap(self, field, values):
+        """Profiles having any of ``values`` for ``field``."""
+        bitmaps = self.bitmaps[field]
+        return union(bitmaps[value] for value in values if value in bitmaps)
+
+    def years_bitmap(self, min_years=None, max_years=None):
+        """Profiles with ``min_years <= years_of_experience <= max_years``."""
+        low = 0 if min_years is None else max(min_years, 0)
+        high = max_years
+        if high is not None and high < low:
+            return {}
+        bitmaps = self.bitmaps['years_of_experience']
+        bitmap = self.value_bitmap(
+            'years_of_experience', range(low, YEARS_CAP if high is None else min(high + 1, YEARS_CAP))
+        )
+        capped = bitmaps.get(YEARS_CAP, {})
+        if high is None and low <= YEARS_CAP:
+            bitmap = union([bitmap, capped])
+        elif high is None or high >= YEARS_CAP:
+            # The capped bitmap holds every value from YEARS_CAP up
+            years = self.scalars['years_of_experience']
+            bitmap = union([bitmap, _from_slots(
+                slot for slot in iter_slots(capped)
+                if years[slot] >= low and (high is None or years[slot] <= high)
+            )])
+        return bitmap
+
+    def to_profile_ids(self, slots):
+        return [self.profile_ids[slot] for slot in slots]
+
+
+profile_index = ProfileIndex()
@@ -0,0 +1,178 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from user_registration.models import (
+    Skill, Company, Location, EducationLevel,
+    EmploymentType, DesiredWorkEnvironment, JobRole
+)
+
+# Keys of the ``reference_data`` block mapped to the models backing them
+REFERENCE_MODELS = {
+    'skills': Skill,
+    'companies': Company,
+    'locations': Location,
+    'education_levels': EducationLevel,
+    'employment_types': EmploymentType,
+    'work_environments': DesiredWorkEnvironment,
+    'job_roles': JobRole,
+}
+
+CACHE_PREFIX = 'reference_data'
+
+# Snapshots are keyed by version so they never go stale; the timeout only
+# lets superseded versions age out of the cache.
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+# Last snapshot seen by this process, so hot requests skip unpickling it
+_local_snapshot = (None, None)
+
+# Columnar layout of the last snapshot, see ``get_columns``
+_local_columns = (None, None)
+
+# version -> when it was first seen, memoized per process
+_seen_at = {}
+SEEN_AT_MEMO_SIZE = 1000
+
+
+def _version_key(model):
+    return f'{CACHE_PREFIX}:version:{model._meta.label_lower}'
+
+
+def table_versions():
+    """
+    Return the current version stamp of every reference table, keyed by model.
+    """
+    keys = {_version_key(model): model for model in REFERENCE_MODELS.values()}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        # Seed from the clock so a counter lost to eviction never repeats a
+        # version that an older snapshot was cached under. Stamps never
+        # expire; expiring would reseed and drop every cached snapshot.
+        cache.add(key, time.time_ns(), None)
+        found[key] = cache.get(key)
+    return {model: found[key] for key, model in keys.items()}
+
+
+def table_version(model):
+    """Return the current version stamp of a single reference table."""
+    return table_versions()[model]
+
+
+def snapshot_version():
+    """Return a short, opaque version string for the whole reference block."""
+    versions = table_versions()
+    raw = ':'.join(str(versions[model]) for model in REFERENCE_MODELS.values())
+    return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+
+def version_seen_at(version):
+    """
+    Return the POSIX time ``version``, a snapshot or ``table_version_token``
+    value, was first seen: by any process sharing the cache, or by this one
+    when the cache is per process (``LocMemCache``).
+
+    Versions only move once a change has committed, so this is never earlier
+    than the change itself and can serve as its ``Last-Modified``.
+    """
+    seen = _seen_at.get(version)
+    if seen is None:
+        key = f'{CACHE_PREFIX}:seen:{version}'
+        cache.add(key, time.time(), SNAPSHOT_TIMEOUT)
+        seen = cache.get(key) or time.time()
+        if len(_seen_at) >= SEEN_AT_MEMO_SIZE:
+            _seen_at.clear()
+        _seen_at[version] = seen
+    return seen
+
+
+def table_version_token(model):
+    """``table_version`` qualified by the table, unique across tables."""
+    return f'{model._meta.label_lower}:{table_version(model)}'
+
+
+def _bump(model):
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate(model):
+    """
+    Bump the version of a reference table once the current transaction commits.
+
+    Bumping after commit keeps a concurrent reader from caching a snapshot
+    under the new version before the change is visible to it.
+    """
+    transaction.on_commit(lambda: _bump(model))
+
+
+def build_snapshot():
+    """
+    Serialize every reference table into plain ``{'id', 'name'}`` dicts.
+
+    Read from the primary: the snapshot is cached under the current version,
+    which a lagging replica may not have caught up with yet.
+    """
+    return {
+        key: list(model.objects.using(DEFAULT_DB_ALIAS).order_by('pk').values('id', 'name'))
+        for key, model in REFERENCE_MODELS.items()
+    }
+
+
+def get_snapshot():
+    """
+    Return ``(version, data)`` for the current reference-data snapshot.
+
+    The snapshot is built at most once per version and shared through the
+    cache, so serving it does not touch any of the reference tables.
+    """
+    global _local_snapshot
+
+    version = snapshot_version()
+    local_version, local_data = _local_snapshot
+    if local_version == version:
+        return version, local_data
+
+    cache_key = f'{CACHE_PREFIX}:snapshot:{version}'
+    data = cache.get(cache_key)
+    if data is None:
+        data = build_snapshot()
+        cache.set(cache_key, data, SNAPSHOT_TIMEOUT)
+
+    _local_snapshot = (version, data)
+    return version, data
+
+
+async def aget_snapshot():
+    """
+    Async ``get_snapshot``. Only building a new version touches the
+    database; that runs in a thread.
+    """
+    local_version, local_data = _local_snapshot
+    if local_version is not None and local_version == snapshot_version():
+        return local_version, local_data
+    return await sync_to_async(get_snapshot)()
+
+
+def get_columns(version, data):
+    """
+    Return snapshot ``data`` with each table as ``{'id': [...], 'name':
+    [...]}``, so the keys are sent once per table rather than once per row.
+    Memoized for the latest version.
+    """
+    global _local_columns
+
+    local_version, columns = _local_columns
+    if local_version != version:
+        columns = {
+            key: {'id': [row['id'] for row in rows], 'name': [row['name'] for row in rows]}
+            for key, rows in data.items()
+        }
+        _local_columns = (version, columns)
+    return columns
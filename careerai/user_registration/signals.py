@@ -0,0 +1,161 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from user_registration import autocomplete, profile_index, reference_data, similarity
+from user_registration.api.authentication import user_cache
+from user_registration.blacklist import blacklist_cache
+from user_registration.models import User, UserProfile, Location
+
+
+def invalidate_reference_data(sender, **kwargs):
+    """Bump the reference snapshot whenever one of its tables changes."""
+    reference_data.invalidate(sender)
+
+
+for model in reference_data.REFERENCE_MODELS.values():
+    post_save.connect(invalidate_reference_data, sender=model)
+    post_delete.connect(invalidate_reference_data, sender=model)
+
+
+# Autocomplete receivers are connected after the snapshot ones, so their
+# on_commit callbacks see the bumped table version.
+
+def update_autocomplete(sender, instance, **kwargs):
+    index = autocomplete.INDEXES[sender]
+    pk, name = instance.pk, instance.name
+    transaction.on_commit(lambda: index.upsert(pk, name))
+
+
+def remove_from_autocomplete(sender, instance, **kwargs):
+    index = autocomplete.INDEXES[sender]
+    pk = instance.pk
+    transaction.on_commit(lambda: index.remove(pk))
+
+
+def track_autocomplete_popularity(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep popularity counts in step with the profile M2M rows."""
+    index = autocomplete_through_indexes[sender]
+    if action == 'pre_clear':
+        transaction.on_commit(index.mark_popularity_stale)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        delta = 1 if action == 'post_add' else -1
+        if reverse:
+            pks, delta = [instance.pk], delta * len(pk_set)
+        else:
+            pks = list(pk_set)
+        transaction.on_commit(lambda: index.adjust_popularity(pks, delta))
+
+
+def refresh_location_popularity(sender, **kwargs):
+    # The previous location is not known after save, so recount lazily
+    transaction.on_commit(autocomplete.INDEXES[Location].mark_popularity_stale)
+
+
+def refresh_all_popularity(sender, **kwargs):
+    # Deleting a profile cascades to its M2M rows without sending m2m_changed
+    for index in autocomplete.INDEXES.values():
+        transaction.on_commit(index.mark_popularity_stale)
+
+
+autocomplete_through_indexes = {}
+for model, index in autocomplete.INDEXES.items():
+    post_save.connect(update_autocomplete, sender=model)
+    post_delete.connect(remove_from_autocomplete, sender=model)
+    field = UserProfile._meta.get_field(index.profile_field)
+    if field.many_to_many:
+        autocomplete_through_indexes[field.remote_field.through] = index
+        m2m_changed.connect(track_autocomplete_popularity, sender=field.remote_field.through)
+
+post_save.connect(refresh_location_popularity, sender=UserProfile)
+post_delete.connect(refresh_all_popularity, sender=UserProfile)
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop cached JWT users once a change (e.g. deactivation) commits."""
+    pk = instance.pk
+    transaction.on_commit(lambda: user_cache.invalidate_user(pk))
+
+
+post_save.connect(invalidate_cached_user, sender=User)
+post_delete.connect(invalidate_cached_user, sender=User)
+
+
+def cache_blacklisted_token(sender, instance, created, **kwargs):
+    """Make logouts (and any other blacklisting) visible to refreshes at once."""
+    if created:
+        jti = instance.token.jti
+        transaction.on_commit(lambda: blacklist_cache.add(jti))
+
+
+post_save.connect(cache_blacklisted_token, sender=BlacklistedToken)
+
+
+# Profile bitmap index (matching and faceted search)
+
+def index_profile(sender, instance, **kwargs):
+    profile_id = instance.pk
+    values = {field: getattr(instance, UserProfile._meta.get_field(field).attname) for field in profile_index.SCALAR_FIELDS}
+    transaction.on_commit(lambda: profile_index.profile_index.upsert_profile(profile_id, values))
+
+
+def unindex_profile(sender, instance, **kwargs):
+    profile_id = instance.pk
+    transaction.on_commit(lambda: profile_index.profile_index.remove_profile(profile_id))
+
+
+def index_profile_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    field = profile_index_through_fields[sender]
+    index = profile_index.profile_index
+    if action == 'pre_clear':
+        # The cleared rows are not known here; rare enough to rebuild
+        transaction.on_commit(index.mark_stale)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        update = index.add_relations if action == 'post_add' else index.remove_relations
+        if reverse:
+            profile_ids, value_ids = list(pk_set), [instance.pk]
+        else:
+            profile_ids, value_ids = [instance.pk], list(pk_set)
+        transaction.on_commit(lambda: update(field, profile_ids, value_ids))
+
+
+def rebuild_profile_index(sender, **kwargs):
+    # Deleting a reference row nulls or cascades profile rows without signals
+    transaction.on_commit(profile_index.profile_index.mark_stale)
+
+
+post_save.connect(index_profile, sender=UserProfile)
+post_delete.connect(unindex_profile, sender=UserProfile)
+
+profile_index_through_fields = {}
+for field_name in profile_index.M2M_FIELDS:
+    through = UserProfile._meta.get_field(field_name).remote_field.through
+    profile_index_through_fields[through] = field_name
+    m2m_changed.connect(index_profile_relations, sender=through)
+
+for model in reference_data.REFERENCE_MODELS.values():
+    post_delete.connect(rebuild_profile_index, sender=model)
+
+
+# MinHash signatures for "similar profiles"
+
+def refresh_profile_signature(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            similarity.schedule_refresh([instance.pk])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        similarity.schedule_refresh(pk_set)
+    elif action == 'pre_clear':
+        # Collect the profiles before their rows are gone
+        m2m = UserProfile._meta.get_field(similarity_through_fields[sender])
+        profile_ids = sender.objects.filter(
+            **{m2m.m2m_reverse_field_name(): instance.pk}
+        ).values_list(m2m.m2m_field_name() + '_id', flat=True)
+        similarity.schedule_refresh(list(profile_ids))
+
+
+similarity_through_fields = {}
+for field_name in similarity.FEATURE_FIELDS:
+    through = UserProfile._meta.get_field(field_name).remote_field.through
+    similarity_through_fields[through] = field_name
+    m2m_changed.connect(refresh_profile_signature, sender=through)
@@ -0,0 +1,218 @@
+"""
+"Similar profiles" through MinHash signatures and locality-sensitive hashing.
+
+A profile's features are its skills, companies, job roles and work
+environments. Its MinHash signature holds ``NUM_PERM`` values; the share of
+equal values between two signatures estimates the Jaccard similarity of the
+feature sets. The signature is cut into ``BANDS`` bands whose hashes are
+stored as ``ProfileLSHBucket`` rows, so profiles agreeing on a whole band are
+found with one indexed ``IN`` lookup rather than a scan. With 16 bands of 4
+values, pairs above ~0.5 similarity almost always share a bucket.
+
+Signatures are recomputed by a background thread once changes to a
+profile's M2M rows commit, so similarity results may briefly lag. Deleting a
+reference row cascades to M2M rows without signals; run
+``manage.py rebuild_profile_signatures`` after large clean-ups.
+"""
+import hashlib
+import logging
+import random
+import struct
+import threading
+import weakref
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+
+from user_registration.bulk import profile_m2m_ids
+from user_registration.models import ProfileLSHBucket, ProfileSignature
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+DEFAULT_K = 10
+MAX_K = 50
+
+# Profiles sharing the most buckets whose signatures are compared exactly
+MAX_CANDIDATES = 200
+
+# Feature prefixes keep ids of different tables apart
+FEATURE_FIELDS = {
+    'skills': 's',
+    'companies_of_interest': 'c',
+    'job_roles_of_interest': 'r',
+    'desired_work_environments': 'w',
+}
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+# Fixed seed: signatures must agree across processes and restarts
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct(f'<{NUM_PERM}I')
+_BAND = struct.Struct(f'<H{ROWS}I')
+
+
+def _feature_hash(prefix, value_id):
+    digest = hashlib.blake2b(f'{prefix}:{value_id}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def signature(features):
+    """MinHash of a set of feature hashes, or None when it is empty."""
+    if not features:
+        return None
+    return tuple(min((a * x + b) % _PRIME for x in features) & _MASK for a, b in _PERMUTATIONS)
+
+
+def buckets(sig):
+    """The signed 64-bit bucket key of each band."""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(_BAND.pack(band, *sig[band * ROWS:(band + 1) * ROWS]), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def estimate_similarity(a, b):
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def refresh(profile_ids):
+    """Recompute the signatures and buckets of ``profile_ids``."""
+    profile_ids = list(profile_ids)
+    features = {profile_id: set() for profile_id in profile_ids}
+    for (profile_id, field), value_ids in profile_m2m_ids(profile_ids, FEATURE_FIELDS).items():
+        prefix = FEATURE_FIELDS[field]
+        features[profile_id].update(_feature_hash(prefix, value_id) for value_id in value_ids)
+
+    signatures, bucket_rows = [], []
+    for profile_id, profile_features in features.items():
+        sig = signature(profile_features)
+        if sig is None:
+            continue
+        signatures.append(ProfileSignature(profile_id=profile_id, signature=_SIGNATURE.pack(*sig)))
+        bucket_rows.extend(ProfileLSHBucket(profile_id=profile_id, bucket=key) for key in buckets(sig))
+
+    # Deleted profiles have no M2M rows left, so nothing is re-inserted for them
+    with transaction.atomic():
+        ProfileLSHBucket.objects.filter(profile_id__in=profile_ids).delete()
+        ProfileSignature.objects.filter(profile_id__in=profile_ids).delete()
+        ProfileSignature.objects.bulk_create(signatures)
+        ProfileLSHBucket.objects.bulk_create(bucket_rows)
+
+
+# Profiles waiting for the refresh thread, and whether it is running
+_queue = set()
+_queue_lock = threading.Lock()
+_draining = False
+
+# Profiles scheduled in the current transaction, per thread, keyed by the
+# on_commit callback that queues them. Django drops the callbacks of a
+# rolled-back transaction, and their batches go with them.
+_pending = threading.local()
+
+
+def schedule_refresh(profile_ids):
+    """
+    Refresh ``profile_ids`` once the current transaction commits. Changes to
+    several M2M fields in one transaction are refreshed together; nothing is
+    refreshed if it rolls back.
+    """
+    batches = getattr(_pending, 'batches', None)
+    if batches is None:
+        batches = _pending.batches = weakref.WeakKeyDictionary()
+
+    def flush():
+        # The first callback to run queues the whole transaction's profiles
+        ids = set().union(*batches.values())
+        batches.clear()
+        if ids:
+            _enqueue(ids)
+
+    batches[flush] = set(profile_ids)
+    transaction.on_commit(flush, robust=True)
+
+
+def _enqueue(profile_ids):
+    global _draining
+    if not getattr(settings, 'PROFILE_SIGNATURE_REFRESH_IN_BACKGROUND', True):
+        _refresh_each(profile_ids)
+        return
+    with _queue_lock:
+        _queue.update(profile_ids)
+        if _draining:
+            return
+        _draining = True
+    threading.Thread(target=_drain, name='profile-signature-refresh', daemon=True).start()
+
+
+def _refresh_each(profile_ids):
+    """
+    Refresh ``profile_ids`` together, falling back to one at a time so a
+    profile that fails (say, deleted mid-refresh) doesn't lose the others.
+    """
+    try:
+        refresh(profile_ids)
+    except Exception:
+        if len(profile_ids) == 1:
+            logger.exception('Could not refresh the signature of profile %s', *profile_ids)
+            return
+        for profile_id in profile_ids:
+            _refresh_each({profile_id})
+
+
+def _drain():
+    global _draining
+    profile_ids = set()
+    try:
+        while True:
+            with _queue_lock:
+                profile_ids = set(_queue)
+                _queue.clear()
+                if not profile_ids:
+                    _draining = False
+                    return
+            _refresh_each(profile_ids)
+            profile_ids = set()
+    except BaseException:
+        # Put the batch back and let the next commit start a new thread
+        with _queue_lock:
+            _queue.update(profile_ids)
+            _draining = False
+        raise
+    finally:
+        connections.close_all()
+
+
+def similar(profile_id, k=DEFAULT_K):
+    """
+    The ``k`` profiles most similar to ``profile_id`` as ``{'profile',
+    'similarity'}`` dicts, or None if the profile has no signature.
+    """
+    stored = ProfileSignature.objects.filter(profile_id=profile_id).values_list('signature', flat=True).first()
+    if stored is None:
+        return None
+    sig = _SIGNATURE.unpack(bytes(stored))
+
+    candidates = list(
+        ProfileLSHBucket.objects.filter(bucket__in=buckets(sig))
+        .exclude(profile_id=profile_id)
+        .values('profile_id')
+        .annotate(bands=Count('bucket'))
+        .order_by('-bands', 'profile_id')
+        .values_list('profile_id', flat=True)[:MAX_CANDIDATES]
+    )
+    if not candidates:
+        return []
+
+    scored = [
+        (estimate_similarity(sig, _SIGNATURE.unpack(bytes(other))), candidate_id)
+        for candidate_id, other in ProfileSignature.objects.filter(profile_id__in=candidates).values_list('profile_id', 'signature')
+    ]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [{'profile': candidate_id, 'similarity': round(score, 4)} for score, candidate_id in scored[:k]]
@@ -1,3 +1,1457 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.paginator import EmptyPage
+from django.db import DataError, IntegrityError, connection, connections, transaction
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from careerai import db_router, metrics
+from user_registration import (
+    admin, autocomplete, bulk, checks, hashing, matching, reference_data, similarity, throttling
+)
+from user_registration.api.authentication import UserCache, user_cache
+from user_registration.blacklist import BlacklistCache, blacklist_cache
+from user_registration.profile_index import SCALAR_FIELDS, profile_index
+from user_registration.reference_data import REFERENCE_MODELS, get_snapshot as get_reference_snapshot
+from user_registration.api import fast_serializers, renderers
+from user_registration.api.serializers import UserProfileDetailSerializer
+from user_registration.api.urls import router_views
+from user_registration.api.views import UserProfileViewSet
+from user_registration.models import (
+    ProfileSignature,
+    User, UserProfile, Skill, Company, Location, EducationLevel,
+    EmploymentType, DesiredWorkEnvironment, JobRole, normalize_name
+)
+
+
+# Fast hashing keeps fixtures with many users cheap
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# A second test database, filled by hand, standing in for a lagging replica
+connections.settings.setdefault('lagging', {
+    **connections.settings['default'], 'TEST': {**connections.settings['default']['TEST'], 'MIRROR': None},
+})
+
+
+class ProfileFixturesMixin:
+    """Creates reference rows and fully-populated profiles for the API tests."""
+
+    def setUp(self):
+        # Reference snapshots and indexes are cached per process
+        cache.clear()
+        profile_index.clear()
+        for index in autocomplete.INDEXES.values():
+            index.clear()
+        matching._interest_skills.clear()
+        # Signatures are refreshed in the committing thread, which sees the
+        # test transaction
+        refresh_inline = override_settings(PROFILE_SIGNATURE_REFRESH_IN_BACKGROUND=False)
+        refresh_inline.enable()
+        self.addCleanup(refresh_inline.disable)
+        self.skills = [Skill.objects.create(name=f'Skill {i}') for i in range(5)]
+        self.companies = [Company.objects.create(name=f'Company {i}') for i in range(3)]
+        self.roles = [JobRole.objects.create(name=f'Role {i}') for i in range(3)]
+        self.location = Location.objects.create(name='Pune')
+        self.education_level = EducationLevel.objects.create(name="Bachelor's")
+        self.employment_type = EmploymentType.objects.create(name='full_time')
+        self.environments = [
+            DesiredWorkEnvironment.objects.create(name=name)
+            for name, _ in UserProfile.WORK_ENVIRONMENT_CHOICES
+        ]
+        self.user = self.create_profile(0).user
+        self.client.force_authenticate(self.user)
+
+    def create_profile(self, index):
+        user = User.objects.create_user(
+            email=f'user{index}@example.com', username=f'user{index}', password='pass'
+        )
+        profile = UserProfile.objects.create(
+            user=user,
+            location=self.location,
+            education_level=self.education_level,
+            preferred_employment_type=self.employment_type,
+            years_of_experience=index,
+        )
+        profile.skills.set(self.skills)
+        profile.companies_of_interest.set(self.companies)
+        profile.job_roles_of_interest.set(self.roles)
+        profile.desired_work_environments.set(self.environments)
+        return profile
+
+    def create_profiles(self, count):
+        start = UserProfile.objects.count()
+        return [self.create_profile(start + i) for i in range(count)]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class BulkCreateTests(APITestCase):
+
+    def setUp(self):
+        self.client.force_authenticate(
+            User.objects.create_user(email='user@example.com', username='user', password='pass')
+        )
+
+    def test_large_seed_runs_in_batched_queries(self):
+        existing = Skill.objects.bulk_create([Skill(name=f'Skill {i}', name_key=f'skill {i}') for i in range(2500)])
+        # Half the names exist under another spelling, the rest are new
+        names = [f' SKILL  {i}' for i in range(2500)] + [f'Skill {i}' for i in range(2500, 5000)]
+
+        # 900-name lookups for every name, 499-row inserts for the new ones
+        # (SQLite's parameter limit), then 900-name reads of the inserted
+        # rows: 6 + 6 + 3, never a query per name
+        with self.assertNumQueries(15):
+            response = self.client.post(reverse('skill-list'), {'skills': names}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 5000)
+        self.assertEqual([row['id'] for row in response.data[:2500]], [skill.pk for skill in existing])
+        self.assertEqual(response.data[-1]['name'], 'Skill 4999')
+        self.assertEqual(Skill.objects.count(), 5000)
+
+    def test_invalid_items_are_rejected_by_index(self):
+        items = ['Python', {'name': 'Go'}, {}, 42, '  ', 'x' * 101, {'name': None}, 'Rust']
+        response = self.client.post(reverse('skill-list'), {'skills': items}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['invalid_indexes'], [2, 3, 4, 5, 6])
+        self.assertFalse(Skill.objects.exists())
+
+        response = self.client.post(reverse('desiredworkenvironment-list'), {'work_environments': ['Moon']}, format='json')
+        self.assertEqual(response.data['invalid_indexes'], [0])
+        with self.assertRaises(ValueError):
+            bulk.bulk_get_or_create(Skill, ['Python', ''])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class NormalizedNameTests(APITestCase):
+
+    def setUp(self):
+        self.client.force_authenticate(
+            User.objects.create_user(email='user@example.com', username='user', password='pass')
+        )
+
+    def test_normalize_name_folds_case_and_whitespace(self):
+        self.assertEqual(normalize_name('  Machine\tLEARNING \n'), 'machine learning')
+        self.assertEqual(normalize_name('Straße'), normalize_name('STRASSE'))
+        self.assertEqual(Skill.objects.create(name=' Deep  Learning').name_key, 'deep learning')
+
+    def test_names_differing_by_case_or_whitespace_are_rejected(self):
+        skill = Skill.objects.create(name='Machine Learning')
+        response = self.client.post(reverse('skill-list'), {'name': ' machine  learning'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['name'], ['Skill with this name already exists.'])
+        self.assertEqual(Skill.objects.count(), 1)
+
+        # Renaming a row to another spelling of its own name is allowed
+        url = reverse('skill-detail', args=[skill.pk])
+        response = self.client.patch(url, {'name': 'machine learning'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        skill.refresh_from_db()
+        self.assertEqual((skill.name, skill.name_key), ('machine learning', 'machine learning'))
+
+    def test_backfill_keeps_the_oldest_key_and_suffixes_collisions(self):
+        migration = import_module('user_registration.migrations.0003_backfill_name_key')
+        # Rows as they stood before the backfill, with placeholder keys
+        oldest, duplicate, other = Skill.objects.bulk_create([
+            Skill(name='Python', name_key='pending-1'),
+            Skill(name=' PYTHON', name_key='pending-2'),
+            Skill(name='Rust', name_key='pending-3'),
+        ])
+        with self.assertLogs(migration.__name__, 'WARNING') as logs:
+            migration.backfill_name_key(apps, None)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn(f'(id={duplicate.pk})', logs.output[0])
+        self.assertEqual(
+            dict(Skill.objects.values_list('pk', 'name_key')),
+            {oldest.pk: 'python', duplicate.pk: f'python#{duplicate.pk}', other.pk: 'rust'}
+        )
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ProfileQueryBudgetTests(ProfileFixturesMixin, APITestCase):
+    """
+    Pins the number of queries each profile endpoint runs, so that N+1
+    regressions fail the suite. Budgets must not depend on page size.
+    """
+
+    def test_list_query_count_is_constant(self):
+        url = reverse('userprofile-list')
+        # 1 profiles + 4 M2M prefetches
+        with self.assertNumQueries(5):
+            self.client.get(url)
+
+        self.create_profiles(10)
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 11)
+
+    def test_retrieve_query_count(self):
+        profile = self.create_profiles(1)[0]
+        get_reference_snapshot()
+        # 1 profile row + 1 UNION ALL of the M2M ids; names come from the snapshot
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('userprofile-detail', args=[profile.pk]))
+        self.assertEqual(len(response.data['skills']), len(self.skills))
+
+    def test_me_query_count(self):
+        url = reverse('userprofile-me')
+        # First call also builds the reference snapshot, one query per table
+        with self.assertNumQueries(2 + 7):
+            self.client.get(url)
+
+        self.create_profiles(5)
+        # 1 profile row + 1 UNION ALL of the M2M ids
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['reference_data']['skills']), len(self.skills))
+
+    def test_me_not_modified_skips_body(self):
+        url = reverse('userprofile-me')
+        etag = self.client.get(url)['ETag']
+        # Only the profile itself is read to validate the ETag
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_add_one_skill_touches_only_the_new_row(self):
+        profile = self.user.profile
+        profile.skills.remove(self.skills[-1])
+        url = reverse('userprofile-detail', args=[profile.pk])
+        skill_ids = [skill.pk for skill in self.skills]
+        # profile, skill ids IN, then in one transaction: M2M ids UNION,
+        # updated_at, existing-row check and insert of the one skill
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(2 + 4 + 2):
+            response = self.client.patch(url, {'skills': skill_ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['skills'], skill_ids)
+        self.assertEqual(len(response.data['companies_of_interest']), len(self.companies))
+        # m2m_changed still fired and refreshed the similarity signature
+        self.assertTrue(ProfileSignature.objects.filter(profile=profile).exists())
+
+        # Nothing changed: the M2M ids are read, nothing is written
+        with self.assertNumQueries(2 + 3):
+            self.client.patch(url, {'skills': skill_ids}, format='json')
+
+    def test_update_validates_ids_in_one_query(self):
+        url = reverse('userprofile-detail', args=[self.user.profile.pk])
+        with self.assertNumQueries(2):
+            response = self.client.patch(url, {'skills': [self.skills[0].pk, 0]}, format='json')
+        self.assertEqual(response.data['skills'][0].code, 'does_not_exist')
+        response = self.client.patch(url, {'skills': ['x']}, format='json')
+        self.assertEqual(response.data['skills'][0].code, 'incorrect_type')
+        self.assertEqual(self.user.profile.skills.count(), len(self.skills))
+
+    def test_delta_actions_touch_only_the_given_rows(self):
+        profile = self.user.profile
+        etag = self.client.get(reverse('userprofile-me'))['ETag']
+        url = reverse('userprofile-me-relation', kwargs={'relation': 'skills', 'operation': 'remove'})
+        # skill ids IN, profile, then in one transaction: the delete and updated_at
+        with self.assertNumQueries(2 + 2 + 2):
+            response = self.client.post(url, {'ids': [self.skills[0].pk]}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertNotIn(self.skills[0], profile.skills.all())
+
+        url = reverse('userprofile-me-relation', kwargs={'relation': 'companies', 'operation': 'add'})
+        company = Company.objects.create(name='Company new')
+        response = self.client.post(url, {'ids': [company.pk, self.companies[0].pk]}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(profile.companies_of_interest.count(), len(self.companies) + 1)
+
+        # updated_at moved, so the profile's ETag did too
+        response = self.client.get(reverse('userprofile-me'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_delta_actions_reject_unknown_ids(self):
+        url = reverse('userprofile-me-relation', kwargs={'relation': 'job-roles', 'operation': 'add'})
+        response = self.client.post(url, {'ids': [0]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'ids': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_list_query_count_is_constant(self):
+        url = reverse('user-list')
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        self.create_profiles(10)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class KeysetPaginationTests(ProfileFixturesMixin, APITestCase):
+
+    def test_profiles_are_walked_in_creation_order_without_counting(self):
+        self.create_profiles(4)
+        url = reverse('userprofile-list') + '?page_size=2'
+        seen = []
+        while url:
+            # 1 page of profiles + 4 M2M prefetches, never a COUNT(*)
+            with self.assertNumQueries(5):
+                response = self.client.get(url)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, list(UserProfile.objects.order_by('created_at', 'id').values_list('id', flat=True)))
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('skill-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AsyncAuthViewTests(APITestCase):
+
+    def setUp(self):
+        throttling.reset()
+
+    def test_register_then_login(self):
+        response = self.client.post(reverse('user-register'), {
+            'email': 'new@example.com', 'username': 'new', 'password': 's3cret-pass'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(email='new@example.com').check_password('s3cret-pass'))
+
+        response = self.client.post(reverse('user-login'), {
+            'email': 'new@example.com', 'password': 's3cret-pass'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+
+        response = self.client.post(reverse('user-login'), {
+            'email': 'new@example.com', 'password': 'wrong'
+        }, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_saturated_hash_pool_sheds_load(self):
+        pool = hashing.HashingPool(workers=1, max_queue=0)
+        pool._in_flight = 1
+        with mock.patch.object(hashing, '_pool', pool):
+            response = self.client.post(reverse('user-login'), {
+                'email': 'anyone@example.com', 'password': 'pass'
+            }, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CachedJWTAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(email='jwt@example.com', username='jwt', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_repeat_requests_skip_user_lookup(self):
+        url = reverse('user-me')
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['email'], 'jwt@example.com')
+
+    def test_deactivation_invalidates_cached_user(self):
+        url = reverse('user-me')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_invalidation_reaches_other_processes_through_the_cache(self):
+        # Two caches sharing the default cache stand in for two processes
+        this, other = UserCache(10, 60), UserCache(10, 60)
+        key = (str(self.user.pk), 1)
+        other.set(key, self.user, other.get(key)[1])
+        self.assertEqual(other.get(key)[0], self.user)
+        this.invalidate_user(self.user.pk)
+        self.assertIsNone(other.get(key)[0])
+
+        # A user read while the version moves is not kept under the new one
+        _, version = other.get(key)
+        this.invalidate_user(self.user.pk)
+        other.set(key, self.user, version)
+        self.assertIsNone(other.get(key)[0])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TokenBlacklistCacheTests(APITestCase):
+
+    def setUp(self):
+        throttling.reset()
+        self.user = User.objects.create_user(email='refresh@example.com', username='refresh', password='pass')
+        self.refresh = RefreshToken.for_user(self.user)
+        blacklist_cache.warm()
+
+    def test_refresh_of_valid_token_skips_blacklist_query(self):
+        url = reverse('token_refresh')
+        # Only the user lookup done by TokenRefreshSerializer
+        with self.assertNumQueries(1):
+            response = self.client.post(url, {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout_blacklists_for_refresh(self):
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('user-logout'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 205)
+
+        # The filter hit is confirmed with one query
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_sync_sees_rows_committed_late(self):
+        cache = BlacklistCache(sync_interval=0, rebuild_interval=3600, sync_overlap=60)
+        cache.warm()
+        late, stale = (RefreshToken.for_user(self.user) for _ in range(2))
+        for token, age in ((late, 30), (stale, 120)):
+            row = BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+            # Stamped before the last sync, as a transaction committing late would be
+            BlacklistedToken.objects.filter(pk=row.pk).update(blacklisted_at=aware_utcnow() - timedelta(seconds=age))
+        self.assertTrue(cache.is_blacklisted(late['jti']))
+        # Older than the overlap: only the next rebuild finds it
+        self.assertFalse(cache.is_blacklisted(stale['jti']))
+        cache.warm()
+        self.assertTrue(cache.is_blacklisted(stale['jti']))
+
+    def test_filter_is_rebuilt_past_its_capacity(self):
+        cache = BlacklistCache(sync_interval=60, rebuild_interval=3600, sync_overlap=60)
+        cache.warm()
+        added = 0
+        while not cache._bloom.full:
+            cache.add(f'jti-{added}')
+            added += 1
+        # Rebuilt from the database, which answers the miss
+        with self.assertNumQueries(1):
+            self.assertFalse(cache.is_blacklisted('unknown'))
+        self.assertEqual(cache._bloom.count, 0)
+
+    def test_prune_deletes_only_expired_tokens(self):
+        expired = [
+            OutstandingToken.objects.create(
+                user=self.user, jti=f'expired-{i}', token='token', expires_at=aware_utcnow() - timedelta(days=1)
+            )
+            for i in range(3)
+        ]
+        BlacklistedToken.objects.create(token=expired[0])
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=self.refresh['jti']))
+        out = io.StringIO()
+        call_command('prune_token_blacklist', batch_size=2, stdout=out)
+        self.assertIn('Pruned 3 expired tokens in 2 batches', out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [self.refresh['jti']])
+        self.assertEqual(BlacklistedToken.objects.get().token.jti, self.refresh['jti'])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, AUTH_THROTTLES={
+    'login': {'ip': ('token_bucket', 10, 60), 'email': ('sliding_window', 2, 60)},
+    'refresh': {'ip': ('token_bucket', 1, 60)},
+})
+class AuthThrottleTests(APITestCase):
+
+    def setUp(self):
+        throttling.reset()
+
+    def login(self, email):
+        return self.client.post(reverse('user-login'), {'email': email, 'password': 'wrong'}, format='json')
+
+    def test_login_throttled_per_email_before_any_query(self):
+        for _ in range(2):
+            self.assertEqual(self.login('Someone@example.com').status_code, 401)
+        with self.assertNumQueries(0):
+            response = self.login('someone@example.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        # Other emails from the same address are still allowed
+        self.assertEqual(self.login('other@example.com').status_code, 401)
+
+    def test_refresh_throttled_per_ip(self):
+        refresh = str(RefreshToken.for_user(User.objects.create_user(
+            email='refresh@example.com', username='refresh', password='pass'
+        )))
+        url = reverse('token_refresh')
+        self.assertEqual(self.client.post(url, {'refresh': refresh}, format='json').status_code, 200)
+        response = self.client.post(url, {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(AUTH_THROTTLES={'login': {'ip': ('sliding_window', 2, 60)}})
+    def test_spoofed_forwarded_for_gets_no_fresh_budget(self):
+        def login(address):
+            return self.client.post(
+                reverse('user-login'), {'email': 'someone@example.com', 'password': 'wrong'},
+                format='json', HTTP_X_FORWARDED_FOR=address
+            )
+        self.assertEqual(login('198.51.100.1').status_code, 401)
+        self.assertEqual(login('198.51.100.2').status_code, 401)
+        self.assertEqual(login('198.51.100.3').status_code, 429)
+
+    @override_settings(AUTH_THROTTLES={
+        'login': {'ip': ('sliding_window', 3, 60), 'email': ('sliding_window', 1, 60)},
+    })
+    def test_rejected_requests_spend_no_other_budget(self):
+        self.assertEqual(self.login('a@example.com').status_code, 401)
+        # Rejected per email: the IP budget is left alone
+        self.assertEqual(self.login('a@example.com').status_code, 429)
+        self.assertEqual(self.login('a@example.com').status_code, 429)
+        self.assertEqual(self.login('b@example.com').status_code, 401)
+        self.assertEqual(self.login('c@example.com').status_code, 401)
+        self.assertEqual(self.login('d@example.com').status_code, 429)
+
+    def test_sliding_window_and_token_bucket(self):
+        limiter = throttling.Limiter(throttling.SlidingWindow(2, 10), max_keys=1)
+        self.assertIsNone(limiter.hit('a', now=0))
+        self.assertIsNone(limiter.hit('a', now=5))
+        self.assertEqual(limiter.hit('a', now=6), 4)
+        self.assertEqual(limiter.wait('a', now=6), 4)
+        # New keys past max_keys cannot push out a key that is still limited
+        self.assertIsNone(limiter.hit('b', now=7))
+        self.assertIsNone(limiter.hit('c', now=7))
+        self.assertEqual(limiter.hit('d', now=7), 10)
+        self.assertEqual(limiter.hit('a', now=8), 2)
+        # Once its limit has reset, the least recently seen key is forgotten
+        self.assertIsNone(limiter.hit('b', now=20))
+        self.assertIsNone(limiter.wait('a', now=20))
+
+        bucket = throttling.Limiter(throttling.TokenBucket(2, 10), max_keys=10)
+        self.assertIsNone(bucket.hit('a', now=0))
+        self.assertIsNone(bucket.hit('a', now=0))
+        self.assertEqual(bucket.hit('a', now=0), 5)
+        self.assertIsNone(bucket.hit('a', now=5))
+
+    def test_too_many_in_flight_sheds_load(self):
+        shedder = throttling.ConcurrencyLimiter(max_in_flight=1, max_per_client=1)
+        with mock.patch.object(throttling, '_shedder', shedder):
+            with shedder.admit('203.0.113.9'):
+                with self.assertNumQueries(0):
+                    response = self.login('someone@example.com')
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response['Retry-After'], '1')
+            shedder.max_in_flight = 2
+            with shedder.admit('127.0.0.1'):
+                self.assertEqual(self.login('someone@example.com').status_code, 429)
+            self.assertEqual(self.login('someone@example.com').status_code, 401)
+        self.assertEqual(shedder.in_flight, 0)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CandidateMatchingTests(ProfileFixturesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        # user0 has every skill; the others get the first n skills
+        self.partial = []
+        for n in (1, 3, 3):
+            profile = self.create_profile(len(self.partial) + 1)
+            profile.skills.set(self.skills[:n])
+            self.partial.append(profile)
+        UserProfile.objects.update(is_actively_job_searching=True)
+
+    def candidates(self, **params):
+        url = reverse('jobrole-candidates', args=[self.roles[0].pk])
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_ranked_by_overlap_then_experience(self):
+        data = self.candidates(skills=','.join(str(skill.pk) for skill in self.skills[:3]), k=3)
+        self.assertEqual(
+            [(row['profile'], row['skill_overlap']) for row in data['results']],
+            [(self.partial[2].pk, 3), (self.partial[1].pk, 3), (self.user.profile.pk, 3)],
+        )
+
+    def test_skill_set_derived_from_interested_profiles(self):
+        data = self.candidates(k=10)
+        self.assertEqual(data['skills'][:3], [skill.pk for skill in self.skills[:3]])
+        self.assertEqual(data['results'][0]['profile'], self.user.profile.pk)
+
+    def test_filters_and_incremental_updates(self):
+        self.candidates()  # builds the index
+        remote = self.environments[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.partial[0].desired_work_environments.set([self.environments[1]])
+            self.partial[1].is_actively_job_searching = False
+            self.partial[1].save()
+
+        with self.assertNumQueries(1):  # the job role lookup only
+            data = self.candidates(skills=str(self.skills[0].pk), work_environment=remote.pk, min_years=1)
+        self.assertEqual([row['profile'] for row in data['results']], [self.partial[2].pk])
+    
+    def test_years_bounds_past_the_cap(self):
+        for profile, years in zip(self.partial, (40, 44, 50)):
+            UserProfile.objects.filter(pk=profile.pk).update(years_of_experience=years)
+        skill = str(self.skills[0].pk)
+        self.assertEqual([row['profile'] for row in self.candidates(skills=skill, min_years=45)['results']], [self.partial[2].pk])
+        data = self.candidates(skills=skill, min_years=41, max_years=44)
+        self.assertEqual([row['profile'] for row in data['results']], [self.partial[1].pk])
+    
+    def test_stale_index_is_rebuilt_off_the_request(self):
+        skill = str(self.skills[0].pk)
+        self.candidates()  # builds the index
+        profile_index.mark_stale()
+        with mock.patch('threading.Thread') as thread:
+            with self.assertNumQueries(1):  # still served from the current index
+                self.candidates(skills=skill)
+        thread.assert_called_once()
+        
+        # A change committed while the rebuild reads the tables is replayed onto it
+        read_state = profile_index._read_state
+        
+        def read_then_commit():
+            state = read_state()
+            profile_index.remove_profile(self.partial[0].pk)
+            return state
+        with mock.patch.object(profile_index, '_read_state', side_effect=read_then_commit):
+            thread.call_args.kwargs['target']()
+        self.assertFalse(profile_index.stale)
+        self.assertNotIn(self.partial[0].pk, [row['profile'] for row in self.candidates(skills=skill)['results']])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AutocompleteTests(ProfileFixturesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.go, self.cloud, self.cloud_go = (
+            Skill.objects.create(name=name) for name in ('Go', 'Google Cloud', 'Cloud Go')
+        )
+        self.user.profile.skills.add(self.cloud)
+        self.create_profile(1).skills.add(self.cloud, self.cloud_go)
+
+    def autocomplete(self, q, **params):
+        response = self.client.get(reverse('skill-autocomplete'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data]
+
+    def test_ranks_whole_names_then_words_then_popularity(self):
+        # Google Cloud is on two profiles, Go on none; Cloud Go only matches by word
+        self.assertEqual(self.autocomplete('go'), ['Google Cloud', 'Go', 'Cloud Go'])
+        self.assertEqual(self.autocomplete('  GO '), ['Google Cloud', 'Go', 'Cloud Go'])
+        self.assertEqual(self.autocomplete('clo'), ['Cloud Go', 'Google Cloud'])
+        self.assertEqual(self.autocomplete('go', limit=1), ['Google Cloud'])
+        self.assertEqual(self.autocomplete('goo'), ['Google Cloud'])
+        self.assertEqual(self.autocomplete('rust'), [])
+
+        self.assertEqual(self.client.get(reverse('skill-autocomplete'), {'q': ' '}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('skill-autocomplete'), {'q': 'go', 'limit': 'x'}).status_code, 400)
+
+    def test_follows_committed_changes(self):
+        self.autocomplete('go')  # builds the index
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Golang')
+            self.go.delete()
+        with self.assertNumQueries(0):  # applied in place
+            self.assertEqual(self.autocomplete('go'), ['Google Cloud', 'Golang', 'Cloud Go'])
+
+        # bulk_create sends no signals; the version bump schedules a rebuild
+        # that runs off the request
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.bulk_get_or_create(Skill, ['Gopher'])
+        with mock.patch('threading.Thread') as thread:
+            with self.assertNumQueries(0):
+                self.assertEqual(self.autocomplete('go'), ['Google Cloud', 'Golang', 'Cloud Go'])
+        thread.call_args.kwargs['target'](*thread.call_args.kwargs['args'])
+        self.assertEqual(self.autocomplete('go'), ['Google Cloud', 'Golang', 'Gopher', 'Cloud Go'])
+
+
+    def test_ranks_every_prefix_match(self):
+        bulk.bulk_get_or_create(Skill, [f'Go {i:03}' for i in range(600)] + ['Gozz'])
+        gozz = Skill.objects.get(name='Gozz')
+        for profile in (self.user.profile, self.create_profile(2), self.create_profile(3)):
+            profile.skills.add(gozz)
+        self.assertEqual(self.autocomplete('go', limit=1), ['Gozz'])
+
+    def test_rebuilds_after_changes_from_other_processes(self):
+        self.autocomplete('go')  # builds the index
+        # Another process renames Go, bumping the version, before this one
+        # creates Golang
+        Skill.objects.filter(pk=self.go.pk).update(name='Gone', name_key='gone')
+        reference_data._bump(Skill)
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Golang')
+        with mock.patch('threading.Thread') as thread:
+            self.assertEqual(self.autocomplete('go'), ['Google Cloud', 'Go', 'Golang', 'Cloud Go'])
+        thread.call_args.kwargs['target'](*thread.call_args.kwargs['args'])
+        self.assertEqual(self.autocomplete('go'), ['Google Cloud', 'Golang', 'Gone', 'Cloud Go'])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SimilarProfilesTests(ProfileFixturesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.twin = self.create_profile(1)
+            self.other = self.create_profile(2)
+            self.other.skills.set([])
+            self.other.companies_of_interest.set([])
+            self.user.profile.skills.add(self.skills[0])  # signal on a settled profile
+
+    def test_most_similar_first_in_constant_queries(self):
+        url = reverse('userprofile-similar', args=[self.user.profile.pk])
+        # signature, bucket candidates, candidate signatures
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.data[0], {'profile': self.twin.pk, 'similarity': 1.0})
+        self.assertNotIn(self.user.profile.pk, [row['profile'] for row in response.data])
+
+    def test_m2m_change_refreshes_signature(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.twin.skills.set([])
+            self.twin.companies_of_interest.set([])
+        # The twin now has exactly the other profile's features
+        response = self.client.get(reverse('userprofile-similar', args=[self.other.pk]))
+        self.assertEqual(response.data[0], {'profile': self.twin.pk, 'similarity': 1.0})
+
+    @override_settings(PROFILE_SIGNATURE_REFRESH_IN_BACKGROUND=True)
+    def test_refresh_runs_off_the_request_once_committed(self):
+        url = reverse('userprofile-detail', args=[self.twin.pk])
+        self.client.force_authenticate(self.twin.user)
+        with mock.patch('threading.Thread') as thread:
+            # Rolled back: nothing is queued
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self.twin.skills.set([])
+                    transaction.set_rollback(True)
+            thread.assert_not_called()
+
+            # Both fields are queued by the one update; the refresh is not run
+            # by the request
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(url, {'skills': [], 'companies_of_interest': []}, format='json')
+            self.assertEqual(response.status_code, 200)
+        thread.assert_called_once()
+        self.assertEqual(similarity._queue, {self.twin.pk})
+        self.assertEqual(self.client.get(reverse('userprofile-similar', args=[self.other.pk])).data, [])
+
+        thread.call_args.kwargs['target']()
+        self.assertEqual(similarity._queue, set())
+        self.assertFalse(similarity._draining)
+        response = self.client.get(reverse('userprofile-similar', args=[self.other.pk]))
+        self.assertEqual(response.data[0], {'profile': self.twin.pk, 'similarity': 1.0})
+
+    def test_failed_refresh_does_not_lose_the_other_profiles(self):
+        refresh = similarity.refresh
+
+        def fail_on_other(profile_ids):
+            if self.other.pk in profile_ids:
+                raise IntegrityError('profile deleted mid-refresh')
+            refresh(profile_ids)
+
+        similarity._queue.update({self.twin.pk, self.other.pk})
+        self.twin.skills.set([])
+        self.twin.companies_of_interest.set([])
+        with mock.patch.object(similarity, 'refresh', side_effect=fail_on_other), \
+                self.assertLogs('user_registration.similarity', 'ERROR') as logs:
+            similarity._drain()
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn(str(self.other.pk), logs.output[0])
+        self.assertFalse(similarity._draining)
+        response = self.client.get(reverse('userprofile-similar', args=[self.other.pk]))
+        self.assertEqual(response.data[0], {'profile': self.twin.pk, 'similarity': 1.0})
+
+    def test_unknown_profile_is_not_found(self):
+        response = self.client.get(reverse('userprofile-similar', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class FacetedSearchTests(ProfileFixturesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.remote_only = self.create_profile(1)
+        self.remote_only.desired_work_environments.set(self.environments[:1])
+        self.junior = self.create_profile(2)
+        self.junior.skills.set(self.skills[:1])
+        UserProfile.objects.filter(pk=self.junior.pk).update(employment_status='student')
+        self.url = reverse('userprofile-search')
+
+    def facet(self, data, field):
+        return {row['value']: row['count'] for row in data['facets'][field]}
+
+    def test_filters_and_disjunctive_facet_counts(self):
+        profile_index.build()
+        # Page of profiles: 1 + 4 M2M prefetches; filtering and counts hit no table
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, {
+                'skills': f'{self.skills[0].pk},{self.skills[1].pk}',
+                'desired_work_environments': self.environments[1].pk,
+            })
+        data = response.data
+        self.assertEqual(data['count'], 1)
+        self.assertEqual([row['id'] for row in data['results']], [self.user.profile.pk])
+        # Counts for a filtered facet ignore its own filter
+        self.assertEqual(self.facet(data, 'desired_work_environments')[self.environments[0].pk], 2)
+        self.assertEqual(self.facet(data, 'skills')[self.skills[0].pk], 1)
+
+    def test_incremental_updates_and_paging(self):
+        self.client.get(self.url)  # builds the index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.junior.employment_status = 'employed'
+            self.junior.save()
+        data = self.client.get(self.url, {'limit': 2}).data
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(self.facet(data, 'employment_status'), {'employed': 1})
+        self.assertEqual(data['next_after'], self.remote_only.pk)
+
+        data = self.client.get(self.url, {'limit': 2, 'after': data['next_after']}).data
+        self.assertEqual([row['id'] for row in data['results']], [self.junior.pk])
+        self.assertIsNone(data['next_after'])
+    
+    def test_paging_follows_ids_when_commits_arrive_out_of_order(self):
+        profile_index.build()
+        first, second = self.create_profiles(2)
+        # The later profile's transaction commits first and takes the earlier slot
+        for profile in (second, first):
+            profile_index.upsert_profile(profile.pk, {
+                field: getattr(profile, UserProfile._meta.get_field(field).attname) for field in SCALAR_FIELDS
+            })
+        seen, after = [], None
+        while True:
+            data = self.client.get(self.url, {'limit': 2, **({'after': after} if after else {})}).data
+            seen += [row['id'] for row in data['results']]
+            after = data['next_after']
+            if after is None:
+                break
+        self.assertEqual(seen, sorted(UserProfile.objects.values_list('id', flat=True)))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ImportProfilesTests(APITestCase):
+
+    def test_csv_import_resolves_names_and_skips_bad_rows(self):
+        Skill.objects.create(name='Python')
+        rows = [
+            'email,password,location,years_of_experience,skills,desired_work_environments',
+            'a@example.com,secret,Pune,3,python;Django,remote',
+            'b@example.com,,pune ,x,,',
+            'b@example.com,,PUNE,1,Django;SQL,hybrid;on_site',
+            'c@example.com,,,0,,moon',
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write('\n'.join(rows) + '\n')
+            f.flush()
+            stderr = io.StringIO()
+            call_command('import_profiles', f.name, chunk_size=2, stdout=io.StringIO(), stderr=stderr)
+
+        self.assertEqual(stderr.getvalue().count('Line'), 2)
+        a = UserProfile.objects.get(user__email='a@example.com')
+        b = UserProfile.objects.get(user__email='b@example.com')
+        self.assertTrue(a.user.check_password('secret'))
+        self.assertFalse(b.user.has_usable_password())
+        self.assertEqual(a.location_id, b.location_id)
+        self.assertEqual(Skill.objects.count(), 3)
+        self.assertEqual(sorted(a.skills.values_list('name', flat=True)), ['Django', 'Python'])
+        self.assertEqual(b.desired_work_environments.count(), 2)
+        self.assertTrue(a.user.is_profile_completed)
+
+
+    def test_usernames_are_validated_before_insert(self):
+        rows = [
+            {'email': 'plain@example.com'},
+            {'email': 'd@example.com', 'username': 'd' * 151},
+            {'email': 'e@example.com', 'username': 'has space'},
+            {'email': f"{'f' * 140}@example.com"},
+            {'email': 'o\'brien@example.com'},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as f:
+            f.write(''.join(json.dumps(row) + '\n' for row in rows))
+            f.flush()
+            stderr = io.StringIO()
+            call_command('import_profiles', f.name, stdout=io.StringIO(), stderr=stderr)
+
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['plain@example.com'])
+        self.assertEqual(stderr.getvalue().count('invalid username'), 2)
+        self.assertEqual(stderr.getvalue().count('invalid email as username'), 2)
+
+    def test_rows_the_database_would_reject_are_skipped(self):
+        rows = [
+            {'email': 'ok@example.com', 'skills': ['Python']},
+            {'email': 'long@example.com', 'skills': ['Python', 's' * 101]},
+            {'email': 'city@example.com', 'location': 'l' * 101},
+            {'email': 'old@example.com', 'years_of_experience': 10 ** 20},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as f:
+            f.write(''.join(json.dumps(row) + '\n' for row in rows))
+            f.flush()
+            stderr = io.StringIO()
+            call_command('import_profiles', f.name, stdout=io.StringIO(), stderr=stderr)
+
+            self.assertEqual(list(User.objects.values_list('email', flat=True)), ['ok@example.com'])
+            self.assertEqual(stderr.getvalue().count('invalid skills'), 1)
+            self.assertEqual(stderr.getvalue().count('invalid location'), 1)
+            self.assertEqual(stderr.getvalue().count('invalid years_of_experience'), 1)
+
+            # Other database errors fail the chunk with a CommandError
+            User.objects.all().delete()
+            with mock.patch.object(UserProfile.objects, 'bulk_create', side_effect=DataError('value too long')):
+                with self.assertRaisesMessage(CommandError, 'Chunk starting at line 1 failed'):
+                    call_command('import_profiles', f.name, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(User.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ProfileExportTests(ProfileFixturesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_profiles(2)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.user.is_staff = True
+        self.url = reverse('userprofile-export')
+
+    def test_ndjson_streams_one_line_per_profile(self):
+        with self.settings(PROFILE_EXPORT_CHUNK_SIZE=2):
+            response = self.client.get(self.url, HTTP_ACCEPT='application/x-ndjson')
+            # One cursor over profiles and their FKs + 4 M2M prefetches per chunk
+            with self.assertNumQueries(1 + 2 * 4):
+                lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['id'] for row in rows], list(UserProfile.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(rows[0]['skills'], [skill.name for skill in self.skills])
+        self.assertEqual(rows[0]['location'], 'Pune')
+
+    def test_csv_matches_import_columns(self):
+        response = self.client.get(self.url, {'export_format': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['companies_of_interest'], ';'.join(company.name for company in self.companies))
+
+    def test_csv_round_trips_names_holding_the_separator(self):
+        company = Company.objects.create(name='Research; Development "Labs"')
+        self.user.profile.companies_of_interest.add(company)
+        response = self.client.get(self.url, {'export_format': 'csv'})
+        exported = b''.join(response.streaming_content).decode()
+        User.objects.all().delete()
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write(exported)
+            f.flush()
+            call_command('import_profiles', f.name, stdout=io.StringIO(), stderr=io.StringIO())
+        profile = UserProfile.objects.get(user__email=self.user.email)
+        self.assertEqual(
+            sorted(profile.companies_of_interest.values_list('name', flat=True)),
+            sorted([company.name] + [company.name for company in self.companies])
+        )
+        self.assertEqual(Company.objects.filter(name__startswith='Research').count(), 1)
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(self.create_profile(9).user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+    
+    async def test_asgi_streams_chunks_as_they_are_read(self):
+        user_cache.clear()
+        bearer = f'Bearer {AccessToken.for_user(self.user)}'
+        with self.settings(PROFILE_EXPORT_CHUNK_SIZE=2):
+            response = await self.async_client.get(self.url, headers={'Authorization': bearer})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([len(chunk.decode().splitlines()) for chunk in chunks], [2, 1])
+        self.assertEqual(json.loads(chunks[0].decode().splitlines()[0])['email'], self.user.email)
+
+
+class ReferenceSnapshotTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.skill = Skill.objects.create(name='Python')
+
+    def snapshot_skills(self):
+        return {row['name'] for row in get_reference_snapshot()[1]['skills']}
+
+    def test_snapshot_follows_committed_writes(self):
+        self.assertEqual(self.snapshot_skills(), {'Python'})
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Rust')
+        self.assertEqual(self.snapshot_skills(), {'Python', 'Rust'})
+
+        self.skill.name = 'Python 3'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skill.save()
+        self.assertEqual(self.snapshot_skills(), {'Python 3', 'Rust'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skill.delete()
+        self.assertEqual(self.snapshot_skills(), {'Rust'})
+
+        # bulk_create sends no post_save; bulk_get_or_create bumps the version itself
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.bulk_get_or_create(Skill, ['Go', 'Rust'])
+        self.assertEqual(self.snapshot_skills(), {'Go', 'Rust'})
+
+    def test_deploy_check_warns_about_a_per_process_cache(self):
+        self.assertEqual([warning.id for warning in checks.check_shared_cache(None)], ['user_registration.W001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+    def test_version_stamps_do_not_expire(self):
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add:
+            get_reference_snapshot()
+        self.assertEqual(add.call_count, len(REFERENCE_MODELS))
+        for call in add.call_args_list:
+            self.assertEqual(call.args[2:], (None,))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class FastSerializerParityTests(ProfileFixturesMixin, APITestCase):
+    """The fast read path must render exactly what UserProfileDetailSerializer does."""
+
+    def assertParity(self, profiles):
+        profiles = UserProfile.objects.filter(pk__in=[profile.pk for profile in profiles]).order_by('id')
+        # Round-trip through JSON: the comparison is about the rendered output
+        expected = json.loads(json.dumps(UserProfileDetailSerializer(profiles, many=True).data))
+        actual = json.loads(json.dumps(fast_serializers.render_profiles(profiles)))
+        self.assertEqual([list(row) for row in actual], [list(row) for row in expected])
+        # M2M order is unspecified on the ORM side
+        for row in expected + actual:
+            for field in fast_serializers.MANY_TO_MANY:
+                row[field].sort(key=lambda item: item['id'])
+        self.assertEqual(actual, expected)
+
+    def test_full_and_empty_profiles(self):
+        empty_user = User.objects.create_user(email='empty@example.com', username='empty', password='pass')
+        empty = UserProfile.objects.create(user=empty_user, career_vision='Lead', portfolio_url='https://example.com')
+        self.assertParity([self.user.profile, empty, *self.create_profiles(2)])
+
+    def test_names_created_after_the_snapshot(self):
+        get_reference_snapshot()
+        late = Skill.objects.create(name='Late skill')  # version bumps only on commit
+        self.user.profile.skills.add(late)
+        self.assertParity([self.user.profile])
+
+    def test_retrieve_endpoint(self):
+        response = self.client.get(reverse('userprofile-detail', args=[self.user.profile.pk]))
+        self.assertEqual(response.data['user']['email'], self.user.email)
+        self.assertEqual(self.client.get(reverse('userprofile-detail', args=[0])).status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ConditionalGetTests(ProfileFixturesMixin, APITestCase):
+
+    def test_retrieve_answers_etag_and_last_modified(self):
+        url = reverse('userprofile-detail', args=[self.user.profile.pk])
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        # Only the profile row is read; compressed responses carry weak ETags
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.client.patch(url, {'years_of_experience': 7}, format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_reference_list_tracks_the_table_version(self):
+        url = reverse('skill-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Other pages are other bodies
+        self.assertEqual(self.client.get(url + '?page_size=2', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'name': 'Rust'}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), len(self.skills) + 1)
+
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RendererTests(ProfileFixturesMixin, APITestCase):
+
+    @skipUnless(renderers.orjson, "orjson is not installed")
+    def test_fast_json_matches_drf_json(self):
+        data = {
+            'text': 'caf\u00e9 \u2028', 'lazy': gettext_lazy('Email'), 'amount': Decimal('1.50'),
+            'when': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc), 7: [None, True, 1.5],
+        }
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    @skipUnless(renderers.orjson, "orjson is not installed")
+    def test_fast_json_falls_back_for_what_orjson_rejects(self):
+        data = {'big': 2 ** 70, 'small': 1e-05}
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+        # Floats are equal in value, though not always spelt the same
+        self.assertEqual(renderers.FastJSONRenderer().render({'small': 1e-05}), b'{"small":0.00001}')
+
+    @skipUnless(renderers.msgpack, "msgpack is not installed")
+    def test_msgpack_is_negotiated(self):
+        response = self.client.get(reverse('userprofile-me'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content)['profile']['id'], self.user.profile.pk)
+
+    def test_gzip_keeps_conditional_requests_working(self):
+        url = reverse('userprofile-me')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_columnar_reference_data(self):
+        url = reverse('userprofile-me')
+        rows = self.client.get(url).data['reference_data']
+        response = self.client.get(url, {'reference_layout': 'columns'})
+        columns = response.data['reference_data']
+        for key, table in rows.items():
+            self.assertEqual(columns[key], {'id': [row['id'] for row in table], 'name': [row['name'] for row in table]})
+        # Each layout is its own representation
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(url, {'reference_layout': 'bogus'}).status_code, 400)
+
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class PerformanceMetricsTests(ProfileFixturesMixin, APITestCase):
+
+    def test_server_timing_reports_the_request(self):
+        response = self.client.get(reverse('userprofile-list'))
+        entries = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+        self.assertEqual(list(entries), ['db', 'auth', 'serialize', 'total'])
+        self.assertIn('desc="5 queries"', entries['db'])
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('userprofile-list')))
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.Histogram('test_seconds', 'Test.', ('route',), buckets=(0.1, 1))
+        self.addCleanup(metrics._registry.remove, histogram)
+        for value in (0.25, 0.5, 5):
+            histogram.observe(('a"b',), value)
+        histogram.observe(('c',), 0.05)
+        self.assertEqual(histogram.render().splitlines(), [
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{route="a\\"b",le="0.1"} 0',
+            'test_seconds_bucket{route="a\\"b",le="1"} 2',
+            'test_seconds_bucket{route="a\\"b",le="+Inf"} 3',
+            'test_seconds_sum{route="a\\"b"} 5.75',
+            'test_seconds_count{route="a\\"b"} 3',
+            'test_seconds_bucket{route="c",le="0.1"} 1',
+            'test_seconds_bucket{route="c",le="1"} 1',
+            'test_seconds_bucket{route="c",le="+Inf"} 1',
+            'test_seconds_sum{route="c"} 0.05',
+            'test_seconds_count{route="c"} 1',
+        ])
+
+    def test_metrics_endpoint_needs_staff_or_the_token(self):
+        self.client.get(reverse('userprofile-list'))
+        url = reverse('metrics')
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer None').status_code, 403)
+
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            response = self.client.get(url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn('method="GET",action="list",status="200"}', response.content.decode())
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_lists_are_timed_once(self):
+        profiles = UserProfile.objects.filter(pk__in=[profile.pk for profile in self.create_profiles(3)])
+        token = metrics.request_timings.set({'db': 0.0, 'queries': 0, 'auth': 0.0, 'serialize': 0.0})
+        try:
+            with mock.patch('user_registration.api.serializers.timed', wraps=metrics.timed) as timed:
+                data = UserProfileDetailSerializer(profiles, many=True).data
+        finally:
+            metrics.request_timings.reset(token)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(timed.call_count, 1)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class DatabaseRoutingTests(ProfileFixturesMixin, APITestCase):
+
+    def test_reads_use_the_replica_until_the_request_writes(self):
+        router = db_router.PrimaryReplicaRouter()
+        with mock.patch.object(db_router, 'replica_alias', return_value='replica'):
+            self.assertEqual(router.db_for_read(Skill), 'default')  # outside a request
+            token = db_router._routing.set({'replica': False, 'wrote': False})
+            try:
+                self.assertEqual(router.db_for_read(Skill), 'default')
+                db_router.allow_replica_reads()
+                self.assertEqual(router.db_for_read(Skill), 'replica')
+                self.assertEqual(router.db_for_write(Skill), 'default')
+                self.assertEqual(router.db_for_read(Skill), 'default')
+            finally:
+                db_router._routing.reset(token)
+
+    def test_writers_are_pinned_to_the_primary(self):
+        url = reverse('skill-list')
+        # 'default' stands in for the replica alias, so the queries still run
+        with mock.patch.object(db_router, 'replica_alias', return_value='default'), \
+                mock.patch.object(db_router, 'allow_replica_reads', wraps=db_router.allow_replica_reads) as allow:
+            self.client.get(url)
+            self.client.get(reverse('userprofile-me'))  # not a replica action
+            self.assertEqual(allow.call_count, 1)
+
+            self.client.post(url, {'name': 'Go'}, format='json')
+            self.assertTrue(db_router.is_pinned(self.user))
+            response = self.client.get(url)
+            self.assertEqual(allow.call_count, 1)
+            self.assertIn('Go', [row['name'] for row in response.data['results']])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, DATABASE_REPLICA_ALIAS='lagging')
+class LaggingReplicaTests(ProfileFixturesMixin, APITestCase):
+    """Reads routed to a replica that has not caught up with the primary."""
+    databases = {'default', 'lagging'}
+    
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        # Replicate the fixtures, then commit a skill the replica lacks
+        for model in (User, Location, EducationLevel, EmploymentType, Skill, Company, JobRole,
+                      DesiredWorkEnvironment, UserProfile):
+            model.objects.using('lagging').bulk_create(model.objects.using('default').all())
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Rust')
+    
+    def test_reference_snapshot_is_built_from_the_primary(self):
+        response = self.client.get(reverse('userprofile-detail', args=[self.user.profile.pk]))
+        self.assertEqual(response.status_code, 200)
+        # The snapshot that read cached serves me, which reads the primary
+        reference_data = self.client.get(reverse('userprofile-me')).data['reference_data']
+        self.assertIn('Rust', [row['name'] for row in reference_data['skills']])
+    
+    def test_replica_lists_are_validated_by_the_rows_read(self):
+        url = reverse('skill-list')
+        response = self.client.get(url)
+        self.assertNotIn('Rust', [row['name'] for row in response.data['results']])
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # The async view, reached by bearer GETs over ASGI
+        bearer_get = async_to_sync(self.async_client.get)
+        bearer = f'Bearer {AccessToken.for_user(self.user)}'
+        self.assertEqual(bearer_get(url, headers={'Authorization': bearer})['ETag'], etag)
+        
+        # Once the replica catches up the stale copy is not revalidated
+        Skill.objects.using('lagging').create(name='Rust')
+        for response in (
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag),
+            bearer_get(url, headers={'Authorization': bearer, 'If-None-Match': etag}),
+        ):
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Rust', [row['name'] for row in response.json()['results']])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AsyncReadViewTests(ProfileFixturesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.bearer = f'Bearer {AccessToken.for_user(self.user)}'
+
+    def async_get(self, url, headers=None):
+        # Reaching a DRF view would mean the request was not served async
+        with mock.patch('rest_framework.views.APIView.dispatch', side_effect=AssertionError(url)):
+            return async_to_sync(self.async_client.get)(url, headers={'Authorization': self.bearer, **(headers or {})})
+    
+    def test_json_reads_match_the_drf_views(self):
+        cursor = self.client.get(reverse('skill-list'), {'page_size': 2}).data['next']
+        urls = [
+            reverse('user-me'),
+            reverse('userprofile-me'),
+            reverse('userprofile-me') + '?reference_layout=columns',
+            reverse('userprofile-detail', args=[self.create_profile(1).pk]),
+            reverse('skill-list') + '?page_size=2',
+            cursor.removeprefix('http://testserver'),
+            reverse('desiredworkenvironment-list'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                expected = self.client.get(url)
+                actual = self.async_get(url)
+                self.assertEqual(actual.status_code, 200)
+                self.assertEqual(actual.json(), json.loads(expected.content))
+                self.assertEqual(actual.get('ETag'), expected.get('ETag'))
+
+    def test_conditional_gets_and_errors(self):
+        url = reverse('userprofile-detail', args=[self.user.profile.pk])
+        etag = self.async_get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.async_get(url, {'If-None-Match': etag}).status_code, 304)
+
+        missing = reverse('userprofile-detail', args=[0])
+        self.assertEqual(self.async_get(missing).json(), self.client.get(missing).data)
+        self.assertEqual(self.async_get(reverse('skill-list') + '?cursor=bogus').status_code, 404)
+
+    def test_profile_reads_check_object_permissions(self):
+        class IsOwner(BasePermission):
+            def has_object_permission(self, request, view, obj):
+                return obj.user == request.user
+
+        own = reverse('userprofile-detail', args=[self.user.profile.pk])
+        other = reverse('userprofile-detail', args=[self.create_profile(1).pk])
+        with mock.patch.object(UserProfileViewSet, 'permission_classes', [IsAuthenticated, IsOwner]):
+            for get in (self.client.get, self.async_get):
+                with self.subTest(get=get):
+                    self.assertEqual(get(own).status_code, 200)
+                    self.assertEqual(get(other).status_code, 403)
+
+    def test_other_requests_reach_the_drf_views(self):
+        get = async_to_sync(self.async_client.get)
+        headers = {'Authorization': self.bearer}
+        response = get(reverse('userprofile-me'), headers={**headers, 'Accept': 'text/html'})
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        self.assertEqual(get(reverse('userprofile-me'), {'reference_layout': 'bogus'}, headers=headers).status_code, 400)
+
+        # Without a profile the DRF view creates one
+        newcomer = User.objects.create_user(email='new@example.com', username='new', password='pass')
+        response = get(reverse('userprofile-me'), headers={'Authorization': f'Bearer {AccessToken.for_user(newcomer)}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(UserProfile.objects.filter(user=newcomer).exists())
+
+        self.assertEqual(get(reverse('user-me'), headers={'Authorization': 'Bearer invalid'}).status_code, 401)
+
+    def test_only_gets_over_asgi_resolve_to_the_async_views(self):
+        url = reverse('userprofile-detail', args=[self.user.profile.pk])
+        drf_view = router_views['userprofile-detail']
+        headers = {'Authorization': self.bearer}
+        response = async_to_sync(self.async_client.get)(url, headers=headers)
+        self.assertIsNot(response.asgi_request.resolver_match.func, drf_view)
+
+        # Other methods skip the async view and its thread switch to DRF
+        response = async_to_sync(self.async_client.patch)(url, {}, content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(response.asgi_request.resolver_match.func, drf_view)
+        response = async_to_sync(self.async_client.post)(
+            reverse('skill-list'), {'name': 'Rust'}, content_type='application/json', headers=headers
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIs(response.asgi_request.resolver_match.func, router_views['skill-list'])
+
+        # Under WSGI every request does
+        self.client.force_authenticate(self.user)
+        self.assertIs(self.client.get(url).wsgi_request.resolver_match.func, drf_view)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AdminTests(ProfileFixturesMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='pass')
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('admin:user_registration_userprofile_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_admin_login_over_asgi(self):
+        response = async_to_sync(self.async_client.post)(
+            reverse('admin:login'), {'username': 'admin@example.com', 'password': 'pass'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(async_to_sync(self.async_client.get)(reverse('admin:index')).status_code, 200)
+
+    def test_profile_changelist_queries_do_not_grow_with_rows(self):
+        queries = self.changelist_queries()
+        self.create_profiles(5)
+        self.assertEqual(self.changelist_queries(), queries)
+
+    def test_prefix_search_and_autocomplete(self):
+        skills_url = reverse('admin:user_registration_skill_changelist')
+        # Small tables are searched case-insensitively anywhere
+        response = self.client.get(skills_url, {'q': 'ILL 1'})
+        self.assertEqual([skill.name for skill in response.context['cl'].result_list], ['Skill 1'])
+
+        with mock.patch.object(admin.LargeTableAdmin, 'search_scan_limit', 0):
+            response = self.client.get(skills_url, {'q': ' skill  1'})
+            self.assertEqual([skill.name for skill in response.context['cl'].result_list], ['Skill 1'])
+            self.assertEqual(len(self.client.get(skills_url, {'q': 'ILL 1'}).context['cl'].result_list), 0)
+            response = self.client.get(reverse('admin:user_registration_userprofile_changelist'), {'q': 'USER0@'})
+            self.assertEqual(list(response.context['cl'].result_list), [self.user.profile])
+
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'user_registration', 'model_name': 'userprofile', 'field_name': 'skills', 'term': 'Skill',
+        })
+        self.assertEqual(len(response.json()['results']), 5)
+
+        # The change form renders no choices up front
+        Skill.objects.create(name='Unchosen')
+        response = self.client.get(reverse('admin:user_registration_userprofile_change', args=[self.user.profile.pk]))
+        self.assertNotContains(response, 'Unchosen')
+
+    def test_estimated_count_paginator(self):
+        queryset = Skill.objects.order_by('pk')
+        with mock.patch.object(admin.EstimatedCountPaginator, 'count_limit', 2):
+            # Unfiltered, from the highest primary key
+            self.assertEqual(admin.EstimatedCountPaginator(queryset, 1).count, self.skills[-1].pk)
+            # Filtered, counted up to count_limit
+            filtered = queryset.filter(name__startswith='Skill')
+            self.assertEqual(admin.EstimatedCountPaginator(filtered, 1).count, 2)
+            # Pages past the limit are counted on to, with one more after them
+            paginator = admin.EstimatedCountPaginator(filtered, 1)
+            self.assertEqual(paginator.page(4).object_list[0], self.skills[3])
+            self.assertEqual(paginator.num_pages, 5)
+            with self.assertRaises(EmptyPage):
+                paginator.page(6)
+            self.assertFalse(paginator.capped)
+
+            with mock.patch.object(admin.SkillAdmin, 'list_per_page', 1):
+                response = self.client.get(reverse('admin:user_registration_skill_changelist'), {'q': 'skill', 'p': 4})
+            self.assertEqual(list(response.context['cl'].result_list), [self.skills[3]])
+        self.assertEqual(admin.EstimatedCountPaginator(queryset, 1).count, 5)
+
+
+class BenchmarkCommandTests(SimpleTestCase):
+
+    def test_runs_on_the_requested_database_only(self):
+        dev_database = settings.BASE_DIR / 'db.sqlite3'
+        before = dev_database.stat().st_mtime_ns if dev_database.exists() else None
+        with tempfile.TemporaryDirectory() as tmp:
+            database, output = os.path.join(tmp, 'bench.sqlite3'), os.path.join(tmp, 'report.json')
+            subprocess.run([
+                sys.executable, 'manage.py', 'benchmark', '--users', '5', '--reference-rows', '5',
+                '--iterations', '2', '--only', 'profile_retrieve', '--database', database, '--output', output,
+            ], cwd=settings.BASE_DIR, capture_output=True, check=True)
+            with open(output) as f:
+                report = json.load(f)
+            self.assertEqual(report['meta']['database'], database)
+            self.assertEqual(list(report['scenarios']), ['profile_retrieve'])
+            # The benchmark database is deleted once measured
+            self.assertEqual(os.listdir(tmp), ['report.json'])
+        after = dev_database.stat().st_mtime_ns if dev_database.exists() else None
+        self.assertEqual(after, before)
@@ -0,0 +1,304 @@
+"""
+In-process throttling and load shedding for the authentication endpoints.
+
+Limits are kept in this process's memory, so they cost no cache or database
+round trip and can reject a request before it hashes a password or reads a
+user. With several processes each enforces its own share; size the limits
+per process.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from careerai import metrics
+
+
+class SlidingWindow:
+    """
+    At most ``limit`` hits in any ``period`` seconds, from a log of the last
+    ``limit`` hit times per key.
+    """
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+
+    def new_state(self):
+        return deque(maxlen=self.limit)
+
+    def wait(self, hits, now):
+        """The seconds until a hit is allowed, or None."""
+        if len(hits) == self.limit and hits[0] > now - self.period:
+            return hits[0] + self.period - now
+        return None
+
+    def hit(self, hits, now):
+        """Record a hit, or return the seconds until one is allowed."""
+        wait = self.wait(hits, now)
+        if wait is None:
+            hits.append(now)
+        return wait
+
+    def is_idle(self, hits, now):
+        """Whether the state is as good as new."""
+        return not hits or hits[-1] <= now - self.period
+
+
+class TokenBucket:
+    """
+    Bursts of up to ``limit`` hits, refilled evenly over ``period`` seconds.
+    """
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.rate = limit / period
+
+    def new_state(self):
+        return [float(self.limit), None]  # tokens, last refill
+
+    def _tokens(self, bucket, now):
+        tokens, refilled_at = bucket
+        if refilled_at is not None:
+            tokens = min(self.limit, tokens + (now - refilled_at) * self.rate)
+        return tokens
+
+    def wait(self, bucket, now):
+        tokens = self._tokens(bucket, now)
+        return None if tokens >= 1 else (1 - tokens) / self.rate
+
+    def hit(self, bucket, now):
+        tokens = self._tokens(bucket, now)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return (1 - tokens) / self.rate
+        bucket[0] = tokens - 1
+        return None
+
+    def is_idle(self, bucket, now):
+        return self._tokens(bucket, now) >= self.limit
+
+
+ALGORITHMS = {
+    'sliding_window': SlidingWindow,
+    'token_bucket': TokenBucket,
+}
+
+
+class Limiter:
+    """
+    One rate limit applied per key, with the state of at most ``max_keys``
+    keys. The least recently seen keys are forgotten once their limit has
+    reset; while every tracked key is still limited, new keys share one
+    overflow state, so flooding new keys cannot push out a throttled one.
+    """
+    def __init__(self, algorithm, max_keys):
+        self.algorithm = algorithm
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+        self._overflow = None
+
+    def hit(self, key, now=None):
+        """Count a request for ``key``; return None, or the seconds to wait."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self.algorithm.hit(self._state(key, now), now)
+
+    def wait(self, key, now=None):
+        """The seconds ``key`` must wait, or None, without counting a request."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._states.get(key)
+            if state is None and len(self._states) >= self.max_keys:
+                state = self._overflow
+            return None if state is None else self.algorithm.wait(state, now)
+
+    def _state(self, key, now):
+        state = self._states.get(key)
+        if state is not None:
+            self._states.move_to_end(key)
+            return state
+        while len(self._states) >= self.max_keys:
+            oldest_key, oldest = next(iter(self._states.items()))
+            if not self.algorithm.is_idle(oldest, now):
+                if self._overflow is None:
+                    self._overflow = self.algorithm.new_state()
+                return self._overflow
+            del self._states[oldest_key]
+        state = self._states[key] = self.algorithm.new_state()
+        return state
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(scope, kind):
+    """The limiter configured for ``AUTH_THROTTLES[scope][kind]``, or None."""
+    spec = getattr(settings, 'AUTH_THROTTLES', {}).get(scope, {}).get(kind)
+    if spec is None:
+        return None
+    key = (scope, kind, tuple(spec))
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                algorithm, limit, period = spec
+                limiter = _limiters[key] = Limiter(
+                    ALGORITHMS[algorithm](limit, period),
+                    getattr(settings, 'AUTH_THROTTLE_MAX_KEYS', 100000),
+                )
+    return limiter
+
+
+def throttle(scope, consume=True, **keys):
+    """
+    Count a request against ``scope``'s limit for each of ``keys`` (e.g.
+    ``ip=..., email=...``). Returns None when every limit allows it, or the
+    whole seconds to wait before retrying. Every limit is checked before the
+    request counts against any, so one rejecting it spends no other's
+    budget; with ``consume=False`` they are only checked.
+    """
+    limits = []
+    for kind, value in keys.items():
+        limiter = get_limiter(scope, kind) if value else None
+        if limiter is not None:
+            limits.append((limiter, value.lower() if kind == 'email' else value))
+    now = time.monotonic()
+    waits = [wait for wait in (limiter.wait(key, now) for limiter, key in limits) if wait is not None]
+    if not waits and consume:
+        # A concurrent request may have taken the last hit since the check
+        waits = [wait for wait in (limiter.hit(key, now) for limiter, key in limits) if wait is not None]
+    if not waits:
+        return None
+    throttled_requests.inc()
+    return max(1, math.ceil(max(waits)))
+
+
+def reset():
+    """Forget every limiter and its state."""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+class Overloaded(Exception):
+    """Raised when too many auth requests are in flight; ``status_code`` is 429 or 503."""
+
+    def __init__(self, status_code):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the auth requests in flight at once: ``max_in_flight`` in total
+    (beyond it requests get 503) and ``max_per_client`` per client IP
+    (429), so one client cannot take the whole budget.
+    """
+    def __init__(self, max_in_flight, max_per_client):
+        self.max_in_flight = max_in_flight
+        self.max_per_client = max_per_client
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._per_client = {}
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @contextmanager
+    def admit(self, client):
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                shed_requests.inc()
+                raise Overloaded(status.HTTP_503_SERVICE_UNAVAILABLE)
+            if self._per_client.get(client, 0) >= self.max_per_client:
+                shed_requests.inc()
+                raise Overloaded(status.HTTP_429_TOO_MANY_REQUESTS)
+            self._in_flight += 1
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if self._per_client[client] == 1:
+                    del self._per_client[client]
+                else:
+                    self._per_client[client] -= 1
+
+
+_shedder = None
+_shedder_lock = threading.Lock()
+
+
+def get_shedder():
+    """Return the process-wide auth concurrency limiter, creating it from settings."""
+    global _shedder
+    if _shedder is None:
+        with _shedder_lock:
+            if _shedder is None:
+                _shedder = ConcurrencyLimiter(
+                    max_in_flight=getattr(settings, 'AUTH_MAX_IN_FLIGHT', 64),
+                    max_per_client=getattr(settings, 'AUTH_MAX_IN_FLIGHT_PER_CLIENT', 4),
+                )
+    return _shedder
+
+
+def client_ip(request):
+    """
+    The client address. ``X-Forwarded-For``, which clients can set to
+    anything, is only read when DRF's ``NUM_PROXIES`` says how many proxies
+    in front of the app append to it.
+    """
+    if api_settings.NUM_PROXIES is None:
+        return request.META.get('REMOTE_ADDR')
+    return BaseThrottle().get_ident(request)
+
+
+def overloaded_response(exc):
+    return JsonResponse(
+        {"error": "Server is busy, please retry shortly"}, status=exc.status_code,
+        headers={'Retry-After': str(getattr(settings, 'AUTH_SHED_RETRY_AFTER', 1))}
+    )
+
+
+def shed_load(view):
+    """Run ``view``, sync or async, under the auth concurrency limit."""
+    if iscoroutinefunction(view):
+        async def wrapped(request, *args, **kwargs):
+            try:
+                with get_shedder().admit(client_ip(request)):
+                    return await view(request, *args, **kwargs)
+            except Overloaded as exc:
+                return overloaded_response(exc)
+    else:
+        def wrapped(request, *args, **kwargs):
+            try:
+                with get_shedder().admit(client_ip(request)):
+                    return view(request, *args, **kwargs)
+            except Overloaded as exc:
+                return overloaded_response(exc)
+    return wraps(view)(wrapped)
+
+
+throttled_requests = metrics.Counter(
+    'careerai_auth_throttled_total', 'Auth requests rejected by a rate limit.'
+)
+shed_requests = metrics.Counter(
+    'careerai_auth_shed_total', 'Auth requests shed because too many were in flight.'
+)
+metrics.Gauge(
+    'careerai_auth_in_flight', 'Auth requests in flight.',
+    lambda: _shedder.in_flight if _shedder is not None else 0
+)